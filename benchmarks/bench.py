@@ -0,0 +1,363 @@
+"""
+    Benchmarks for the hot paths of PyHDL.
+
+    Run from the root of the repository::
+
+        python benchmarks/bench.py --output results.json
+        python benchmarks/bench.py --compare results.json --filter Simulator
+
+    Each benchmark is timed several times, and the fastest run is reported, which is the
+    most repeatable figure on a busy machine. Results are written as JSON, so that runs
+    on different commits can be compared with ``--compare``.
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyhdl import *
+from pyhdl.generator import random_netlist
+from pyhdl.optimize import collapse, recover_adders
+from pyhdl.serialize import load, save
+
+
+WIDTHS = (1, 8, 32, 64)
+
+benchmarks = []
+
+
+def benchmark(name):
+    """
+        Register a function returning the callable to time for a benchmark.
+    """
+    def register(function):
+        benchmarks.append((name, function))
+        return function
+    return register
+
+
+def _driven(width, value=0):
+    wire = Wire(width=width)
+    wire.uival = value
+    return wire
+
+
+# Wires
+
+
+@benchmark('Wire.val get')
+def wire_val_get():
+    wire = _driven(32, 12345)
+
+    def run():
+        # Forget the cached string, so that it is rendered again.
+        wire._string = None
+        wire.val
+    return run
+
+
+@benchmark('Wire.val set')
+def wire_val_set():
+    wire, value = Wire(width=32), '01' * 16
+
+    def run():
+        wire.val = value
+    return run
+
+
+@benchmark('Wire.uival get')
+def wire_uival_get():
+    wire = _driven(32, 12345)
+    return lambda: wire.uival
+
+
+@benchmark('Wire.uival set')
+def wire_uival_set():
+    wire = Wire(width=32)
+
+    def run():
+        wire.uival = 12345
+    return run
+
+
+@benchmark('Wire.ival get')
+def wire_ival_get():
+    wire = Wire(width=32)
+    wire.ival = -12345
+    return lambda: wire.ival
+
+
+@benchmark('Wire.ival set')
+def wire_ival_set():
+    wire = Wire(width=32)
+
+    def run():
+        wire.ival = -12345
+    return run
+
+
+@benchmark('SubWire bit write')
+def subwire_bit_write():
+    bit = _driven(64)[17]
+
+    def run():
+        bit.val = '1'
+    return run
+
+
+@benchmark('SubWire byte write')
+def subwire_byte_write():
+    byte = _driven(64)[8:16]
+
+    def run():
+        byte.uival = 0xa5
+    return run
+
+
+@benchmark('SubWire nested write')
+def subwire_nested_write():
+    bits = _driven(64)[0:32][8:24][4:12]
+
+    def run():
+        bits.uival = 0x5a
+    return run
+
+
+# Primitives
+
+
+def _simple(gate, width):
+    @benchmark('{0}.eval width={1}'.format(gate.__name__, width))
+    def run():
+        return gate(a=_driven(width, 3), b=_driven(width, 5), out=Wire(width=width), width=width).eval
+
+
+for _gate in (NandGate, AndGate, NorGate, OrGate, XorGate):
+    for _width in WIDTHS:
+        _simple(_gate, _width)
+
+
+def _widths(name, build):
+    for width in WIDTHS:
+        benchmark('{0}.eval width={1}'.format(name, width))(lambda width=width: build(width).eval)
+
+
+_widths('NotGate', lambda width: NotGate(inp=_driven(width, 3), out=Wire(width=width), width=width))
+_widths('Multiplexer', lambda width: Multiplexer(
+    a=_driven(width, 1), b=_driven(width, 2), c=_driven(width, 3), d=_driven(width, 4),
+    sel=_driven(2, 2), out=Wire(width=width), width=width, ways=4,
+))
+_widths('Demultiplexer', lambda width: Demultiplexer(
+    a=Wire(width=width), b=Wire(width=width), c=Wire(width=width), d=Wire(width=width),
+    sel=_driven(2, 2), input=_driven(width, 7), width=width, ways=4,
+))
+_widths('Adder', lambda width: Adder(a=_driven(width, 3), b=_driven(width, 5), out=Wire(width=width), width=width))
+
+
+@benchmark('HalfAdder.eval width=1')
+def half_adder():
+    return HalfAdder(a=_driven(1, 1), b=_driven(1, 1), out=Wire(), carry=Wire()).eval
+
+
+@benchmark('FullAdder.eval width=1')
+def full_adder():
+    return FullAdder(a=_driven(1, 1), b=_driven(1, 0), cin=_driven(1, 1), out=Wire(), cout=Wire()).eval
+
+
+def _memory(name, **kwargs):
+    @benchmark('Memory tick/tock {0}'.format(name))
+    def run():
+        address, write = _driven(16), _driven(1, 1)
+        memory = Memory(
+            input=_driven(32, 7), output=Wire(width=32), write=write, address=address,
+            default=0, width=32, **kwargs
+        )
+
+        def cycle():
+            address.uival = address.uival + 1
+            memory.tick()
+            memory.tock()
+        return cycle
+
+
+_memory('dict')
+_memory('array', depth=1 << 16)
+
+
+# Simulator
+
+
+def ripple_carry_accumulator(width):
+    """
+        An accumulator adding one to a register every cycle, through a chain of full adders.
+    """
+    total, count, carry = Wire(width=width), Wire(width=width), Wire(width=width + 1)
+    one = ConstantWire('0' * (width - 1) + '1', width=width)
+    carry[width].val = '0'
+
+    gates = [DFF(input=total, output=count, default='0' * width)]
+    for bit in range(0, width):
+        gates.append(FullAdder(
+            a=count[bit], b=one[bit], cin=carry[bit + 1], out=total[bit], cout=carry[bit],
+        ))
+    return gates
+
+
+def register_pipeline(width, stages):
+    """
+        A chain of registers, each inverting the value of the one before.
+    """
+    wires = [Wire(width=width) for stage in range(0, 2 * stages + 1)]
+    enable = ConstantWire('1')
+    gates = []
+    for stage in range(0, stages):
+        gates.append(Register(input=wires[2 * stage], write=enable, output=wires[2 * stage + 1], default='0' * width))
+        gates.append(NotGate(inp=wires[2 * stage + 1], out=wires[2 * stage + 2], width=width))
+    wires[0].uival = 0
+    return gates
+
+
+def nand_adder(width):
+    """
+        A ripple carry adder built from nine NAND gates per bit, with its inputs set.
+    """
+    a, b, out = _driven(width, 12345), _driven(width, 54321), Wire(width=width)
+    carry, gates = ConstantWire('0'), []
+    for bit in reversed(range(0, width)):
+        n1, n2, n3, half, n4, n5, n6, cout = [Wire() for wire in range(0, 8)]
+        gates.extend([
+            NandGate(a=a[bit], b=b[bit], out=n1),
+            NandGate(a=a[bit], b=n1, out=n2),
+            NandGate(a=b[bit], b=n1, out=n3),
+            NandGate(a=n2, b=n3, out=half),
+            NandGate(a=half, b=carry, out=n4),
+            NandGate(a=half, b=n4, out=n5),
+            NandGate(a=carry, b=n4, out=n6),
+            NandGate(a=n5, b=n6, out=out[bit]),
+            NandGate(a=n4, b=n1, out=cout),
+        ])
+        carry = cout
+    return gates, out
+
+
+def _simulator(name, build):
+    for mode in ('sweep', 'event', 'compiled'):
+        @benchmark('Simulator cycle {0} {1}'.format(name, mode))
+        def run(mode=mode):
+            sim = Simulator(build(), event_driven=(mode == 'event'))
+            if mode == 'compiled':
+                sim.compile()
+            sim.eval()
+            return lambda: sim.run(1)
+
+
+_simulator('ripple-carry-32', lambda: ripple_carry_accumulator(32))
+_simulator('pipeline-32x16', lambda: register_pipeline(32, 16))
+_simulator('nand-adder-64', lambda: nand_adder(64)[0])
+
+
+def collapsed_nand_adder(width):
+    gates, out = nand_adder(width)
+    return collapse(gates, keep=[out])
+
+
+_simulator('nand-adder-64 collapsed', lambda: collapsed_nand_adder(64))
+_simulator('ripple-carry-32 recovered', lambda: recover_adders(ripple_carry_accumulator(32)))
+
+
+@benchmark('Simulator build random-5000')
+def simulator_build():
+    return lambda: Simulator(random_netlist(5000, width=8, sequential=0.1)[0])
+
+
+@benchmark('Simulator load random-5000')
+def simulator_load():
+    saved = io.BytesIO()
+    save(Simulator(random_netlist(5000, width=8, sequential=0.1)[0]), saved)
+    return lambda: load(io.BytesIO(saved.getvalue()))
+
+
+@benchmark('Simulator fork random-5000')
+def simulator_fork():
+    return Simulator(random_netlist(5000, width=8, sequential=0.1)[0]).fork
+
+
+@benchmark('Simulator restore random-5000')
+def simulator_restore():
+    sim = Simulator(random_netlist(5000, width=8, sequential=0.1)[0])
+    snapshot = sim.snapshot()
+    return lambda: sim.restore(snapshot)
+
+
+# Runner
+
+
+def measure(run, repeat, min_time):
+    """
+        The fastest time per call to ``run``, over ``repeat`` timings of at least
+        ``min_time`` seconds each.
+    """
+    timer = timeit.Timer(run)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT)
+        commit = commit.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'commit': commit,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare with the results in this JSON file")
+    parser.add_argument('--filter', default='', help="only run benchmarks containing this text")
+    parser.add_argument('--repeat', type=int, default=5, help="timings per benchmark")
+    parser.add_argument('--min-time', type=float, default=0.05, help="minimum seconds per timing")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as results:
+            baseline = json.load(results)['results']
+
+    results = {}
+    for name, build in benchmarks:
+        if args.filter not in name:
+            continue
+
+        seconds = measure(build(), args.repeat, args.min_time)
+        results[name] = {'seconds': seconds, 'per_second': 1.0 / seconds}
+
+        line = '{0:<40} {1:>12.3f} us'.format(name, seconds * 1e6)
+        if name in baseline:
+            line += '  {0:>+7.1%}'.format(seconds / baseline[name]['seconds'] - 1)
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'environment': environment(), 'results': results}, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+    Measure how the simulator scales with the size of the netlist.
+
+    Builds random netlists of increasing size, and reports the memory used per gate and
+    the clock cycles simulated per second::
+
+        python benchmarks/scaling.py --sizes 1000 10000 100000 1000000 --output scaling.json
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyhdl import Simulator
+from pyhdl.generator import random_netlist
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def measure(size, args, mode):
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    gates, inputs, outputs = random_netlist(
+        size, depth=args.depth, width=args.width, fanout=args.fanout,
+        sequential=args.sequential, seed=args.seed,
+    )
+    sim = Simulator(gates, event_driven=(mode == 'event'))
+    if mode == 'compiled':
+        sim.compile()
+
+    if tracemalloc is not None:
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    else:
+        used = None
+
+    rng = random.Random(args.seed)
+    mask = (1 << args.width) - 1
+
+    def stimulus(cycle):
+        for wire in inputs:
+            wire.uival = rng.getrandbits(args.width) & mask
+
+    sim.eval()
+    cycles = 1
+    while True:
+        start = timeit.default_timer()
+        sim.run(cycles, stimulus=stimulus)
+        elapsed = timeit.default_timer() - start
+        if elapsed >= args.min_time:
+            break
+        cycles *= 2
+
+    return {
+        'gates': size,
+        'mode': mode,
+        'bytes_per_gate': used / float(size) if used is not None else None,
+        'cycles_per_second': cycles / elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--modes', nargs='+', default=['sweep', 'event', 'compiled'])
+    parser.add_argument('--depth', type=int, default=32)
+    parser.add_argument('--width', type=int, default=1)
+    parser.add_argument('--fanout', type=float, default=1.0)
+    parser.add_argument('--sequential', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-time', type=float, default=1.0, help="minimum seconds simulated per point")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print('{0:>10} {1:>10} {2:>16} {3:>16}'.format('gates', 'mode', 'bytes/gate', 'cycles/s'))
+    for size in args.sizes:
+        for mode in args.modes:
+            result = measure(size, args, mode)
+            results.append(result)
+            print('{0:>10} {1:>10} {2:>16.1f} {3:>16.2f}'.format(
+                size, mode, result['bytes_per_gate'] or 0, result['cycles_per_second'],
+            ))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'parameters': vars(args), 'results': results}, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,23 @@
 from pyhdl.wire import *
 from pyhdl.primitives import *
 from pyhdl.simulator import Simulator
+from pyhdl.lanes import LaneSimulator
+from pyhdl.bitslice import BitSliceSimulator
+from pyhdl.vcd import VCDWriter
+from pyhdl.profiler import Profiler
+from pyhdl.checkpoint import CheckpointFile
+from pyhdl.storage import DictStorage, ArrayStorage, PagedStorage
 
 __all__ = [
     'Wire', 
     'SubWire', 
     'ConstantWire',
     'Simulator',
+    'LaneSimulator',
+    'BitSliceSimulator',
+    'VCDWriter',
+    'Profiler',
+    'CheckpointFile',
     'NandGate',
     'AndGate',
     'NorGate',
@@ -18,7 +29,12 @@ __all__ = [
     'HalfAdder',
     'FullAdder',
     'Adder',
+    'RippleCarryAdder',
+    'LookupTable',
     'DFF',
     'Register',
     'Memory',
+    'DictStorage',
+    'ArrayStorage',
+    'PagedStorage',
 ]
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+    A simulator which evaluates many test vectors at once, using only Python integers.
+
+    Every bit of every wire holds a pair of integers, where bit ``k`` is the value (and
+    whether the value is undefined) for test vector ``k``. A gate then evaluates all the
+    test vectors with a single ``&``, ``|`` or ``^`` per bit.
+"""
+from pyhdl.primitives import *
+from pyhdl.primitives import _operators
+from pyhdl.simulator import flatten_list, _levelize
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, _resolve
+
+
+def _eval_simple(gate, sliced):
+    inputs = [sliced.read(getattr(gate, signal)) for signal in gate.signals]
+    combine = _operators[gate.operator]
+    everything = sliced.everything
+
+    values, xmasks = [], []
+    for bit in range(0, len(gate.out)):
+        value, xmask = inputs[0][0][bit], inputs[0][1][bit]
+        for other, other_xmask in inputs[1:]:
+            value = combine(value, other[bit])
+            if gate.inverted:
+                value = ~value & everything
+            xmask |= other_xmask[bit]
+        values.append(value & ~xmask)
+        xmasks.append(xmask)
+
+    sliced.write(gate.out, values, xmasks)
+
+
+def _eval_not(gate, sliced):
+    values, xmasks = sliced.read(gate.inp)
+    everything = sliced.everything
+    sliced.write(gate.out, [~(v | x) & everything for v, x in zip(values, xmasks)], xmasks)
+
+
+def _eval_half_adder(gate, sliced):
+    (a,), (a_xmask,) = sliced.read(gate.a)
+    (b,), (b_xmask,) = sliced.read(gate.b)
+
+    undefined = a_xmask | b_xmask
+    sliced.write(gate.out, [(a ^ b) & ~undefined], [undefined])
+    sliced.write(gate.carry, [(a & b) & ~undefined], [undefined])
+
+
+def _eval_full_adder(gate, sliced):
+    (a,), (a_xmask,) = sliced.read(gate.a)
+    (b,), (b_xmask,) = sliced.read(gate.b)
+    (cin,), (cin_xmask,) = sliced.read(gate.cin)
+
+    undefined = a_xmask | b_xmask | cin_xmask
+    half = a ^ b
+    sliced.write(gate.out, [(half ^ cin) & ~undefined], [undefined])
+    sliced.write(gate.cout, [((a & b) | (cin & half)) & ~undefined], [undefined])
+
+
+_kernels = {
+    NandGate: _eval_simple,
+    AndGate: _eval_simple,
+    NorGate: _eval_simple,
+    OrGate: _eval_simple,
+    XorGate: _eval_simple,
+    NotGate: _eval_not,
+    HalfAdder: _eval_half_adder,
+    FullAdder: _eval_full_adder,
+}
+
+
+def _pattern(bit, vectors):
+    """
+        The integer whose bit ``k`` is bit ``bit`` of ``k``, for a power of two ``vectors``.
+    """
+    half = 1 << bit
+    period = half << 1
+    block = ((1 << half) - 1) << half
+    return block * (((1 << vectors) - 1) // ((1 << period) - 1))
+
+
+class BitSliceSimulator(object):
+    """
+        A simulator for many test vectors at once, using only Python integers.
+
+        Each bit of each wire holds one integer, where bit ``k`` is the value for test vector
+        ``k``. Set the test vectors of the inputs with :meth:`set` or :meth:`exhaustive`,
+        call :meth:`eval`, and read the results with :meth:`get`. Supports the simple gates,
+        ``NotGate``, ``HalfAdder`` and ``FullAdder``.
+
+        :param gates: An arbitrarily nested list of gates.
+        :type gates: list
+        :param vectors: The number of test vectors.
+        :type vectors: int
+    """
+
+    def __init__(self, gates, vectors):
+        self.vectors = vectors
+        self.everything = (1 << vectors) - 1
+
+        self.gates = flatten_list(gates)
+        self.schedule, self.loops = _levelize(self.gates)
+        self.values = {}
+        self._kernels = []
+
+        for gate in self.schedule:
+            if type(gate) not in _kernels:
+                raise HDLError("BitSliceSimulator cannot simulate {0}.".format(type(gate).__name__))
+            self._kernels.append((_kernels[type(gate)], gate))
+
+    def _root(self, wire):
+        root, shift, width = _resolve(wire)
+
+        if root not in self.values:
+            value, xmask = root.bits
+            self.values[root] = (
+                [self.everything if (value >> bit) & 1 else 0 for bit in range(0, len(root))],
+                [self.everything if (xmask >> bit) & 1 else 0 for bit in range(0, len(root))],
+            )
+
+        return root, shift, width
+
+    def read(self, wire):
+        """
+            The ``(values, xmasks)`` of each bit of a wire, least significant bit first.
+
+            :param wire: The wire to read.
+        """
+        root, shift, width = self._root(wire)
+        values, xmasks = self.values[root]
+        return values[shift:shift + width], xmasks[shift:shift + width]
+
+    def write(self, wire, values, xmasks):
+        """
+            Set the ``(values, xmasks)`` of each bit of a wire, least significant bit first.
+
+            :param wire: The wire to write.
+            :param values: The value of each bit, for every test vector.
+            :param xmasks: Whether each bit is undefined, for every test vector.
+        """
+        root, shift, width = self._root(wire)
+        if isinstance(root, ConstantWire):
+            raise HDLError("Cannot write to a ConstantWire.")
+
+        root_values, root_xmasks = self.values[root]
+        root_values[shift:shift + width] = values
+        root_xmasks[shift:shift + width] = xmasks
+
+    def set(self, wire, vectors):
+        """
+            Set the (unsigned) integer value of a wire, for every test vector.
+
+            :param wire: The wire to set.
+            :param vectors: A list with one value per test vector.
+        """
+        values = []
+        for bit in range(0, len(wire)):
+            sliced = ''.join('1' if (vector >> bit) & 1 else '0' for vector in reversed(vectors))
+            values.append(int(sliced, 2) if sliced else 0)
+        self.write(wire, values, [0] * len(wire))
+
+    def exhaustive(self, wires):
+        """
+            Set the wires to every combination of values, one per test vector. Bit ``k`` of
+            the first wire varies fastest.
+
+            :param wires: The wires to set.
+            :type wires: list
+        """
+        width = sum(len(wire) for wire in wires)
+        if self.vectors != 1 << width:
+            raise HDLError("An exhaustive test of {0} bits needs {1} vectors.".format(width, 1 << width))
+
+        bit = 0
+        for wire in wires:
+            values = []
+            for offset in range(0, len(wire)):
+                values.append(_pattern(bit, self.vectors))
+                bit += 1
+            self.write(wire, values, [0] * len(wire))
+
+    def get(self, wire):
+        """
+            The (unsigned) integer value of a wire, for every test vector.
+
+            :param wire: The wire to read.
+        """
+        values, xmasks = self.read(wire)
+        if any(xmasks):
+            raise HDLError("Wire has undefined bits.")
+
+        vectors = [0] * self.vectors
+        fmt = '0>{}b'.format(self.vectors)
+        for bit, value in enumerate(values):
+            for vector, flag in enumerate(reversed(format(value, fmt))):
+                if flag == '1':
+                    vectors[vector] |= 1 << bit
+        return vectors
+
+    def eval(self):
+        """
+            Evaluate all the gates, for every test vector.
+        """
+        for kernel, gate in self._kernels:
+            kernel(gate, self)
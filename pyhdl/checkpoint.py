@@ -0,0 +1,328 @@
+"""
+    Save the state of a long simulation to disk at intervals, so that it can be resumed
+    from any saved cycle, e.g. after the job running it was stopped.
+
+    A checkpoint file starts with ``PYCKP`` and a format version, followed by one record
+    per checkpoint. Most records only hold what changed since the record before: the
+    wires, flip flops and registers whose values changed, and the words of a
+    ``DictStorage``, the blocks of an ``ArrayStorage`` or the pages of a ``PagedStorage``
+    which were written. Every few records hold the whole state instead, so restoring
+    reads a bounded number of records.
+
+    Each record starts with its cycle, its length and a CRC of its contents, which is
+    compressed with zlib in the layout used by :mod:`pyhdl.serialize`. Records are only
+    ever appended, and a record cut short, e.g. by a job being killed while writing it,
+    is dropped when the file is opened again.
+"""
+from pyhdl.serialize import _Reader, _Writer, _storages
+from pyhdl.simulator import Snapshot
+from pyhdl.storage import ArrayStorage, DictStorage, PagedStorage
+from pyhdl.utils import HDLError
+import os
+import struct
+import zlib
+
+
+MAGIC = b'PYCKP'
+VERSION = 1
+
+_header = struct.Struct('<5sH')
+# The cycle, whether the record holds the whole state, the length and the CRC.
+_record = struct.Struct('<QBII')
+
+#: The number of bytes of an ``ArrayStorage`` compared, and saved, at a time.
+_block = 4096
+
+
+class _Image(object):
+    """
+        The state held by a run of records, as it is read back.
+    """
+
+    def __init__(self, wires, flops, kinds):
+        self.wires = [None] * wires
+        self.flops = [None] * flops
+        self.pending = []
+        self.memories = [bytearray() if kind is ArrayStorage else {} for kind in kinds]
+
+
+def _encode_memory(writer, kind, contents, before):
+    """
+        Write the parts of a memory's snapshot which differ from an earlier snapshot, or
+        all of it if there is none.
+    """
+    ints, bigs, blobs = writer.ints, writer.bigs, writer.blobs
+    if kind is DictStorage:
+        changed = [(address, value) for address, value in sorted(contents.items()) if before is None or before.get(address) != value]
+        removed = [] if before is None else sorted(address for address in before if address not in contents)
+        ints.extend((len(changed), len(removed)))
+        for address, value in changed:
+            bigs.extend((address, value))
+        bigs.extend(removed)
+
+    elif kind is ArrayStorage:
+        blocks = [
+            start for start in range(0, len(contents), _block)
+            if before is None or contents[start:start + _block] != before[start:start + _block]
+        ]
+        ints.append(len(blocks))
+        for start in blocks:
+            ints.append(start // _block)
+            blobs.append(contents[start:start + _block])
+
+    else:
+        # The pages of a snapshot are shared until they are written, so a written page
+        # is a different object.
+        changed = sorted(number for number, page in contents.items() if before is None or before.get(number) is not page)
+        removed = [] if before is None else sorted(number for number in before if number not in contents)
+        ints.extend((len(changed), len(removed)))
+        for number in changed:
+            bigs.append(number)
+            blobs.append(bytes(contents[number].buffer))
+        bigs.extend(removed)
+
+
+def _decode_memory(reader, kind, contents):
+    """
+        Apply the changes to a memory written by :func:`_encode_memory`.
+    """
+    take, big, blob = reader.int, reader.big, reader.blob
+    if kind is DictStorage:
+        changed, removed = take(), take()
+        for word in range(0, changed):
+            address = big()
+            contents[address] = big()
+        for word in range(0, removed):
+            del contents[big()]
+
+    elif kind is ArrayStorage:
+        for block in range(0, take()):
+            start = take() * _block
+            data = blob()
+            contents[start:start + len(data)] = data
+
+    else:
+        changed, removed = take(), take()
+        for page in range(0, changed):
+            number = big()
+            contents[number] = blob()
+        for page in range(0, removed):
+            del contents[big()]
+
+
+class CheckpointFile(object):
+    """
+        Save checkpoints of a simulator to a file, and restore the simulator from them.
+
+        With an ``interval``, a checkpoint is saved at the end of every cycle whose count
+        is a multiple of it; otherwise call :meth:`save`. An existing file is opened to add
+        more checkpoints, so a stopped run can be resumed with :meth:`restore`, which puts
+        back the latest checkpoint by default. The file can be used as a context manager.
+
+        The file must be used with the design it was saved from, built the same way, or
+        with a :meth:`~pyhdl.Simulator.fork` of it.
+
+        :param simulator: The simulator to save.
+        :param path: The path of the file, which is created if it does not exist.
+        :param interval: The number of cycles between checkpoints.
+        :type interval: int
+        :param full_interval: The greatest number of records which only hold changes,
+                              between records holding the whole state.
+        :type full_interval: int
+    """
+
+    def __init__(self, simulator, path, interval=None, full_interval=16):
+        self.simulator = simulator
+        self.path = path
+        self.interval = interval
+        self.full_interval = full_interval
+
+        wires, flops, memories = simulator._find_state()
+        for gate in memories:
+            if type(gate.memory) not in _storages:
+                raise HDLError("Cannot checkpoint a memory stored in {0}.".format(type(gate.memory).__name__))
+        self._memories = memories
+        self._kinds = [type(gate.memory) for gate in memories]
+
+        # The cycle, whether it holds the whole state, offset, length and CRC of each record.
+        self._records = []
+        self._previous = None
+        self._changes = 0
+
+        if os.path.exists(path):
+            self.file = open(path, 'r+b')
+            self._scan()
+        else:
+            self.file = open(path, 'w+b')
+            self.file.write(_header.pack(MAGIC, VERSION))
+            self.file.flush()
+
+        if interval is not None:
+            simulator.monitors.append(self)
+
+    def _scan(self):
+        """
+            Index the records of an existing file, and drop a record cut short.
+        """
+        header = self.file.read(_header.size)
+        if len(header) < _header.size or _header.unpack(header)[0] != MAGIC:
+            self.file.close()
+            raise HDLError("{0} is not a checkpoint file.".format(self.path))
+        if _header.unpack(header)[1] != VERSION:
+            self.file.close()
+            raise HDLError("Unsupported format version {0}.".format(_header.unpack(header)[1]))
+
+        size = os.fstat(self.file.fileno()).st_size
+        end = _header.size
+        while True:
+            data = self.file.read(_record.size)
+            if len(data) < _record.size:
+                break
+            cycle, full, length, crc = _record.unpack(data)
+            offset = end + _record.size
+            if offset + length > size:
+                break
+            self._records.append((cycle, bool(full), offset, length, crc))
+            end = offset + length
+            self.file.seek(end)
+
+        self.file.seek(end)
+        self.file.truncate()
+
+    @property
+    def cycles(self):
+        """
+            The sorted cycle counts at which checkpoints were saved.
+        """
+        return sorted(set(record[0] for record in self._records))
+
+    def save(self):
+        """
+            Save a checkpoint of the simulator, holding what changed since the previous
+            checkpoint saved through this object.
+        """
+        snapshot = self.simulator.snapshot()
+        previous = self._previous
+        full = (previous is None) or (self._changes >= self.full_interval)
+
+        writer = _Writer()
+        writer.ints.extend((len(snapshot.wires), len(snapshot.flops), len(snapshot.memories)))
+        for values, before in ((snapshot.wires, None if full else previous.wires),
+                               (snapshot.flops, None if full else previous.flops)):
+            changed = [index for index, bits in enumerate(values) if before is None or bits != before[index]]
+            writer.ints.append(len(changed))
+            writer.ints.extend(changed)
+            for index in changed:
+                writer.bigs.extend(values[index])
+
+        writer.ints.append(len(snapshot.pending))
+        writer.ints.extend(snapshot.pending)
+        for position, kind in enumerate(self._kinds):
+            writer.ints.append(_storages.index(kind))
+            _encode_memory(writer, kind, snapshot.memories[position], None if full else previous.memories[position])
+
+        data = zlib.compress(writer.data(), 1)
+        crc = zlib.crc32(data) & 0xffffffff
+        self.file.seek(0, 2)
+        self.file.write(_record.pack(snapshot.cycle, full, len(data), crc))
+        offset = self.file.tell()
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        self._records.append((snapshot.cycle, full, offset, len(data), crc))
+        self._previous = snapshot
+        self._changes = 0 if full else self._changes + 1
+
+    def _read(self, image, record):
+        """
+            Apply a record to an image of the state, or start a new image from a record
+            holding the whole state.
+        """
+        cycle, full, offset, length, crc = record
+        self.file.seek(offset)
+        data = self.file.read(length)
+        if zlib.crc32(data) & 0xffffffff != crc:
+            raise HDLError("The checkpoint at cycle {0} is corrupt.".format(cycle))
+
+        reader = _Reader(zlib.decompress(data))
+        take, big = reader.int, reader.big
+        counts = (take(), take(), take())
+        if full:
+            image = _Image(counts[0], counts[1], self._kinds)
+        if counts != (len(image.wires), len(image.flops), len(self._kinds)):
+            raise HDLError("The checkpoints were saved from a different design.")
+
+        for values in (image.wires, image.flops):
+            for index in [take() for change in range(0, take())]:
+                values[index] = (big(), big())
+
+        image.pending = [take() for rank in range(0, take())]
+        for kind, contents in zip(self._kinds, image.memories):
+            if _storages[take()] is not kind:
+                raise HDLError("The checkpoints were saved from a different design.")
+            _decode_memory(reader, kind, contents)
+        return image
+
+    def restore(self, cycle=None):
+        """
+            Restore the simulator from a checkpoint. The next checkpoint saved holds the
+            whole state.
+
+            :param cycle: The cycle count of the checkpoint, by default the latest.
+            :type cycle: int
+        """
+        if not self._records:
+            raise HDLError("No checkpoints have been saved.")
+
+        if cycle is None:
+            last = len(self._records) - 1
+        else:
+            matches = [position for position, record in enumerate(self._records) if record[0] == cycle]
+            if not matches:
+                raise HDLError("No checkpoint was saved at cycle {0}.".format(cycle))
+            last = matches[-1]
+
+        # A run of records starts with one holding the whole state, so replaying from it
+        # never mixes records saved after restoring an earlier checkpoint.
+        first = max(position for position in range(0, last + 1) if self._records[position][1])
+        image = None
+        for record in self._records[first:last + 1]:
+            image = self._read(image, record)
+
+        memories = []
+        for gate, kind, contents in zip(self._memories, self._kinds, image.memories):
+            storage = gate.memory
+            if kind is DictStorage:
+                memories.append(dict(contents))
+            elif kind is ArrayStorage:
+                memories.append(bytes(contents))
+            else:
+                memories.append(dict(
+                    (number, ArrayStorage(storage.page_size, storage.width, storage.fill, bytearray(data)))
+                    for number, data in contents.items()
+                ))
+
+        self.simulator.restore(Snapshot(self._records[last][0], image.wires, image.flops, memories, image.pending))
+        self._previous = None
+
+    def __call__(self, cycle):
+        """
+            Save a checkpoint if the cycle count is a multiple of the interval.
+        """
+        if cycle % self.interval == 0:
+            self.save()
+
+    def close(self):
+        """
+            Stop saving checkpoints, and close the file.
+        """
+        if self in self.simulator.monitors:
+            self.simulator.monitors.remove(self)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,343 @@
+"""
+    Compile a list of gates into straight-line Python code.
+
+    Each phase (``eval``, ``tick`` and ``tock``) becomes one generated function. The
+    value and x-mask of every wire are loaded into local variables the first time a
+    phase uses them, and written back when the phase ends. Gates the compiler does not
+    know are called as usual, after the pending values have been written back.
+"""
+from pyhdl.primitives import *
+from pyhdl.utils import HDLError
+from pyhdl.wire import Wire, ConstantWire, _resolve
+import six
+
+
+class _Phase(object):
+    """
+        The code generated for one phase.
+
+        :param names: The names given to the wires and gates, shared between phases.
+        :type names: dict
+        :param namespace: The globals of the generated code, shared between phases.
+        :type namespace: dict
+    """
+
+    def __init__(self, names, namespace):
+        self.names = names
+        self.namespace = namespace
+        self.lines = []
+        self.loaded = set()
+        self.dirty = set()
+        self.temps = 0
+
+    def name(self, obj, prefix):
+        """
+            The global name of a wire or gate.
+        """
+        key = id(obj)
+        if key not in self.names:
+            self.names[key] = '{0}{1}'.format(prefix, len(self.names))
+            self.namespace[self.names[key]] = obj
+        return self.names[key]
+
+    def temp(self):
+        """
+            A new local variable.
+        """
+        self.temps += 1
+        return 't{0}'.format(self.temps)
+
+    def load(self, root):
+        """
+            Load a root wire into local variables, and return its name.
+        """
+        if not isinstance(root, Wire):
+            raise HDLError("Cannot compile a gate connected to {0!r}.".format(root))
+
+        name = self.name(root, 'w')
+        if name not in self.loaded:
+            self.lines.append('v{0}, x{0} = {0}._value, {0}._xmask'.format(name))
+            self.loaded.add(name)
+        return name
+
+    def read(self, wire):
+        """
+            Return the ``(value, xmask)`` expressions for a wire.
+        """
+        root, shift, width = _resolve(wire)
+        mask = (1 << width) - 1
+
+        if isinstance(root, ConstantWire):
+            value, xmask = root.bits
+            return str((value >> shift) & mask), str((xmask >> shift) & mask)
+
+        name = self.load(root)
+        value, xmask = 'v' + name, 'x' + name
+        if shift:
+            value = '({0} >> {1})'.format(value, shift)
+            xmask = '({0} >> {1})'.format(xmask, shift)
+        if width != len(root):
+            value = '({0} & {1})'.format(value, mask)
+            xmask = '({0} & {1})'.format(xmask, mask)
+        return value, xmask
+
+    def write(self, wire, value, xmask):
+        """
+            Return the lines writing the ``(value, xmask)`` expressions to a wire.
+            The expressions must already fit the width of the wire.
+        """
+        root, shift, width = _resolve(wire)
+        name = self.load(root)
+        self.dirty.add(name)
+
+        if width == len(root):
+            return ['v{0} = {1}'.format(name, value), 'x{0} = {1}'.format(name, xmask)]
+
+        keep = ((1 << len(root)) - 1) ^ (((1 << width) - 1) << shift)
+        return [
+            'v{0} = (v{0} & {1}) | ({2} << {3})'.format(name, keep, value, shift),
+            'x{0} = (x{0} & {1}) | ({2} << {3})'.format(name, keep, xmask, shift),
+        ]
+
+    def bind(self, lines, expression):
+        """
+            Append a line assigning an expression to a new local variable, and return it.
+        """
+        name = self.temp()
+        lines.append('{0} = {1}'.format(name, expression))
+        return name
+
+    def flush(self):
+        """
+            Write modified local variables back to their wires.
+        """
+        for name in sorted(self.dirty):
+            if self.namespace[name]._watchers is None:
+                self.lines.append('{0}._value, {0}._xmask, {0}._string = v{0}, x{0}, None'.format(name))
+            else:
+                self.lines.append('{0}.bits = (v{0}, x{0})'.format(name))
+        self.dirty.clear()
+
+    def call(self, gate, method):
+        """
+            Call a method of a gate the compiler does not know.
+        """
+        self.flush()
+        self.lines.append('{0}.{1}()'.format(self.name(gate, 'g'), method))
+        self.loaded.clear()
+
+    def build(self, function):
+        """
+            Return the source of the generated function.
+        """
+        self.flush()
+        body = self.lines or ['pass']
+        return 'def {0}():\n{1}\n'.format(function, '\n'.join('    ' + line for line in body))
+
+
+def _indent(lines):
+    return ['    ' + line for line in lines]
+
+
+def _emit_simple(gate, phase):
+    inputs = [phase.read(getattr(gate, signal)) for signal in gate.signals]
+    mask = (1 << len(gate.out)) - 1
+    lines = []
+
+    value = inputs[0][0]
+    for other, _ in inputs[1:]:
+        value = '({0} {1} {2})'.format(value, gate.operator, other)
+        if gate.inverted:
+            value = '(~{0} & {1})'.format(value, mask)
+
+    xmask = phase.bind(lines, ' | '.join(xmask for _, xmask in inputs))
+    return lines + phase.write(gate.out, '({0} & ~{1})'.format(value, xmask), xmask)
+
+
+def _emit_not(gate, phase):
+    value, xmask = phase.read(gate.inp)
+    lines = []
+    xmask = phase.bind(lines, xmask)
+    return lines + phase.write(gate.out, '(~({0} | {1}) & {2})'.format(value, xmask, gate.mask), xmask)
+
+
+def _emit_multiplexer(gate, phase):
+    selection, undefined = phase.read(gate.sel)
+    inputs = [phase.read(getattr(gate, signal)) for signal in gate.signals]
+
+    lines = []
+    value = phase.bind(lines, '({0},)[{1}]'.format(', '.join(value for value, _ in inputs), selection))
+    xmask = phase.bind(lines, '({0},)[{1}]'.format(', '.join(xmask for _, xmask in inputs), selection))
+
+    return ['if not {0}:'.format(undefined)] + _indent(lines + phase.write(gate.out, value, xmask))
+
+
+def _emit_demultiplexer(gate, phase):
+    selection, undefined = phase.read(gate.sel)
+    value, xmask = phase.read(gate.input)
+
+    lines = []
+    selection = phase.bind(lines, selection)
+    value = phase.bind(lines, value)
+    xmask = phase.bind(lines, xmask)
+
+    for way, signal in enumerate(gate.signals):
+        lines.extend(phase.write(
+            getattr(gate, signal),
+            '({0} if {1} == {2} else 0)'.format(value, selection, way),
+            '({0} if {1} == {2} else 0)'.format(xmask, selection, way),
+        ))
+
+    return ['if not {0}:'.format(undefined)] + _indent(lines)
+
+
+def _emit_half_adder(gate, phase):
+    a, a_xmask = phase.read(gate.a)
+    b, b_xmask = phase.read(gate.b)
+
+    lines = []
+    undefined = phase.bind(lines, '{0} | {1}'.format(a_xmask, b_xmask))
+    out = phase.bind(lines, '0 if {0} else {1} ^ {2}'.format(undefined, a, b))
+    carry = phase.bind(lines, '0 if {0} else {1} & {2}'.format(undefined, a, b))
+    xmask = phase.bind(lines, '1 if {0} else 0'.format(undefined))
+
+    return lines + phase.write(gate.out, out, xmask) + phase.write(gate.carry, carry, xmask)
+
+
+def _emit_full_adder(gate, phase):
+    a, a_xmask = phase.read(gate.a)
+    b, b_xmask = phase.read(gate.b)
+    cin, cin_xmask = phase.read(gate.cin)
+
+    lines = []
+    undefined = phase.bind(lines, '{0} | {1} | {2}'.format(a_xmask, b_xmask, cin_xmask))
+    total = phase.bind(lines, '{0} + {1} + {2}'.format(a, b, cin))
+    out = phase.bind(lines, '0 if {0} else {1} & 1'.format(undefined, total))
+    cout = phase.bind(lines, '0 if {0} else {1} >> 1'.format(undefined, total))
+    xmask = phase.bind(lines, '1 if {0} else 0'.format(undefined))
+
+    return lines + phase.write(gate.out, out, xmask) + phase.write(gate.cout, cout, xmask)
+
+
+def _emit_adder(gate, phase):
+    a, a_xmask = phase.read(gate.a)
+    b, b_xmask = phase.read(gate.b)
+
+    lines = []
+    undefined = phase.bind(lines, '{0} | {1}'.format(a_xmask, b_xmask))
+    value = phase.bind(lines, '0 if {0} else ({1} + {2}) & {3}'.format(undefined, a, b, gate.size))
+    xmask = phase.bind(lines, '{0} if {1} else 0'.format(gate.size, undefined))
+
+    return lines + phase.write(gate.out, value, xmask)
+
+
+def _emit_ripple_carry_adder(gate, phase):
+    a, a_xmask = phase.read(gate.a)
+    b, b_xmask = phase.read(gate.b)
+    cin, cin_xmask = phase.read(gate.cin)
+
+    lines = []
+    undefined = phase.bind(lines, '{0} | {1} | {2}'.format(a_xmask, b_xmask, cin_xmask))
+    total = phase.bind(lines, '{0} + {1} + {2}'.format(a, b, cin))
+    defined = phase.bind(lines, '(({0} & -{0}) - 1) if {0} else {1}'.format(undefined, gate.size))
+    out = phase.bind(lines, '{0} & {1}'.format(total, defined))
+    xmask = phase.bind(lines, '{0} & ~{1}'.format(gate.size, defined))
+    cout = phase.bind(lines, '0 if {0} else {1} >> {2}'.format(undefined, total, gate.width))
+    cout_xmask = phase.bind(lines, '1 if {0} else 0'.format(undefined))
+
+    return lines + phase.write(gate.out, out, xmask) + phase.write(gate.cout, cout, cout_xmask)
+
+
+def _emit_lookup_table(gate, phase):
+    inputs = [phase.read(getattr(gate, signal)) for signal in gate.signals]
+    row = ' | '.join('({0} << {1})'.format(value, shift) if shift else value for shift, (value, _) in enumerate(inputs))
+
+    lines = []
+    undefined = phase.bind(lines, ' | '.join(xmask for _, xmask in inputs))
+    value = phase.bind(lines, '0 if {0} else ({1} >> ({2})) & 1'.format(undefined, hex(gate.table), row))
+    xmask = phase.bind(lines, '1 if {0} else 0'.format(undefined))
+
+    return lines + phase.write(gate.out, value, xmask)
+
+
+def _emit_flop_tick(gate, phase):
+    value, xmask = phase.read(gate.input)
+    return ['{0}._state = ({1}, {2})'.format(phase.name(gate, 'g'), value, xmask)]
+
+
+def _emit_register_tick(gate, phase):
+    write, undefined = phase.read(gate.write)
+    lines = _emit_flop_tick(gate, phase)
+    return ['if {0} == 1 and not {1}:'.format(write, undefined)] + _indent(lines)
+
+
+def _emit_flop_tock(gate, phase):
+    lines = []
+    value = phase.temp()
+    xmask = phase.temp()
+    lines.append('{0}, {1} = {2}._state'.format(value, xmask, phase.name(gate, 'g')))
+    return lines + phase.write(gate.output, value, xmask)
+
+
+_emitters = {
+    'eval': {
+        NandGate: _emit_simple,
+        AndGate: _emit_simple,
+        NorGate: _emit_simple,
+        OrGate: _emit_simple,
+        XorGate: _emit_simple,
+        NotGate: _emit_not,
+        Multiplexer: _emit_multiplexer,
+        Demultiplexer: _emit_demultiplexer,
+        HalfAdder: _emit_half_adder,
+        FullAdder: _emit_full_adder,
+        Adder: _emit_adder,
+        RippleCarryAdder: _emit_ripple_carry_adder,
+        LookupTable: _emit_lookup_table,
+    },
+    'tick': {
+        DFF: _emit_flop_tick,
+        Register: _emit_register_tick,
+    },
+    'tock': {
+        DFF: _emit_flop_tock,
+        Register: _emit_flop_tock,
+    },
+}
+
+def _emit(gate, method, phase):
+    """
+        Generate the code running ``method`` on a gate.
+    """
+    emitter = _emitters[method].get(type(gate))
+    if emitter is None:
+        phase.call(gate, method)
+    else:
+        phase.lines.extend(emitter(gate, phase))
+
+
+def compile_gates(phases):
+    """
+        Compile the steps of each phase into one function per phase.
+
+        :param phases: A dictionary mapping the name of each phase to a list of
+                       ``(gate, method)`` steps, in the order they should run.
+        :type phases: dict
+        :returns: A dictionary mapping the name of each phase to a function.
+    """
+    names, namespace = {}, {}
+    sources = []
+
+    for name, steps in sorted(phases.items()):
+        phase = _Phase(names, namespace)
+        for gate, method in steps:
+            _emit(gate, method, phase)
+        sources.append(phase.build(name))
+
+    source = '\n'.join(sources)
+    six.exec_(compile(source, '<pyhdl compiled gates>', 'exec'), namespace)
+
+    functions = dict((name, namespace[name]) for name in phases)
+    for function in functions.values():
+        function.source = source
+    return functions
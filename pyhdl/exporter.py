@@ -0,0 +1,514 @@
+"""
+    Write gates as a structural netlist, in Verilog or BLIF.
+
+    Every root wire becomes one net. A net is named after the gate port driving it, such
+    as ``NandGate3_out``, or after the first gate port reading it if nothing drives it,
+    unless a name is given for it. Nets which no gate drives become the inputs of the
+    module, and nets with bits which no gate reads become its outputs. In Verilog, the
+    bits of a net which no gate drives, when other bits of it are driven, are set from an
+    extra input named after the net, such as ``bus_in``. Sequential gates are clocked by
+    an extra ``clk`` input. To export a simulator::
+
+        with open('top.v', 'w') as output:
+            write_verilog(sim.gates, output)
+"""
+from pyhdl.primitives import *
+from pyhdl.simulator import flatten_list
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, _resolve
+import re
+
+
+_keywords = set('''
+    always and assign begin case default else end endcase endmodule for if initial input
+    integer module nand nor not or output posedge reg wire xnor xor
+'''.split())
+
+
+def _ports(gate, signals):
+    return [_resolve(gate.view(signal)) for signal in signals or ()]
+
+
+class _Nets(object):
+    """
+        The names of the nets of a list of gates, and the direction of each net.
+    """
+
+    def __init__(self, gates, names):
+        self.names = {}
+        self.roots = []
+        used = set(['clk'])
+        self.driven, self.read = {}, {}
+
+        def unique(name):
+            name = re.sub(r'\W', '_', name)
+            if (not re.match(r'[A-Za-z_]', name)) or (name in _keywords):
+                name = 'n_' + name
+            unique, suffix = name, 1
+            while unique in used:
+                unique, suffix = '{0}_{1}'.format(name, suffix), suffix + 1
+            used.add(unique)
+            return unique
+
+        def add(root, name):
+            if isinstance(root, ConstantWire) or (id(root) in self.names):
+                return
+            self.names[id(root)] = unique(name)
+            self.roots.append(root)
+
+        for name, wire in sorted((names or {}).items()):
+            root, shift, width = _resolve(wire)
+            if width == len(root):
+                add(root, name)
+
+        for phase in ('outputs', 'inputs'):
+            for index, gate in enumerate(gates):
+                signals = getattr(gate, phase, None)
+                if signals is None:
+                    raise HDLError("Cannot export {0}, which does not declare its ports.".format(type(gate).__name__))
+                masks = self.driven if phase == 'outputs' else self.read
+                for signal in signals:
+                    root, shift, width = _resolve(gate.view(signal))
+                    masks[id(root)] = masks.get(id(root), 0) | (((1 << width) - 1) << shift)
+                    add(root, '{0}{1}_{2}'.format(type(gate).__name__, index, signal))
+
+        self.inputs = [root for root in self.roots if not self.driven.get(id(root))]
+        self.outputs = [root for root in self.roots if self.driven.get(id(root), 0) & ~self.read.get(id(root), 0)]
+        self.input_ids = set(id(root) for root in self.inputs)
+        self.output_ids = set(id(root) for root in self.outputs)
+
+        # The bits of a net which no gate drives are inputs, even if other bits are driven,
+        # so each such net gets an extra input holding them, named after the net.
+        self.free = []
+        for root in self.roots:
+            undriven = ((1 << len(root)) - 1) & ~self.driven.get(id(root), 0)
+            if undriven and id(root) not in self.input_ids:
+                self.free.append((root, unique(self.name(root) + '_in'), undriven))
+
+    def name(self, root):
+        return self.names[id(root)]
+
+
+def _bits(root, shift, width):
+    value, xmask = root.bits
+    mask = (1 << width) - 1
+    value, xmask = (value >> shift) & mask, (xmask >> shift) & mask
+    return ''.join(
+        'x' if (xmask >> bit) & 1 else str((value >> bit) & 1) for bit in reversed(range(0, width))
+    )
+
+
+# Verilog
+
+
+def _ref(nets, port):
+    root, shift, width = port
+    if isinstance(root, ConstantWire):
+        return "{0}'b{1}".format(width, _bits(root, shift, width))
+
+    name = nets.name(root)
+    if width == len(root):
+        return name
+    if width == 1:
+        return '{0}[{1}]'.format(name, shift)
+    return '{0}[{1}:{2}]'.format(name, shift + width - 1, shift)
+
+
+def _ranges(mask):
+    """
+        The runs of set bits of a mask, as ``(shift, width)`` pairs, least significant
+        first.
+    """
+    ranges, shift = [], 0
+    while mask:
+        while not mask & 1:
+            mask, shift = mask >> 1, shift + 1
+        width = 0
+        while mask & 1:
+            mask, width = mask >> 1, width + 1
+        ranges.append((shift, width))
+        shift += width
+    return ranges
+
+
+def _verilog_simple(gate, index, nets):
+    inputs = [_ref(nets, port) for port in _ports(gate, gate.inputs)]
+    value = inputs[0]
+    for other in inputs[1:]:
+        value = '({0} {1} {2})'.format(value, gate.operator, other)
+        if gate.inverted:
+            value = '~{0}'.format(value)
+    return ['assign {0} = {1};'.format(_ref(nets, _resolve(gate.out)), value)]
+
+
+def _verilog_not(gate, index, nets):
+    return ['assign {0} = ~{1};'.format(_ref(nets, _resolve(gate.out)), _ref(nets, _resolve(gate.inp)))]
+
+
+def _verilog_multiplexer(gate, index, nets):
+    ways = [_ref(nets, port) for port in _ports(gate, gate.signals)]
+    sel = _ref(nets, _resolve(gate.sel))
+    value = ways[-1]
+    for way in reversed(range(0, len(ways) - 1)):
+        value = '({0} == {1}) ? {2} : {3}'.format(sel, way, ways[way], value)
+    return ['assign {0} = {1};'.format(_ref(nets, _resolve(gate.out)), value)]
+
+
+def _verilog_demultiplexer(gate, index, nets):
+    sel, value = _ref(nets, _resolve(gate.sel)), _ref(nets, _resolve(gate.input))
+    return [
+        "assign {0} = ({1} == {2}) ? {3} : {4}'b0;".format(_ref(nets, port), sel, way, value, port[2])
+        for way, port in enumerate(_ports(gate, gate.signals))
+    ]
+
+
+def _verilog_half_adder(gate, index, nets):
+    return ['assign {{{0}, {1}}} = {2} + {3};'.format(*[_ref(nets, port) for port in _ports(gate, ('carry', 'out', 'a', 'b'))])]
+
+
+def _verilog_full_adder(gate, index, nets):
+    return ['assign {{{0}, {1}}} = {2} + {3} + {4};'.format(*[_ref(nets, port) for port in _ports(gate, ('cout', 'out', 'a', 'b', 'cin'))])]
+
+
+def _verilog_ripple_carry_adder(gate, index, nets):
+    return ['assign {{{0}, {1}}} = {2} + {3} + {4};'.format(*[_ref(nets, port) for port in _ports(gate, ('cout', 'out', 'a', 'b', 'cin'))])]
+
+
+def _verilog_adder(gate, index, nets):
+    return ['assign {0} = {1} + {2};'.format(*[_ref(nets, port) for port in _ports(gate, ('out', 'a', 'b'))])]
+
+
+def _verilog_flop(gate, index, nets):
+    width = len(gate.output)
+    reg = 'r{0}'.format(index)
+    lines = [
+        'reg [{0}:0] {1};'.format(width - 1, reg),
+        "initial {0} = {1}'b{2};".format(reg, width, gate.state.lower()),
+        'assign {0} = {1};'.format(_ref(nets, _resolve(gate.output)), reg),
+    ]
+    update = '{0} <= {1};'.format(reg, _ref(nets, _resolve(gate.input)))
+    if isinstance(gate, Register):
+        update = 'if ({0}) {1}'.format(_ref(nets, _resolve(gate.write)), update)
+    return lines + ['always @(posedge clk) {0}'.format(update)]
+
+
+#: The widest address of a memory exported with one word per address, when its storage
+#: has no depth.
+_max_address_width = 20
+
+
+def _verilog_memory(gate, index, nets):
+    width, depth = gate.width, getattr(gate.memory, 'depth', None)
+    if depth is None:
+        if len(gate.address) > _max_address_width:
+            raise HDLError("Cannot export a memory with a {0} bit address and no depth.".format(len(gate.address)))
+        depth = 1 << len(gate.address)
+    mem, reg = 'm{0}'.format(index), 'r{0}'.format(index)
+    address = _ref(nets, _resolve(gate.address))
+    return [
+        'reg [{0}:0] {1} [0:{2}];'.format(width - 1, mem, depth - 1),
+        'reg [{0}:0] {1};'.format(width - 1, reg),
+        'assign {0} = {1};'.format(_ref(nets, _resolve(gate.output)), reg),
+        'always @(posedge clk) begin',
+        '    if ({0}) {1}[{2}] = {3};'.format(_ref(nets, _resolve(gate.write)), mem, address, _ref(nets, _resolve(gate.input))),
+        '    {0} <= {1}[{2}];'.format(reg, mem, address),
+        'end',
+    ]
+
+
+def _verilog_lookup_table(gate, index, nets):
+    inputs = [_ref(nets, port) for port in _ports(gate, gate.signals)]
+    table = "{0}'h{1:x}".format(1 << len(inputs), gate.table)
+    return ['assign {0} = {1} >> {{{2}}};'.format(_ref(nets, _resolve(gate.out)), table, ', '.join(reversed(inputs)))]
+
+
+_verilog = {
+    NandGate: _verilog_simple,
+    AndGate: _verilog_simple,
+    NorGate: _verilog_simple,
+    OrGate: _verilog_simple,
+    XorGate: _verilog_simple,
+    NotGate: _verilog_not,
+    Multiplexer: _verilog_multiplexer,
+    Demultiplexer: _verilog_demultiplexer,
+    HalfAdder: _verilog_half_adder,
+    FullAdder: _verilog_full_adder,
+    Adder: _verilog_adder,
+    RippleCarryAdder: _verilog_ripple_carry_adder,
+    DFF: _verilog_flop,
+    Register: _verilog_flop,
+    Memory: _verilog_memory,
+    LookupTable: _verilog_lookup_table,
+}
+
+
+def write_verilog(gates, file, name='top', names=None):
+    """
+        Write gates as a structural Verilog module, with one continuous assignment per
+        combinational gate and one ``always`` block per sequential gate. The contents of
+        a ``Memory`` are not written, and it holds the number of words given by the depth
+        of its storage, or one word per address. A memory with no depth and an address
+        wider than 20 bits cannot be written. Undefined (``x``) bits may propagate differently in
+        Verilog than in PyHDL.
+
+        :param gates: An arbitrarily nested list of gates.
+        :param file: A file object opened for writing text.
+        :param name: The name of the module.
+        :param names: A dictionary mapping names to wires, to name those nets.
+    """
+    gates = flatten_list(gates)
+    nets = _Nets(gates, names)
+    clocked = any(isinstance(gate, (DFF, Register, Memory)) for gate in gates)
+
+    ports = (['clk'] if clocked else []) + [nets.name(root) for root in nets.inputs]
+    ports += [free for root, free, undriven in nets.free] + [nets.name(root) for root in nets.outputs]
+    lines = ['module {0}({1});'.format(name, ', '.join(ports))]
+    if clocked:
+        lines.append('input clk;')
+
+    for root in nets.roots:
+        kind = 'input' if id(root) in nets.input_ids else 'output' if id(root) in nets.output_ids else 'wire'
+        width = '' if len(root) == 1 else '[{0}:0] '.format(len(root) - 1)
+        lines.append('{0} {1}{2};'.format(kind, width, nets.name(root)))
+
+    for root, free, undriven in nets.free:
+        ranges = _ranges(undriven)
+        width = sum(bits for shift, bits in ranges)
+        lines.append('input {0}{1};'.format('' if width == 1 else '[{0}:0] '.format(width - 1), free))
+        targets = [_ref(nets, (root, shift, bits)) for shift, bits in reversed(ranges)]
+        target = targets[0] if len(targets) == 1 else '{{{0}}}'.format(', '.join(targets))
+        lines.append('assign {0} = {1};'.format(target, free))
+
+    for index, gate in enumerate(gates):
+        if type(gate) not in _verilog:
+            raise HDLError("Cannot export {0} to Verilog.".format(type(gate).__name__))
+        lines.extend(_verilog[type(gate)](gate, index, nets))
+
+    lines.append('endmodule')
+    file.write('\n'.join(lines) + '\n')
+
+
+# BLIF
+
+
+class _Blif(object):
+    """
+        The BLIF statements for a list of gates, one bit at a time.
+    """
+
+    def __init__(self, nets):
+        self.nets = nets
+        self.lines = []
+        self.temps = 0
+        self.constants = set()
+
+    def bit(self, port, bit):
+        """
+            The name of one bit of a port, least significant first.
+        """
+        root, shift, width = port
+        if isinstance(root, ConstantWire):
+            value = _bits(root, shift + bit, 1)
+            name = 'const{0}'.format(value)
+            self.constants.add(value)
+            return name
+
+        name = self.nets.name(root)
+        return name if len(root) == 1 else '{0}[{1}]'.format(name, shift + bit)
+
+    def temp(self):
+        self.temps += 1
+        return '_t{0}'.format(self.temps)
+
+    def names(self, inputs, output, cubes):
+        self.lines.append('.names {0}'.format(' '.join(list(inputs) + [output])))
+        self.lines.extend(cubes)
+
+
+_cubes = {
+    ('&', False): ['11 1'],
+    ('&', True): ['0- 1', '-0 1'],
+    ('|', False): ['1- 1', '-1 1'],
+    ('|', True): ['00 1'],
+    ('^', False): ['10 1', '01 1'],
+    ('^', True): ['00 1', '11 1'],
+}
+
+
+def _blif_simple(gate, blif):
+    inputs, out = _ports(gate, gate.inputs), _resolve(gate.out)
+    cubes = _cubes[(gate.operator, gate.inverted)]
+
+    for bit in range(0, out[2]):
+        value = blif.bit(inputs[0], bit)
+        if len(inputs) == 1:
+            blif.names([value], blif.bit(out, bit), ['1 1'])
+        for position, port in enumerate(inputs[1:], 2):
+            target = blif.bit(out, bit) if position == len(inputs) else blif.temp()
+            blif.names([value, blif.bit(port, bit)], target, cubes)
+            value = target
+
+
+def _blif_not(gate, blif):
+    inp, out = _resolve(gate.inp), _resolve(gate.out)
+    for bit in range(0, out[2]):
+        blif.names([blif.bit(inp, bit)], blif.bit(out, bit), ['0 1'])
+
+
+def _selections(sel, ways):
+    width = sel[2]
+    return [format(way, '0{0}b'.format(width)) if width else '' for way in range(0, ways)]
+
+
+def _blif_multiplexer(gate, blif):
+    sel, ways, out = _resolve(gate.sel), _ports(gate, gate.signals), _resolve(gate.out)
+    patterns = _selections(sel, len(ways))
+    selectors = [blif.bit(sel, bit) for bit in reversed(range(0, sel[2]))]
+
+    for bit in range(0, out[2]):
+        cubes = [
+            '{0}{1} 1'.format(pattern, ''.join('1' if other == way else '-' for other in range(0, len(ways))))
+            for way, pattern in enumerate(patterns)
+        ]
+        blif.names(selectors + [blif.bit(port, bit) for port in ways], blif.bit(out, bit), cubes)
+
+
+def _blif_demultiplexer(gate, blif):
+    sel, value, ways = _resolve(gate.sel), _resolve(gate.input), _ports(gate, gate.signals)
+    patterns = _selections(sel, len(ways))
+    selectors = [blif.bit(sel, bit) for bit in reversed(range(0, sel[2]))]
+
+    for way, port in enumerate(ways):
+        for bit in range(0, port[2]):
+            blif.names(selectors + [blif.bit(value, bit)], blif.bit(port, bit), ['{0}1 1'.format(patterns[way])])
+
+
+def _blif_add(blif, a, b, cin, out, cout):
+    inputs = [a, b] + ([cin] if cin is not None else [])
+    if cin is None:
+        blif.names(inputs, out, _cubes[('^', False)])
+        blif.names(inputs, cout, _cubes[('&', False)])
+    else:
+        blif.names(inputs, out, ['100 1', '010 1', '001 1', '111 1'])
+        blif.names(inputs, cout, ['11- 1', '1-1 1', '-11 1'])
+
+
+def _blif_half_adder(gate, blif):
+    a, b, out, carry = [blif.bit(port, 0) for port in _ports(gate, ('a', 'b', 'out', 'carry'))]
+    _blif_add(blif, a, b, None, out, carry)
+
+
+def _blif_full_adder(gate, blif):
+    a, b, cin, out, cout = [blif.bit(port, 0) for port in _ports(gate, ('a', 'b', 'cin', 'out', 'cout'))]
+    _blif_add(blif, a, b, cin, out, cout)
+
+
+def _blif_adder(gate, blif):
+    a, b, out = _ports(gate, ('a', 'b', 'out'))
+    carry = None
+    for bit in range(0, out[2]):
+        cout = blif.temp()
+        _blif_add(blif, blif.bit(a, bit), blif.bit(b, bit), carry, blif.bit(out, bit), cout)
+        carry = cout
+
+
+def _blif_ripple_carry_adder(gate, blif):
+    a, b, cin, out, cout = _ports(gate, ('a', 'b', 'cin', 'out', 'cout'))
+    carry = blif.bit(cin, 0)
+    for bit in range(0, out[2]):
+        carry_out = blif.bit(cout, 0) if bit == out[2] - 1 else blif.temp()
+        _blif_add(blif, blif.bit(a, bit), blif.bit(b, bit), carry, blif.bit(out, bit), carry_out)
+        carry = carry_out
+
+
+def _blif_lookup_table(gate, blif):
+    inputs = [blif.bit(port, 0) for port in _ports(gate, gate.signals)]
+    cubes = [
+        ''.join(str((row >> way) & 1) for way in range(0, len(inputs))) + ' 1'
+        for row in range(0, 1 << len(inputs)) if (gate.table >> row) & 1
+    ]
+    blif.names(inputs, blif.bit(_resolve(gate.out), 0), cubes)
+
+
+_latch_init = {'0': '0', '1': '1', 'x': '3'}
+
+# BLIF has no undefined constant, so an undefined bit is written as 0.
+_constants = {
+    '0': ['.names const0'],
+    '1': ['.names const1', '1'],
+    'x': ['.names constx'],
+}
+
+
+def _blif_flop(gate, blif):
+    value, out = _resolve(gate.input), _resolve(gate.output)
+    state = gate.state.lower()[::-1]
+    for bit in range(0, out[2]):
+        source = blif.bit(value, bit)
+        if isinstance(gate, Register):
+            target = blif.temp()
+            blif.names([blif.bit(_resolve(gate.write), 0), source, blif.bit(out, bit)], target, ['11- 1', '0-1 1'])
+            source = target
+        blif.lines.append('.latch {0} {1} re clk {2}'.format(source, blif.bit(out, bit), _latch_init[state[bit]]))
+
+
+_blif = {
+    NandGate: _blif_simple,
+    AndGate: _blif_simple,
+    NorGate: _blif_simple,
+    OrGate: _blif_simple,
+    XorGate: _blif_simple,
+    NotGate: _blif_not,
+    Multiplexer: _blif_multiplexer,
+    Demultiplexer: _blif_demultiplexer,
+    HalfAdder: _blif_half_adder,
+    FullAdder: _blif_full_adder,
+    Adder: _blif_adder,
+    RippleCarryAdder: _blif_ripple_carry_adder,
+    DFF: _blif_flop,
+    Register: _blif_flop,
+    LookupTable: _blif_lookup_table,
+}
+
+
+def write_blif(gates, file, name='top', names=None):
+    """
+        Write gates as a BLIF model, with one ``.names`` per bit of each combinational
+        gate and one ``.latch`` per bit of each ``DFF`` or ``Register``. The bits of a
+        net wider than one bit are named ``net[0]`` (least significant) upwards.
+        The latches are clocked by a ``clk`` input. ``Memory`` gates cannot be written.
+
+        :param gates: An arbitrarily nested list of gates.
+        :param file: A file object opened for writing text.
+        :param name: The name of the model.
+        :param names: A dictionary mapping names to wires, to name those nets.
+    """
+    gates = flatten_list(gates)
+    nets = _Nets(gates, names)
+    blif = _Blif(nets)
+
+    for gate in gates:
+        if type(gate) not in _blif:
+            raise HDLError("Cannot export {0} to BLIF.".format(type(gate).__name__))
+        _blif[type(gate)](gate, blif)
+
+    # Unlike a Verilog port, each bit of a net is an input or an output on its own.
+    def bits(select):
+        return ' '.join(
+            blif.bit((root, 0, len(root)), bit) for root in nets.roots for bit in range(0, len(root))
+            if select(nets.driven.get(id(root), 0) >> bit & 1, nets.read.get(id(root), 0) >> bit & 1)
+        )
+
+    inputs = bits(lambda driven, read: not driven)
+    if any(isinstance(gate, (DFF, Register)) for gate in gates):
+        inputs = ' '.join(['clk'] + ([inputs] if inputs else []))
+
+    lines = [
+        '.model {0}'.format(name),
+        '.inputs {0}'.format(inputs),
+        '.outputs {0}'.format(bits(lambda driven, read: driven and not read)),
+    ]
+    for value in sorted(blif.constants):
+        lines.extend(_constants[value])
+
+    file.write('\n'.join(lines + blif.lines + ['.end']) + '\n')
@@ -4,11 +4,20 @@
     tock() - Run on every tock.
     eval() - Run when input changes.
     view(signal) - View signal
+    inputs, outputs - The names of the signals read and written by the gate.
 """
 
 
 class Gate(object):
 
+    __slots__ = ()
+
+    #: The names of the signals read by the gate, or ``None`` if unknown.
+    inputs = None
+
+    #: The names of the signals written by the gate, or ``None`` if unknown.
+    outputs = None
+
     def tick():
         """
             Run on every tick.
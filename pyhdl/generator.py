@@ -0,0 +1,82 @@
+"""
+    Generate random netlists, to measure how simulators scale.
+"""
+from pyhdl.primitives import *
+from pyhdl.utils import HDLError
+from pyhdl.wire import Wire
+import random
+
+
+_kinds = (NandGate, AndGate, NorGate, OrGate, XorGate, NotGate)
+
+
+def random_netlist(gates, depth=16, width=1, fanout=1.0, sequential=0.0, inputs=None, kinds=_kinds, seed=0):
+    """
+        Build a random netlist with no combinational loops.
+
+        Every combinational gate is given a level from 1 to ``depth``, and reads wires
+        from lower levels. The primary inputs and the outputs of the ``DFF`` gates are at
+        level 0, and each ``DFF`` reads any wire, so sequential feedback is allowed.
+
+        The ``fanout`` exponent shapes which wires are read: 1 picks wires uniformly, and
+        larger values make a few wires drive most of the gates.
+
+        :param gates: The number of gates.
+        :type gates: int
+        :param depth: The number of levels of combinational gates.
+        :type depth: int
+        :param width: The width of every wire.
+        :type width: int
+        :param fanout: The fan-out exponent.
+        :type fanout: float
+        :param sequential: The fraction of the gates which are ``DFF`` gates.
+        :type sequential: float
+        :param inputs: The number of primary inputs, by default a tenth of the gates.
+        :type inputs: int
+        :param kinds: The combinational gate classes to choose from.
+        :param seed: The seed of the random number generator.
+        :returns: A tuple of the gates, the primary input wires, and the wires which no
+                  gate reads.
+    """
+    if (depth < 1) or (fanout <= 0) or not (0 <= sequential <= 1):
+        raise HDLError("Invalid netlist parameters.")
+
+    rng = random.Random(seed)
+    flops = int(round(gates * sequential))
+    combinational = gates - flops
+
+    primary = [Wire(width=width) for wire in range(0, max(inputs or gates // 10, 1))]
+    states = [Wire(width=width) for flop in range(0, flops)]
+    levels = sorted(rng.randint(1, depth) for gate in range(0, combinational))
+
+    pool = primary + states
+    available = len(pool)
+    read = set()
+    netlist = []
+
+    def pick():
+        wire = pool[int(available * rng.random() ** fanout)]
+        read.add(id(wire))
+        return wire
+
+    for position, level in enumerate(levels):
+        if position and (level != levels[position - 1]):
+            available = len(pool)
+
+        kind = rng.choice(kinds)
+        out = Wire(width=width)
+
+        if kind is NotGate:
+            netlist.append(NotGate(inp=pick(), out=out, width=width))
+        else:
+            netlist.append(kind(a=pick(), b=pick(), out=out, width=width))
+
+        pool.append(out)
+
+    available = len(pool)
+    for state in states:
+        netlist.append(DFF(input=pick(), output=state, default='0' * width))
+
+    rng.shuffle(netlist)
+    outputs = [wire for wire in pool[len(primary) + flops:] if id(wire) not in read]
+    return netlist, primary, outputs
@@ -0,0 +1,296 @@
+"""
+    Read netlists in the BLIF and ISCAS ``.bench`` formats.
+
+    Both readers work through the file one line at a time, creating wires the first
+    time they are named, so they take time linear in the size of the file. Every signal
+    is one bit wide.
+"""
+from pyhdl.primitives import *
+from pyhdl.primitives import _SimpleCombinatorial
+from pyhdl.simulator import Simulator
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, Wire
+import os
+import re
+
+
+_simple = {
+    'and': AndGate,
+    'or': OrGate,
+    'xor': XorGate,
+}
+
+_inverted = {
+    'nand': 'and',
+    'nor': 'or',
+    'xnor': 'xor',
+}
+
+_ways = len(_SimpleCombinatorial.attributes)
+
+
+class Netlist(object):
+    """
+        A netlist read from a file.
+
+        :ivar gates: The gates.
+        :ivar wires: A dictionary mapping the names of the signals to their wires.
+        :ivar inputs: The names of the primary inputs.
+        :ivar outputs: The names of the primary outputs.
+        :ivar name: The name of the model, if the file gives one.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.gates = []
+        self.wires = {}
+        self.inputs = []
+        self.outputs = []
+
+    def wire(self, name):
+        """
+            The wire with a name, created the first time it is asked for.
+        """
+        wire = self.wires.get(name)
+        if wire is None:
+            wire = self.wires[name] = Wire()
+        return wire
+
+    def _temp(self):
+        return Wire()
+
+    def gate(self, kind, inputs, out):
+        """
+            Add the gates computing a logic function of the inputs.
+
+            :param kind: One of ``and``, ``or``, ``xor``, ``nand``, ``nor``, ``xnor``,
+                         ``not`` or ``buf``.
+            :param inputs: The input wires.
+            :param out: The output wire.
+        """
+        if kind == 'not':
+            self.gates.append(NotGate(inp=inputs[0], out=out))
+        elif (kind == 'buf') or ((kind in _simple) and (len(inputs) == 1)):
+            self.gates.append(OrGate(a=inputs[0], b=inputs[0], out=out))
+        elif kind in _simple:
+            if len(inputs) > _ways:
+                inputs = [self._reduce(kind, inputs[start:start + _ways]) for start in range(0, len(inputs), _ways)]
+                return self.gate(kind, inputs, out)
+
+            signals = _SimpleCombinatorial.attributes
+            wires = dict((signals[way], wire) for way, wire in enumerate(inputs))
+            self.gates.append(_simple[kind](out=out, ways=len(inputs), **wires))
+        elif (kind in ('nand', 'nor')) and (len(inputs) == 2):
+            gate = NandGate if kind == 'nand' else NorGate
+            self.gates.append(gate(a=inputs[0], b=inputs[1], out=out))
+        elif kind in _inverted:
+            # Simple gates fold their inputs pairwise, so an inverted gate with more
+            # than two inputs is built from the plain gate and an inverter.
+            self.gate('not', [self._reduce(_inverted[kind], inputs)], out)
+        else:
+            raise HDLError("Unknown gate {0!r}.".format(kind))
+
+    def _reduce(self, kind, inputs):
+        if len(inputs) == 1:
+            return inputs[0]
+        out = self._temp()
+        self.gate(kind, inputs, out)
+        return out
+
+    def simulator(self, **kwargs):
+        """
+            A :class:`~pyhdl.Simulator` for the gates, which takes the same keyword
+            arguments as the simulator.
+        """
+        return Simulator(self.gates, **kwargs)
+
+
+_assignment = re.compile(r'^\s*([^=\s]+)\s*=\s*([A-Za-z]+)\s*\((.*)\)\s*$')
+_port = re.compile(r'^\s*(INPUT|OUTPUT)\s*\(\s*([^)\s]+)\s*\)\s*$', re.IGNORECASE)
+
+
+def read_bench(lines):
+    """
+        Read a netlist in the ISCAS-85/89 ``.bench`` format.
+
+        :param lines: An iterable of lines, such as an open file.
+        :returns: A :class:`Netlist`.
+    """
+    netlist = Netlist()
+
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+
+        match = _port.match(line)
+        if match:
+            direction, name = match.groups()
+            netlist.wire(name)
+            (netlist.inputs if direction.upper() == 'INPUT' else netlist.outputs).append(name)
+            continue
+
+        match = _assignment.match(line)
+        if not match:
+            raise HDLError("Line {0}: cannot parse {1!r}.".format(number, line))
+
+        name, kind, arguments = match.groups()
+        kind = kind.lower()
+        inputs = [netlist.wire(argument.strip()) for argument in arguments.split(',') if argument.strip()]
+        out = netlist.wire(name)
+
+        if kind == 'dff':
+            netlist.gates.append(DFF(input=inputs[0], output=out, default='0'))
+        elif kind == 'buff':
+            netlist.gate('buf', inputs, out)
+        else:
+            try:
+                netlist.gate(kind, inputs, out)
+            except HDLError:
+                raise HDLError("Line {0}: unknown gate {1!r}.".format(number, kind))
+
+    return netlist
+
+
+def _statements(lines):
+    """
+        Join BLIF continuation lines and drop comments. Yields ``(number, tokens)``.
+    """
+    pending, start = [], None
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].rstrip()
+        if start is None:
+            start = number
+
+        if line.endswith('\\'):
+            pending.append(line[:-1])
+            continue
+
+        tokens = ' '.join(pending + [line]).split()
+        pending = []
+        if tokens:
+            yield start, tokens
+        start = None
+
+
+_latch_defaults = {'0': '0', '1': '1', '2': 'x', '3': 'x'}
+
+
+def read_blif(lines):
+    """
+        Read the first model of a netlist in the Berkeley Logic Interchange Format. Logic
+        functions given by ``.names`` are built from simple gates, and ``.latch`` becomes
+        a ``DFF``, which starts undefined unless an initial value of 0 or 1 is given.
+        Hierarchical models (``.subckt``) are not supported.
+
+        :param lines: An iterable of lines, such as an open file.
+        :returns: A :class:`Netlist`.
+    """
+    netlist = Netlist()
+    cover = None
+
+    def finish(cover):
+        if cover is not None:
+            _build_cover(netlist, *cover)
+
+    for number, tokens in _statements(lines):
+        keyword = tokens[0]
+
+        if not keyword.startswith('.'):
+            if cover is None:
+                raise HDLError("Line {0}: cube outside of .names.".format(number))
+            cover[2].append(tokens)
+            continue
+
+        finish(cover)
+        cover = None
+
+        if keyword == '.model':
+            netlist.name = tokens[1] if len(tokens) > 1 else None
+        elif keyword == '.inputs':
+            for name in tokens[1:]:
+                netlist.inputs.append(name)
+                netlist.wire(name)
+        elif keyword == '.outputs':
+            for name in tokens[1:]:
+                netlist.outputs.append(name)
+                netlist.wire(name)
+        elif keyword == '.names':
+            cover = (number, [netlist.wire(name) for name in tokens[1:]], [])
+        elif keyword == '.latch':
+            default = _latch_defaults.get(tokens[-1], 'x') if len(tokens) in (4, 6) else 'x'
+            netlist.gates.append(DFF(input=netlist.wire(tokens[1]), output=netlist.wire(tokens[2]), default=default))
+        elif keyword == '.end':
+            break
+        else:
+            raise HDLError("Line {0}: unsupported BLIF construct {1}.".format(number, keyword))
+
+    finish(cover)
+    return netlist
+
+
+def _build_cover(netlist, number, wires, cubes):
+    """
+        Build the gates for a ``.names`` cover: an OR of ANDs of the input literals.
+    """
+    inputs, out = wires[:-1], wires[-1]
+
+    if not cubes:
+        netlist.gate('buf', [ConstantWire('0')], out)
+        return
+
+    polarity = set(cube[-1] for cube in cubes)
+    if (len(polarity) != 1) or not (polarity <= set('01')):
+        raise HDLError("Line {0}: invalid output column in cover.".format(number))
+
+    terms = []
+    for cube in cubes:
+        pattern = cube[0] if inputs else ''
+        if len(pattern) != len(inputs) or (len(cube) != (2 if inputs else 1)):
+            raise HDLError("Line {0}: cube does not match the inputs.".format(number))
+
+        literals = []
+        for value, wire in zip(pattern, inputs):
+            if value == '1':
+                literals.append(wire)
+            elif value == '0':
+                inverted = netlist._temp()
+                netlist.gate('not', [wire], inverted)
+                literals.append(inverted)
+            elif value != '-':
+                raise HDLError("Line {0}: invalid literal {1!r}.".format(number, value))
+
+        if not literals:
+            # A cube of don't cares covers every input.
+            terms = None
+            break
+        terms.append(literals)
+
+    on = polarity == set('1')
+
+    if terms is None:
+        netlist.gate('buf', [ConstantWire('1' if on else '0')], out)
+    elif len(terms) == 1:
+        netlist.gate('and' if on else 'nand', terms[0], out)
+    else:
+        netlist.gate('or' if on else 'nor', [netlist._reduce('and', term) for term in terms], out)
+
+
+def load(path, format=None):
+    """
+        Read a netlist file. The format is taken from the extension of the file, unless
+        it is given as ``bench`` or ``blif``.
+
+        :param path: The path of the file.
+        :param format: The format of the file.
+        :returns: A :class:`Netlist`.
+    """
+    if format is None:
+        format = os.path.splitext(path)[1].lstrip('.').lower()
+
+    readers = {'bench': read_bench, 'blif': read_blif}
+    if format not in readers:
+        raise HDLError("Unknown netlist format {0!r}.".format(format))
+
+    with open(path) as lines:
+        return readers[format](lines)
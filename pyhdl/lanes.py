@@ -0,0 +1,286 @@
+"""
+    A simulator which evaluates many independent copies of a circuit at once.
+
+    Every wire holds a NumPy array with one value per lane, and each gate evaluates all
+    the lanes with a few vectorized operations. Requires NumPy.
+"""
+from pyhdl.primitives import *
+from pyhdl.primitives import _operators
+from pyhdl.simulator import flatten_list, _levelize
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, _resolve
+
+try:
+    import numpy
+    _zero, _one = numpy.uint64(0), numpy.uint64(1)
+except ImportError:
+    numpy = None
+
+
+def _eval_simple(gate, lanes):
+    inputs = [lanes.read(getattr(gate, signal)) for signal in gate.signals]
+    mask = numpy.uint64((1 << len(gate.out)) - 1)
+    combine = _operators[gate.operator]
+
+    value, xmask = inputs[0]
+    for other, other_xmask in inputs[1:]:
+        value = combine(value, other)
+        if gate.inverted:
+            value = ~value & mask
+        xmask = xmask | other_xmask
+
+    lanes.write(gate.out, value & ~xmask, xmask)
+
+
+def _eval_not(gate, lanes):
+    value, xmask = lanes.read(gate.inp)
+    lanes.write(gate.out, ~(value | xmask) & numpy.uint64(gate.mask), xmask)
+
+
+def _eval_multiplexer(gate, lanes):
+    selection, undefined = lanes.read(gate.sel)
+    inputs = [lanes.read(getattr(gate, signal)) for signal in gate.signals]
+    value, xmask = lanes.read(gate.out)
+
+    undefined = undefined != 0
+    choices = numpy.where(undefined, _zero, selection).astype(numpy.intp)
+
+    lanes.write(
+        gate.out,
+        numpy.where(undefined, value, numpy.choose(choices, [v for v, _ in inputs])),
+        numpy.where(undefined, xmask, numpy.choose(choices, [x for _, x in inputs])),
+    )
+
+
+def _eval_demultiplexer(gate, lanes):
+    selection, undefined = lanes.read(gate.sel)
+    value, xmask = lanes.read(gate.input)
+    undefined = undefined != 0
+
+    for way, signal in enumerate(gate.signals):
+        old, old_xmask = lanes.read(getattr(gate, signal))
+        chosen = selection == way
+        lanes.write(
+            getattr(gate, signal),
+            numpy.where(undefined, old, numpy.where(chosen, value, _zero)),
+            numpy.where(undefined, old_xmask, numpy.where(chosen, xmask, _zero)),
+        )
+
+
+def _eval_half_adder(gate, lanes):
+    a, a_xmask = lanes.read(gate.a)
+    b, b_xmask = lanes.read(gate.b)
+
+    undefined = (a_xmask | b_xmask) != 0
+    xmask = numpy.where(undefined, _one, _zero)
+
+    lanes.write(gate.out, numpy.where(undefined, _zero, a ^ b), xmask)
+    lanes.write(gate.carry, numpy.where(undefined, _zero, a & b), xmask)
+
+
+def _eval_full_adder(gate, lanes):
+    a, a_xmask = lanes.read(gate.a)
+    b, b_xmask = lanes.read(gate.b)
+    cin, cin_xmask = lanes.read(gate.cin)
+
+    undefined = (a_xmask | b_xmask | cin_xmask) != 0
+    total = a + b + cin
+    xmask = numpy.where(undefined, _one, _zero)
+
+    lanes.write(gate.out, numpy.where(undefined, _zero, total & _one), xmask)
+    lanes.write(gate.cout, numpy.where(undefined, _zero, total >> _one), xmask)
+
+
+def _eval_adder(gate, lanes):
+    a, a_xmask = lanes.read(gate.a)
+    b, b_xmask = lanes.read(gate.b)
+
+    size = numpy.uint64(gate.size)
+    undefined = (a_xmask | b_xmask) != 0
+
+    lanes.write(
+        gate.out,
+        numpy.where(undefined, _zero, (a + b) & size),
+        numpy.where(undefined, size, _zero),
+    )
+
+
+def _tick_dff(gate, lanes):
+    lanes.state[gate] = lanes.read(gate.input)
+
+
+def _tick_register(gate, lanes):
+    write, undefined = lanes.read(gate.write)
+    value, xmask = lanes.read(gate.input)
+    old, old_xmask = lanes.state[gate]
+
+    enabled = (write == _one) & (undefined == _zero)
+    lanes.state[gate] = (numpy.where(enabled, value, old), numpy.where(enabled, xmask, old_xmask))
+
+
+def _tock_flop(gate, lanes):
+    value, xmask = lanes.state[gate]
+    lanes.write(gate.output, value, xmask)
+
+
+_kernels = {
+    NandGate: _eval_simple,
+    AndGate: _eval_simple,
+    NorGate: _eval_simple,
+    OrGate: _eval_simple,
+    XorGate: _eval_simple,
+    NotGate: _eval_not,
+    Multiplexer: _eval_multiplexer,
+    Demultiplexer: _eval_demultiplexer,
+    HalfAdder: _eval_half_adder,
+    FullAdder: _eval_full_adder,
+    Adder: _eval_adder,
+}
+
+_flops = {
+    DFF: (_tick_dff, _tock_flop),
+    Register: (_tick_register, _tock_flop),
+}
+
+
+class LaneSimulator(object):
+    """
+        A simulator for many independent copies of a circuit.
+
+        Each wire holds one value per lane, starting with the value the wire had when the
+        simulator was created. Set the lanes of the inputs with :meth:`set`, call
+        :meth:`eval`, and read the lanes of the outputs with :meth:`get`. Wires must be at
+        most 64 bits wide, and ``Memory`` is not supported.
+
+        :param gates: An arbitrarily nested list of gates.
+        :type gates: list
+        :param lanes: The number of lanes.
+        :type lanes: int
+    """
+
+    def __init__(self, gates, lanes):
+        if numpy is None:
+            raise HDLError("LaneSimulator requires numpy.")
+
+        self.lanes = lanes
+        self.gates = flatten_list(gates)
+        self.schedule, self.loops = _levelize(self.gates)
+
+        self.values = {}
+        self.state = {}
+        self._combinatorial = []
+        self._sequential = []
+
+        for gate in self.schedule:
+            if type(gate) in _kernels:
+                self._combinatorial.append((_kernels[type(gate)], gate))
+            elif type(gate) in _flops:
+                self._sequential.append((_flops[type(gate)], gate))
+                self.state[gate] = self._broadcast(gate._state)
+            else:
+                raise HDLError("LaneSimulator cannot simulate {0}.".format(type(gate).__name__))
+
+    def _broadcast(self, bits):
+        return (
+            numpy.full(self.lanes, bits[0], dtype=numpy.uint64),
+            numpy.full(self.lanes, bits[1], dtype=numpy.uint64),
+        )
+
+    def _root(self, wire):
+        root, shift, width = _resolve(wire)
+        if len(root) > 64:
+            raise HDLError("LaneSimulator only supports wires up to 64 bits wide.")
+
+        if root not in self.values:
+            if isinstance(root, ConstantWire):
+                value, xmask = root.bits
+                self.values[root] = (numpy.uint64(value), numpy.uint64(xmask))
+            else:
+                self.values[root] = self._broadcast(root.bits)
+
+        return root, shift, width
+
+    def read(self, wire):
+        """
+            The ``(values, xmasks)`` arrays of a wire.
+
+            :param wire: The wire to read.
+        """
+        root, shift, width = self._root(wire)
+        value, xmask = self.values[root]
+
+        if width == len(root):
+            return value, xmask
+
+        shift, mask = numpy.uint64(shift), numpy.uint64((1 << width) - 1)
+        return (value >> shift) & mask, (xmask >> shift) & mask
+
+    def write(self, wire, values, xmasks=0):
+        """
+            Set the lanes of a wire.
+
+            :param wire: The wire to write.
+            :param values: The value of every lane.
+            :param xmasks: The undefined bits of every lane.
+        """
+        root, shift, width = self._root(wire)
+        if isinstance(root, ConstantWire):
+            raise HDLError("Cannot write to a ConstantWire.")
+
+        mask = numpy.uint64((1 << width) - 1)
+        values = numpy.broadcast_to(numpy.asarray(values, dtype=numpy.uint64) & mask, (self.lanes,))
+        xmasks = numpy.broadcast_to(numpy.asarray(xmasks, dtype=numpy.uint64) & mask, (self.lanes,))
+
+        if width == len(root):
+            self.values[root] = (values, xmasks)
+            return
+
+        value, xmask = self.values[root]
+        shift = numpy.uint64(shift)
+        keep = ~(mask << shift)
+        self.values[root] = (
+            (value & keep) | (values << shift),
+            (xmask & keep) | (xmasks << shift),
+        )
+
+    def set(self, wire, values):
+        """
+            Set the (unsigned) integer value of every lane of a wire.
+
+            :param wire: The wire to set.
+            :param values: A sequence with one value per lane, or a single value for all lanes.
+        """
+        self.write(wire, values)
+
+    def get(self, wire):
+        """
+            The (unsigned) integer value of every lane of a wire.
+
+            :param wire: The wire to read.
+        """
+        value, xmask = self.read(wire)
+        if numpy.any(xmask):
+            raise HDLError("Wire has undefined bits.")
+        return numpy.array(value, dtype=numpy.uint64)
+
+    def eval(self):
+        """
+            Evaluate all the gates, in every lane.
+        """
+        for kernel, gate in self._combinatorial:
+            kernel(gate, self)
+
+    def tick(self):
+        """
+            Send a tick to the sequential gates, in every lane.
+        """
+        for (tick, tock), gate in self._sequential:
+            tick(gate, self)
+
+    def tock(self):
+        """
+            Send a tock to the sequential gates, and evaluate the gates, in every lane.
+        """
+        for (tick, tock), gate in self._sequential:
+            tock(gate, self)
+        self.eval()
@@ -0,0 +1,526 @@
+"""
+    Simplify a list of gates before simulating it.
+
+    :func:`optimize` folds the gates whose inputs are constant, simplifies the gates with
+    some constant inputs, and removes the gates whose outputs nothing reads.
+    :func:`collapse` replaces cones of small gates with lookup tables, and
+    :func:`recover_adders` replaces chains of full adders with word level adders.
+"""
+from collections import defaultdict
+from pyhdl.primitives import *
+from pyhdl.primitives import _operators
+from pyhdl.simulator import _is_combinatorial, _levelize, _ports, flatten_list
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, _resolve
+
+
+_foldable = (
+    NandGate, AndGate, NorGate, OrGate, XorGate, NotGate, Multiplexer, Demultiplexer,
+    HalfAdder, FullAdder, Adder,
+)
+
+
+class _Constants(object):
+    """
+        The bits of each root wire whose values are known not to change, and whether an
+        input which fixes a gate's output may be folded.
+    """
+
+    def __init__(self, controlling=False):
+        self.known = defaultdict(int)
+        self.controlling = controlling
+
+    def value(self, wire):
+        """
+            The ``(value, xmask)`` of a wire, if all its bits are known, or None.
+        """
+        root, shift, width = _resolve(wire)
+        mask = ((1 << width) - 1) << shift
+        if isinstance(root, ConstantWire) or (self.known[root] & mask == mask):
+            return wire.bits
+        return None
+
+    def defined(self, wire):
+        """
+            The value of a wire, if all its bits are known and defined, or None.
+        """
+        bits = self.value(wire)
+        if (bits is None) or bits[1]:
+            return None
+        return bits[0]
+
+    def fix(self, wire, bits=None):
+        """
+            Mark the bits of a wire as known, optionally setting their value first.
+        """
+        if bits is not None:
+            wire.bits = bits
+        root, shift, width = _resolve(wire)
+        self.known[root] |= ((1 << width) - 1) << shift
+
+
+def _buffer(source, out):
+    return OrGate(a=source, out=out, ways=1)
+
+
+def _simplify_simple(gate, constants):
+    values = [constants.defined(way) for way in gate._ways]
+    full = gate.mask
+    controlling = 0 if gate.operator == '&' else full if gate.operator == '|' else None
+    if not constants.controlling:
+        controlling = None
+
+    if not gate.inverted:
+        if (controlling is not None) and (controlling in values):
+            constants.fix(gate.out, (controlling, 0))
+            return None
+
+        identity = full if gate.operator == '&' else 0
+        remaining = [way for way, value in zip(gate._ways, values) if value != identity]
+        if len(remaining) == len(values):
+            return gate
+        letters = dict(zip(gate.attributes, remaining))
+        return type(gate)(out=gate.out, ways=len(remaining), **letters)
+
+    if len(values) != 2:
+        # Inverted gates fold their inputs pairwise, so only two input gates are simplified.
+        return gate
+
+    if (controlling is not None) and (controlling in values):
+        constants.fix(gate.out, (~controlling & full, 0))
+        return None
+
+    identity = full if gate.operator == '&' else 0
+    for value, other in ((values[0], gate._ways[1]), (values[1], gate._ways[0])):
+        if value == identity:
+            return NotGate(inp=other, out=gate.out)
+    return gate
+
+
+def _simplify_multiplexer(gate, constants):
+    selection = constants.defined(gate.sel)
+    if (selection is None) or (selection >= len(gate._ways)):
+        return gate
+    return _buffer(gate._ways[selection], gate.out)
+
+
+def _simplify_demultiplexer(gate, constants):
+    selection = constants.defined(gate.sel)
+    if (selection is None) or (selection >= len(gate._ways)):
+        return gate
+
+    for way, wire in enumerate(gate._ways):
+        if way != selection:
+            constants.fix(wire, (0, 0))
+    return _buffer(gate.input, gate._ways[selection])
+
+
+_simplifiers = {
+    NandGate: _simplify_simple,
+    AndGate: _simplify_simple,
+    NorGate: _simplify_simple,
+    OrGate: _simplify_simple,
+    XorGate: _simplify_simple,
+    Multiplexer: _simplify_multiplexer,
+    Demultiplexer: _simplify_demultiplexer,
+}
+
+
+def _fold(gate, constants):
+    """
+        Simplify a gate, returning the gate which replaces it, or None if its outputs are
+        constant. The outputs of a gate which is removed are set to their values.
+    """
+    while True:
+        if all(constants.value(gate.view(signal)) is not None for signal in gate.inputs):
+            gate.eval()
+            for signal in gate.outputs:
+                constants.fix(gate.view(signal))
+            return None
+
+        simplify = _simplifiers.get(type(gate))
+        simpler = gate if simplify is None else simplify(gate, constants)
+        if (simpler is None) or (simpler is gate):
+            return simpler
+        gate = simpler
+
+
+def _live(gates, keep):
+    """
+        The gates whose outputs are read by a sequential gate, by a gate whose wires are
+        unknown, or from one of the wires to keep. Without ``keep``, the bits which no
+        gate reads are kept.
+    """
+    live, drivers, work = set(), defaultdict(list), []
+    reads = defaultdict(int)
+
+    if keep is None:
+        keep, unread = [], defaultdict(int)
+        for gate in gates:
+            for root, mask in _ports(gate, getattr(gate, 'inputs', None) or ()):
+                unread[root] |= mask
+        for gate in gates:
+            if _is_combinatorial(gate):
+                for root, mask in _ports(gate, gate.outputs):
+                    if mask & ~unread[root]:
+                        reads[root] |= mask & ~unread[root]
+                        work.append((root, mask & ~unread[root]))
+
+    def read(root, mask):
+        if mask & ~reads[root]:
+            reads[root] |= mask
+            work.append((root, mask))
+
+    for position, gate in enumerate(gates):
+        if _is_combinatorial(gate):
+            for root, mask in _ports(gate, gate.outputs):
+                drivers[root].append((mask, position))
+        else:
+            live.add(position)
+            for root, mask in _ports(gate, getattr(gate, 'inputs', None) or ()):
+                read(root, mask)
+
+    for wire in keep:
+        root, shift, width = _resolve(wire)
+        read(root, ((1 << width) - 1) << shift)
+
+    while work:
+        root, mask = work.pop()
+        for out, position in drivers.get(root, ()):
+            if (out & mask) and (position not in live):
+                live.add(position)
+                for other, bits in _ports(gates[position], gates[position].inputs):
+                    read(other, bits)
+
+    return [gate for position, gate in enumerate(gates) if position in live]
+
+
+def optimize(gates, keep=None, controlling=False):
+    """
+        Simplify a list of gates, returning a new list for a
+        :class:`~pyhdl.Simulator`. The gates given are not changed, but the outputs of
+        gates which are folded away are set to their constant values.
+
+        - Combinational gates whose inputs are all constant are evaluated once and removed.
+        - Inputs of an ``AndGate``, ``OrGate`` or ``XorGate`` which do not affect its
+          output are dropped. Two input ``NandGate`` and ``NorGate`` gates become a
+          ``NotGate`` when one input does not affect the output.
+        - A ``Multiplexer`` or ``Demultiplexer`` with a constant selector becomes a buffer.
+        - Gates whose outputs are not read by a sequential gate, or by any wire in
+          ``keep``, are removed, unless some gate does not declare its wires. Without
+          ``keep``, the wires which no gate reads are kept.
+
+        These steps give the same values as the original gates, including undefined bits.
+        With ``controlling``, an ``AndGate``, ``OrGate``, ``NandGate`` or ``NorGate`` with an
+        input which fixes its output is removed too, even though the gate itself outputs
+        undefined bits while its other inputs are undefined.
+
+        :param gates: An arbitrarily nested list of gates.
+        :param keep: The wires which are observed, such as the outputs of the design.
+        :param controlling: Fold gates with an input which fixes their output.
+        :type controlling: bool
+        :returns: A list of gates.
+    """
+    gates = flatten_list(gates)
+
+    # Bits driven by more than one gate are never treated as constant.
+    driven, shared = defaultdict(int), defaultdict(int)
+    for gate in gates:
+        for root, mask in _ports(gate, getattr(gate, 'outputs', None) or ()):
+            shared[root] |= driven[root] & mask
+            driven[root] |= mask
+
+    constants = _Constants(controlling)
+    replaced = {}
+    for gate in _levelize(gates)[0]:
+        if (type(gate) not in _foldable) or any(shared[root] & mask for root, mask in _ports(gate, gate.outputs)):
+            continue
+        replaced[id(gate)] = _fold(gate, constants)
+
+    result = [replaced.get(id(gate), gate) for gate in gates]
+    result = [gate for gate in result if gate is not None]
+
+    if all(getattr(gate, 'inputs', None) is not None for gate in result):
+        result = _live(result, keep)
+    return result
+
+
+_collapsible = (NandGate, AndGate, NorGate, OrGate, XorGate, NotGate)
+
+
+def _pattern(leaf, leaves):
+    """
+        The column of a truth table over ``leaves`` inputs holding input ``leaf``.
+    """
+    half = 1 << leaf
+    block = ((1 << half) - 1) << half
+    return block * (((1 << (1 << leaves)) - 1) // ((1 << (2 * half)) - 1))
+
+
+def _bit_key(wire):
+    root, shift, width = _resolve(wire)
+    return root, shift
+
+
+def _truth_table(root, leaves, drivers):
+    """
+        The truth table of the output of ``root``, over the ``leaves`` of its cone.
+    """
+    full = (1 << (1 << len(leaves))) - 1
+    columns = dict((key, _pattern(leaf, len(leaves))) for leaf, key in enumerate(leaves))
+
+    def column(wire):
+        key = _bit_key(wire)
+        if key in columns:
+            return columns[key]
+        if isinstance(key[0], ConstantWire):
+            return full if wire.bits[0] else 0
+
+        gate = drivers[key]
+        if isinstance(gate, NotGate):
+            result = ~column(gate.inp) & full
+        else:
+            combine = _operators[gate.operator]
+            ways = iter(gate._ways)
+            result = column(next(ways))
+            for way in ways:
+                result = combine(result, column(way))
+                if gate.inverted:
+                    result = ~result & full
+        columns[key] = result
+        return result
+
+    return column(root.view(root.outputs[0]))
+
+
+def collapse(gates, max_inputs=12, keep=()):
+    """
+        Replace cones of one bit gates with a :class:`~pyhdl.LookupTable` each, so that a
+        simulator evaluates fewer gates. Returns a new list of gates, and does not change
+        the gates given.
+
+        A cone is a ``NandGate``, ``AndGate``, ``NorGate``, ``OrGate``, ``XorGate`` or
+        ``NotGate`` together with the gates driving it whose outputs are read by no gate
+        outside the cone, up to ``max_inputs`` input bits. Only gates whose wires are all one bit wide
+        are collapsed. The wires inside a cone are no longer driven, unless they are
+        listed in ``keep``.
+
+        :param gates: An arbitrarily nested list of gates.
+        :param max_inputs: The largest number of inputs of a lookup table, up to 26.
+        :type max_inputs: int
+        :param keep: The wires which are observed, such as the outputs of the design.
+        :returns: A list of gates.
+    """
+    gates = flatten_list(gates)
+    if not 1 <= max_inputs <= len(LookupTable.attributes):
+        raise HDLError("Lookup tables have from 1 to {0} inputs.".format(len(LookupTable.attributes)))
+    if any(getattr(gate, 'inputs', None) is None for gate in gates):
+        # Any wire may be read by a gate which does not declare its wires.
+        return gates
+
+    readers, drivers, shared = defaultdict(set), {}, set()
+    for position, gate in enumerate(gates):
+        for signal in gate.inputs:
+            readers[_bit_key(gate.view(signal))].add(position)
+        for signal in getattr(gate, 'outputs', None) or ():
+            key = _bit_key(gate.view(signal))
+            if key in drivers:
+                shared.add(key)
+            drivers[key] = gate
+
+    schedule, loops = _levelize(gates)
+    looped = set(id(gate) for loop in loops for gate in loop)
+
+    def candidate(gate):
+        if (type(gate) not in _collapsible) or (id(gate) in looped):
+            return False
+        for signal in gate.inputs + gate.outputs:
+            wire = gate.view(signal)
+            if (len(wire) != 1) or (isinstance(_resolve(wire)[0], ConstantWire) and wire.bits[1]):
+                return False
+        return _bit_key(gate.out) not in shared
+
+    visible = set(_bit_key(wire) for wire in keep if len(wire) == 1)
+    visible.update(
+        (_resolve(wire)[0], shift) for wire in keep if len(wire) > 1
+        for shift in range(_resolve(wire)[1], _resolve(wire)[1] + len(wire))
+    )
+
+    positions = dict((id(gate), position) for position, gate in enumerate(gates))
+
+    def internal(key, members):
+        """
+            Whether the gate driving a bit can be absorbed into a cone, because only the
+            gates of the cone read it.
+        """
+        gate = drivers.get(key)
+        return (gate is not None) and (key not in visible) and (readers[key] <= members) and candidate(gate)
+
+    replaced, absorbed = {}, set()
+    for gate in reversed(schedule):
+        if (id(gate) in absorbed) or not candidate(gate):
+            continue
+
+        cone, members, leaves, wires = [gate], set([positions[id(gate)]]), [], {}
+        for signal in gate.inputs:
+            wire = gate.view(signal)
+            key = _bit_key(wire)
+            if not isinstance(key[0], ConstantWire) and key not in wires:
+                leaves.append(key)
+                wires[key] = wire
+
+        grown = True
+        while grown:
+            grown = False
+            for key in list(leaves):
+                if not internal(key, members):
+                    continue
+                driver = drivers[key]
+                inputs = [driver.view(signal) for signal in driver.inputs]
+                new = [
+                    _bit_key(wire) for wire in inputs
+                    if not isinstance(_resolve(wire)[0], ConstantWire) and _bit_key(wire) not in wires
+                ]
+                if len(leaves) - 1 + len(set(new)) > max_inputs:
+                    continue
+
+                leaves.remove(key)
+                del wires[key]
+                for wire in inputs:
+                    other = _bit_key(wire)
+                    if not isinstance(other[0], ConstantWire) and other not in wires:
+                        leaves.append(other)
+                        wires[other] = wire
+                cone.append(driver)
+                members.add(positions[id(driver)])
+                grown = True
+
+        if len(cone) < 2:
+            continue
+
+        table = _truth_table(gate, leaves, drivers)
+        letters = dict(zip(LookupTable.attributes, [wires[key] for key in leaves]))
+        replaced[id(gate)] = LookupTable(table=table, out=gate.out, ways=len(leaves), **letters)
+        for other in cone[1:]:
+            absorbed.add(id(other))
+
+    return [replaced.get(id(gate), gate) for gate in gates if id(gate) not in absorbed]
+
+
+def _carry(stage):
+    return stage.carry if isinstance(stage, HalfAdder) else stage.cout
+
+
+def _word(stages, signal):
+    """
+        The wire holding a one bit signal of each stage, least significant first.
+    """
+    root, shift, width = _resolve(stages[0].view(signal))
+    if len(stages) == len(root):
+        return root
+    stop = len(root) - shift
+    return root[stop - len(stages):stop]
+
+
+def _follows(stage, previous):
+    """
+        Whether the bits of a stage sit just above those of the previous stage.
+    """
+    for signal in ('a', 'b', 'out'):
+        root, shift, width = _resolve(previous.view(signal))
+        if _resolve(stage.view(signal)) != (root, shift + 1, 1):
+            return False
+    return True
+
+
+def recover_adders(gates, keep=()):
+    """
+        Replace chains of ``FullAdder`` gates, optionally led by a ``HalfAdder``, with a
+        :class:`~pyhdl.RippleCarryAdder` each. Returns a new list of gates, and does not
+        change the gates given.
+
+        A chain links each stage's carry output to the carry input of the next stage, and
+        is only replaced where the operands and outputs of consecutive stages are
+        consecutive bits of a wire, least significant first. The carries inside a chain
+        are no longer driven, so a carry which another gate reads, or which is listed in
+        ``keep``, ends the chain.
+
+        :param gates: An arbitrarily nested list of gates.
+        :param keep: The wires which are observed, such as the outputs of the design.
+        :returns: A list of gates.
+    """
+    gates = flatten_list(gates)
+    if any(getattr(gate, 'inputs', None) is None for gate in gates):
+        return gates
+
+    readers, drivers = defaultdict(set), defaultdict(int)
+    for position, gate in enumerate(gates):
+        for signal in gate.inputs:
+            readers[_bit_key(gate.view(signal))].add(position)
+        for signal in getattr(gate, 'outputs', None) or ():
+            drivers[_bit_key(gate.view(signal))] += 1
+
+    visible = set(
+        (_resolve(wire)[0], shift) for wire in keep
+        for shift in range(_resolve(wire)[1], _resolve(wire)[1] + len(wire))
+    )
+
+    def stage(gate):
+        return (type(gate) in (HalfAdder, FullAdder)) and all(
+            len(gate.view(signal)) == 1 for signal in gate.inputs + gate.outputs
+        )
+
+    # The stage after each stage, linked through a carry which nothing else reads.
+    following, led = {}, set()
+    for position, gate in enumerate(gates):
+        if not stage(gate):
+            continue
+        key = _bit_key(_carry(gate))
+        if (key in visible) or (drivers[key] != 1) or (len(readers[key]) != 1):
+            continue
+        other = next(iter(readers[key]))
+        after = gates[other]
+        if (
+            isinstance(after, FullAdder) and stage(after) and (_bit_key(after.cin) == key)
+            and key not in (_bit_key(after.a), _bit_key(after.b))
+        ):
+            following[position] = other
+            led.add(other)
+
+    replaced, removed = {}, set()
+    for position, gate in enumerate(gates):
+        if (not stage(gate)) or (position in led):
+            continue
+
+        chain = [position]
+        while (chain[-1] in following) and (following[chain[-1]] not in chain):
+            chain.append(following[chain[-1]])
+
+        start = 0
+        while start < len(chain):
+            segment = [gates[chain[start]]]
+            inputs = set([_bit_key(segment[0].a), _bit_key(segment[0].b)])
+            outputs = set([_bit_key(segment[0].out), _bit_key(_carry(segment[0]))])
+
+            for other in chain[start + 1:]:
+                after = gates[other]
+                ins = set([_bit_key(after.a), _bit_key(after.b)])
+                outs = set([_bit_key(after.out), _bit_key(after.cout)])
+                # A stage reading an earlier stage's output would read it before it is set.
+                if (not _follows(after, segment[-1])) or (ins & outputs) or (outs & inputs):
+                    break
+                segment.append(after)
+                inputs |= ins
+                outputs |= outs
+
+            if len(segment) > 1:
+                head = segment[0]
+                cin = ConstantWire('0') if isinstance(head, HalfAdder) else head.cin
+                replaced[id(head)] = RippleCarryAdder(
+                    a=_word(segment, 'a'), b=_word(segment, 'b'), cin=cin,
+                    out=_word(segment, 'out'), cout=segment[-1].cout, width=len(segment),
+                )
+                removed.update(id(other) for other in segment[1:])
+            start += len(segment)
+
+    return [replaced.get(id(gate), gate) for gate in gates if id(gate) not in removed]
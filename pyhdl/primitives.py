@@ -2,12 +2,22 @@
     Primitive gates.
 """
 from pyhdl.gate import Gate
-from pyhdl.wire import Wire
-from six.moves import reduce
+from pyhdl.storage import ArrayStorage, DictStorage
+from pyhdl.wire import Wire, _parse, _render
+import operator
+
+
+_operators = {
+    '&': operator.and_,
+    '|': operator.or_,
+    '^': operator.xor,
+}
 
 
 class _Combinatorial(Gate):
 
+    __slots__ = ()
+
     def tick(self):
         self.eval()
 
@@ -15,29 +25,66 @@ class _Combinatorial(Gate):
         self.eval()
 
 
-class _SimpleCombinatorial(_Combinatorial):
+class _Sequential(Gate):
+
+    __slots__ = ()
+
+    def eval(self):
+        pass
+
+
+class _Lettered(_Combinatorial):
+    """
+        A gate with a variable number of signals, named from 'a' to 'z'.
+    """
+
+    __slots__ = ('signals', '_ways')
 
     attributes = 'abcdefghijklmnopqrstuvwxyz'
 
-    def __init__(self, width=1, ways=2, **kwargs):
-        self.signals = set([self.attributes[way] for way in range(0, ways)])
+    #: The signal names for each number of ways, shared between gates.
+    _names = {}
+
+    def _connect(self, ways, kwargs):
+        if ways not in self._names:
+            self._names[ways] = tuple(self.attributes[way] for way in range(0, ways))
+
+        self.signals = self._names[ways]
+        self._ways = tuple(kwargs[signal] for signal in self.signals)
+
+    def __getattr__(self, name):
+        if (len(name) == 1) and not name.startswith('_'):
+            way = self.attributes.find(name)
+            if 0 <= way < len(self._ways):
+                return self._ways[way]
+        raise AttributeError(name)
+
+
+class _SimpleCombinatorial(_Lettered):
+
+    __slots__ = ('inputs', 'out', 'mask')
 
-        for signal in self.signals:
-            wire = kwargs[signal]
-            setattr(self, signal, wire)
+    outputs = ('out',)
 
+    def __init__(self, width=1, ways=2, **kwargs):
+        self._connect(ways, kwargs)
+        self.inputs = self.signals
         self.out = kwargs['out']
+        self.mask = (1 << len(self.out)) - 1
 
     def eval(self):
-        vals = [getattr(self, signal).val for signal in self.signals]
-        computed = [reduce(self.biteval, seq) for seq in zip(*vals)]
-        self.out.val = ''.join(computed)
+        combine = _operators[self.operator]
+        wires = iter(self._ways)
 
-    def biteval(self, a, b):
-        if (a == "x") or (b == "x"):
-            return 'x'
-        else:
-            return self.evaluate(a, b)
+        value, xmask = next(wires).bits
+        for wire in wires:
+            other, other_xmask = wire.bits
+            value = combine(value, other)
+            if self.inverted:
+                value = ~value & self.mask
+            xmask |= other_xmask
+
+        self.out.bits = (value & ~xmask, xmask)
 
     def view(self, signal):
         if signal in self.signals:
@@ -52,11 +99,10 @@ class NandGate(_SimpleCombinatorial):
         A Nand Gate.
     """
 
-    def evaluate(self, a, b):
-        if (a == "1") and (b == "1"):
-            return "0"
-        else:
-            return "1"
+    __slots__ = ()
+
+    operator = '&'
+    inverted = True
 
 
 class AndGate(_SimpleCombinatorial):
@@ -64,11 +110,10 @@ class AndGate(_SimpleCombinatorial):
         An And gate.
     """
 
-    def evaluate(self, a, b):
-        if (a == "1") and (b == "1"):
-            return "1"
-        else:
-            return "0"
+    __slots__ = ()
+
+    operator = '&'
+    inverted = False
 
 
 class NorGate(_SimpleCombinatorial):
@@ -76,11 +121,10 @@ class NorGate(_SimpleCombinatorial):
         A Nor gate.
     """
 
-    def evaluate(self, a, b):
-        if (a == "1") or (b == "1"):
-            return "0"
-        else:
-            return "1"
+    __slots__ = ()
+
+    operator = '|'
+    inverted = True
 
 
 class OrGate(_SimpleCombinatorial):
@@ -88,11 +132,10 @@ class OrGate(_SimpleCombinatorial):
         An Or gate.
     """
 
-    def evaluate(self, a, b):
-        if (a == "1") or (b == "1"):
-            return "1"
-        else:
-            return "0"
+    __slots__ = ()
+
+    operator = '|'
+    inverted = False
 
 
 class XorGate(_SimpleCombinatorial):
@@ -100,11 +143,10 @@ class XorGate(_SimpleCombinatorial):
         A Xor gate.
     """
 
-    def evaluate(self, a, b):
-        if (a == "1") ^ (b == "1"):
-            return "1"
-        else:
-            return "0"
+    __slots__ = ()
+
+    operator = '^'
+    inverted = False
 
 
 class NotGate(_Combinatorial):
@@ -117,9 +159,15 @@ class NotGate(_Combinatorial):
         :type width: int
     """
 
+    __slots__ = ('inp', 'out', 'mask')
+
+    inputs = ('inp',)
+    outputs = ('out',)
+
     def __init__(self, inp, out, width=1):
         self.inp = inp
         self.out = out
+        self.mask = (1 << len(inp)) - 1
 
     def tick(self):
         pass
@@ -128,16 +176,8 @@ class NotGate(_Combinatorial):
         pass
 
     def eval(self):
-        computed = [self.evaluate(val) for val in self.inp.val]
-        self.out.val = ''.join(computed)
-
-    def evaluate(self, inp):
-        if inp == 'x':
-            return 'x'
-        elif inp == "1":
-            return "0"
-        else:
-            return "1"
+        value, xmask = self.inp.bits
+        self.out.bits = (~(value | xmask) & self.mask, xmask)
 
     def view(self, signal):
         if signal == "inp":
@@ -148,7 +188,7 @@ class NotGate(_Combinatorial):
             return None
 
 
-class Multiplexer(_Combinatorial):
+class Multiplexer(_Lettered):
     """
         A Multiplexer.
 
@@ -168,25 +208,23 @@ class Multiplexer(_Combinatorial):
         :type ways: int
     """
 
-    attributes = 'abcdefghijklmnopqrstuvwxyz'
+    __slots__ = ('inputs', 'out', 'sel')
 
-    def __init__(self, width=1, ways=2, **kwargs):
-        self.signals = [self.attributes[way] for way in range(0, ways)]
+    outputs = ('out',)
 
-        for signal in self.signals:
-            wire = kwargs[signal]
-            setattr(self, signal, wire)
+    def __init__(self, width=1, ways=2, **kwargs):
+        self._connect(ways, kwargs)
+        self.inputs = tuple(self.signals) + ('sel',)
 
         self.out = kwargs['out']
         self.sel = kwargs['sel']
 
     def eval(self):
-        if 'x' in self.sel.val:
+        selection, xmask = self.sel.bits
+        if xmask:
             return
         else:
-            vals = [getattr(self, signal).val for signal in self.signals]
-            selection = int(self.sel.val, 2)
-            self.out.val = vals[selection]
+            self.out.bits = self._ways[selection].bits
 
     def view(self, signal):
         if signal in self.signals:
@@ -199,7 +237,7 @@ class Multiplexer(_Combinatorial):
             return None
 
 
-class Demultiplexer(_Combinatorial):
+class Demultiplexer(_Lettered):
     """
         A Demultiplexer.
 
@@ -220,35 +258,31 @@ class Demultiplexer(_Combinatorial):
 
     """
 
-    attributes = 'abcdefghijklmnopqrstuvwxyz'
+    __slots__ = ('outputs', 'width', 'ways', 'input', 'sel')
+
+    inputs = ('input', 'sel')
 
     def __init__(self, width=1, ways=2, **kwargs):
         self.width = width
         self.ways = ways
 
-        self.signals = [self.attributes[way] for way in range(0, ways)]
-
-        for signal in self.signals:
-            wire = kwargs[signal]
-            setattr(self, signal, wire)
+        self._connect(ways, kwargs)
+        self.outputs = self.signals
 
         self.input = kwargs['input']
         self.sel = kwargs['sel']
 
 
     def eval(self):
-        if 'x' in self.sel.val:
+        selection, xmask = self.sel.bits
+        if xmask:
             return
         else:
-            selection = int(self.sel.val, 2)
-
-            for x in range(0, self.ways):
-                name = self.signals[x]
-
+            for x, wire in enumerate(self._ways):
                 if x == selection:
-                    getattr(self, name).val = self.input.val
+                    wire.bits = self.input.bits
                 else:
-                    getattr(self, name).val = '0' * self.width
+                    wire.bits = (0, 0)
 
     def view(self, signal):
         if signal in self.signals:
@@ -271,6 +305,11 @@ class HalfAdder(_Combinatorial):
         :param carry: The carry output from the half adder.
     """
 
+    __slots__ = ('a', 'b', 'out', 'carry')
+
+    inputs = ('a', 'b')
+    outputs = ('out', 'carry')
+
     def __init__(self, a, b, out, carry):
         self.a = a
         self.b = b
@@ -281,20 +320,16 @@ class HalfAdder(_Combinatorial):
 
 
     def eval(self):
-        if (self.a.val == 'x') or (self.b.val == 'x'):
-            self.out.val = 'x'
-            self.carry.val = 'x'
-            return
+        a, a_xmask = self.a.bits
+        b, b_xmask = self.b.bits
 
-        if (self.a.val == '1') ^ (self.b.val == '1'):
-            self.out.val = '1'
-        else:
-            self.out.val = '0'
+        if a_xmask or b_xmask:
+            self.out.bits = (0, 1)
+            self.carry.bits = (0, 1)
+            return
 
-        if (self.a.val == '1') and (self.b.val == '1'):
-            self.carry.val = '1'
-        else:
-            self.carry.val = '0'
+        self.out.bits = (a ^ b, 0)
+        self.carry.bits = (a & b, 0)
 
     def view(self, signal):
         if signal == "a":
@@ -320,16 +355,10 @@ class FullAdder(_Combinatorial):
         :param cout: The carry output from the half adder.
     """
 
-    values = {
-        ('0', '0', '0'): ('0', '0'),
-        ('0', '0', '1'): ('1', '0'),
-        ('0', '1', '0'): ('1', '0'),
-        ('0', '1', '1'): ('0', '1'),
-        ('1', '0', '0'): ('1', '0'),
-        ('1', '0', '1'): ('0', '1'),
-        ('1', '1', '0'): ('0', '1'),
-        ('1', '1', '1'): ('1', '1'),
-    }
+    __slots__ = ('a', 'b', 'cin', 'out', 'cout')
+
+    inputs = ('a', 'b', 'cin')
+    outputs = ('out', 'cout')
 
     def __init__(self, a, b, cin, out, cout):
         self.a = a
@@ -342,12 +371,18 @@ class FullAdder(_Combinatorial):
 
 
     def eval(self):
-        if (self.a.val == 'x') or (self.b.val == 'x') or (self.cin.val == 'x'):
-            self.out.val = 'x'
-            self.cout.val = 'x'
+        a, a_xmask = self.a.bits
+        b, b_xmask = self.b.bits
+        cin, cin_xmask = self.cin.bits
+
+        if a_xmask or b_xmask or cin_xmask:
+            self.out.bits = (0, 1)
+            self.cout.bits = (0, 1)
             return
 
-        self.out.val, self.cout.val = self.values[(self.a.val, self.b.val, self.cin.val)]
+        s = a + b + cin
+        self.out.bits = (s & 1, 0)
+        self.cout.bits = (s >> 1, 0)
 
     def view(self, signal):
         if signal == "a":
@@ -374,6 +409,10 @@ class Adder(_Combinatorial):
         :param width: The width of the adder.
     """
 
+    __slots__ = ('width', 'size', 'a', 'b', 'out')
+
+    inputs = ('a', 'b')
+    outputs = ('out',)
 
     def __init__(self, a, b, out, width=1):
         self.width = width
@@ -385,27 +424,158 @@ class Adder(_Combinatorial):
 
 
     def eval(self):
-        if ('x' in self.a.val) or ('x' in self.b.val):
-            self.out.val = 'x' * self.width
+        a, a_xmask = self.a.bits
+        b, b_xmask = self.b.bits
+
+        if a_xmask or b_xmask:
+            self.out.bits = (0, self.size)
             return
 
-        s = self.a.uival + self.b.uival
+        self.out.bits = ((a + b) & self.size, 0)
+
+
+    def view(self, signal):
+        if signal == "a":
+            return self.a
+        elif signal == "b":
+            return self.b
+        elif signal == "out":
+            return self.out
+        else:
+            return None
+
+
+class RippleCarryAdder(_Combinatorial):
+    """
+        An adder with a carry input and a carry output, which gives the same results as a
+        chain of full adders: the output bits below the lowest undefined input bit are
+        still defined.
+
+        :param a: The first operand of the adder.
+        :param b: The second operand of the adder.
+        :param cin: The one bit carry input to the adder.
+        :param out: The output of the adder.
+        :param cout: The one bit carry output from the adder.
+        :param width: The width of the adder.
+    """
 
-        self.out.uival = s
+    __slots__ = ('width', 'size', 'a', 'b', 'cin', 'out', 'cout')
 
+    inputs = ('a', 'b', 'cin')
+    outputs = ('out', 'cout')
+
+    def __init__(self, a, b, cin, out, cout, width=1):
+        self.width = width
+        self.size = (1 << width) - 1
+        self.a = a
+        self.b = b
+        self.cin = cin
+
+        self.out = out
+        self.cout = cout
+
+    def eval(self):
+        a, a_xmask = self.a.bits
+        b, b_xmask = self.b.bits
+        cin, cin_xmask = self.cin.bits
+        total = a + b + cin
+
+        undefined = a_xmask | b_xmask | cin_xmask
+        if not undefined:
+            self.out.bits = (total & self.size, 0)
+            self.cout.bits = (total >> self.width, 0)
+            return
+
+        # Carries only move up, so the bits below the lowest undefined bit are defined.
+        defined = (undefined & -undefined) - 1
+        self.out.bits = (total & defined, self.size & ~defined)
+        self.cout.bits = (0, 1)
 
     def view(self, signal):
         if signal == "a":
             return self.a
         elif signal == "b":
             return self.b
+        elif signal == "cin":
+            return self.cin
         elif signal == "out":
             return self.out
+        elif signal == "cout":
+            return self.cout
+        else:
+            return None
+
+class LookupTable(_Lettered):
+    """
+        A gate computing any function of one bit inputs, given by its truth table. The
+        output is undefined when any input is.
+
+        Named parameters from 'a' to 'z' are used as inputs, and 'a' is the least
+        significant bit of the row of the table. e.g. an and gate::
+
+            from pyhdl import *
+            a, b, out = Wire(), Wire(), Wire()
+            gate = LookupTable(table=0b1000, a=a, b=b, out=out)
+
+        :param table: The truth table, whose bit ``n`` is the output for row ``n``.
+        :type table: int
+        :param out: The output wire.
+        :param ways: The number of inputs.
+        :type ways: int
+    """
+
+    __slots__ = ('inputs', 'out', 'table')
+
+    outputs = ('out',)
+
+    def __init__(self, table, ways=2, **kwargs):
+        self._connect(ways, kwargs)
+        self.inputs = self.signals
+        self.out = kwargs['out']
+        self.table = table
+
+    def eval(self):
+        row, xmask = 0, 0
+        for shift, wire in enumerate(self._ways):
+            value, undefined = wire.bits
+            row |= value << shift
+            xmask |= undefined
+
+        if xmask:
+            self.out.bits = (0, 1)
+        else:
+            self.out.bits = ((self.table >> row) & 1, 0)
+
+    def view(self, signal):
+        if signal in self.signals:
+            return getattr(self, signal)
+        elif signal == 'out':
+            return self.out
         else:
             return None
 
 
-class DFF(Gate):
+class _Flop(_Sequential):
+
+    __slots__ = ('_state',)
+
+    @property
+    def state(self):
+        """
+            The (binary) value held by the gate.
+        """
+        value, xmask = self._state
+        return _render(value, xmask, '0>{}b'.format(len(self.output)))
+
+    @state.setter
+    def state(self, value):
+        self._state = _parse(value)
+
+    def tock(self):
+        self.output.bits = self._state
+
+
+class DFF(_Flop):
     """
         A D flip flop.
 
@@ -414,20 +584,19 @@ class DFF(Gate):
         :param default: The default value of the DFF.
     """
 
+    __slots__ = ('input', 'output')
+
+    inputs = ('input',)
+    outputs = ('output',)
+
     def __init__(self, input, output, default):
         self.input = input
         self.output = output
-        self.state = default
         self.output.val = default
+        self._state = self.output.bits
 
     def tick(self):
-        self.state = self.input.val
-
-    def tock(self):
-        self.output.val = self.state
-
-    def eval(self):
-        pass
+        self._state = self.input.bits
 
     def view(self, signal):
         if signal == "input":
@@ -438,7 +607,7 @@ class DFF(Gate):
             return None
 
 
-class Register(Gate):
+class Register(_Flop):
     """
         A variable width register.
 
@@ -449,24 +618,22 @@ class Register(Gate):
         :type default: str
     """
 
+    __slots__ = ('input', 'write', 'output')
+
+    inputs = ('input', 'write')
+    outputs = ('output',)
+
     def __init__(self, input, write, output, default):
         self.input = input
         self.write = write
         self.output = output
-        self.state = default
-
 
         self.output.val = default
+        self._state = self.output.bits
 
     def tick(self):
-        if self.write.val == '1':
-            self.state = self.input.val
-
-    def tock(self):
-        self.output.val = self.state
-
-    def eval(self):
-        pass
+        if self.write.bits == (1, 0):
+            self._state = self.input.bits
 
     def view(self, signal):
         if signal == "input":
@@ -479,52 +646,74 @@ class Register(Gate):
             return None
 
 
-class Memory(Gate):
+class Memory(_Sequential):
     """
         A variable width and depth memory.
 
+        Without a ``depth``, only the words which have been written are stored. With a
+        ``depth``, every word is stored in a packed array. For huge address spaces, pass a
+        :class:`~pyhdl.storage.PagedStorage` as the ``storage``. The contents are available as
+        :attr:`memory`, which can also load and dump them in bulk (see
+        :mod:`pyhdl.storage`).
+
         :param input:   The input value to the memory.
         :param output:  The output value from the memory.
         :param write:   The write enable wire.
         :param address: The address wire.
-        :param default: The default contents of the memory.
-        :type default: dict
+        :param default: The initial contents of the memory, as a dictionary mapping
+                        addresses to words, or the value of every word.
+        :type default: dict or int
         :param width:   The width of the memory.
         :type width: int
+        :param depth:   The number of words in the memory.
+        :type depth: int
+        :param storage: The storage for the contents, instead of the one chosen by ``depth``.
     """
 
-    def __init__(self, input, output, write, address, default, width=1):
+    __slots__ = ('input', 'output', 'write', 'address', 'width', 'size', 'default', 'memory')
+
+    inputs = ('input', 'write', 'address')
+    outputs = ('output',)
+
+    def __init__(self, input, output, write, address, default, width=1, depth=None, storage=None):
         self.input = input
         self.output = output
         self.write = write
         self.address = address
         self.width = width
+        self.size = (1 << width) - 1
 
-        self.default = default
-        self.memory = {}
+        if isinstance(default, dict):
+            contents, self.default = default, 0
+        else:
+            contents, self.default = {}, default
 
-    def eval(self):
-        pass
+        if storage is None:
+            if depth is None:
+                storage = DictStorage(width, self.default)
+            else:
+                storage = ArrayStorage(depth, width, self.default)
+
+        self.memory = storage
+        for addr, value in contents.items():
+            storage.write(addr, value)
 
     def tick(self):
-        if 'x' in self.address.val:
-            self.output.val = self.width * 'x'
+        addr, xmask = self.address.bits
+        if xmask:
+            self.output.bits = (0, self.size)
             return
 
-        if self.write.val == '1':
-            addr = self.address.uival
-            self.memory[addr] = self.input.uival
+        if self.write.bits == (1, 0):
+            self.memory.write(addr, self.input.uival)
 
     def tock(self):
-        if 'x' in self.address.val:
-            self.output.val = self.width * 'x'
+        addr, xmask = self.address.bits
+        if xmask:
+            self.output.bits = (0, self.size)
             return
 
-        addr = self.address.uival
-        if addr in self.memory:
-            self.output.uival = self.memory[addr]
-        else:
-            self.output.uival = self.default
+        self.output.uival = self.memory.read(addr)
 
     def view(self, signal):
         if signal == "input":
@@ -0,0 +1,191 @@
+"""
+    Measure where a simulation spends its time.
+
+    A :class:`Profiler` swaps the simulator's gate calls for instrumented ones while it
+    runs, and puts the originals back when it stops, so a simulator which is not being
+    profiled runs exactly as before.
+"""
+from pyhdl.simulator import _ports
+import timeit
+
+
+class GateStats(object):
+    """
+        The calls made to a gate, or to every gate of a class.
+
+        :ivar calls: The number of calls to each of ``eval``, ``tick`` and ``tock``.
+        :ivar time: The time spent in those calls, in seconds.
+        :ivar changes: The number of calls which changed the value of an output.
+    """
+
+    __slots__ = ('calls', 'time', 'changes')
+
+    def __init__(self):
+        self.calls = {'eval': 0, 'tick': 0, 'tock': 0}
+        self.time = 0.0
+        self.changes = 0
+
+    @property
+    def total(self):
+        """
+            The total number of calls.
+        """
+        return sum(self.calls.values())
+
+    def add(self, other):
+        for method, calls in other.calls.items():
+            self.calls[method] += calls
+        self.time += other.time
+        self.changes += other.changes
+
+
+class Profiler(object):
+    """
+        Count and time the calls a simulator makes to each gate. Use it as a context
+        manager, or call :meth:`start` and :meth:`stop`::
+
+            with Profiler(sim) as profiler:
+                sim.run(1000)
+            print(profiler.report())
+
+        While profiling, a compiled simulator runs its gates one by one, so that they can
+        be measured. Output changes are only counted for gates which declare their
+        ``outputs``.
+
+        :param simulator: The simulator to profile.
+        :param clock: A function returning the time in seconds.
+    """
+
+    def __init__(self, simulator, clock=timeit.default_timer):
+        self.simulator = simulator
+        self.clock = clock
+        self.stats = {}
+        self._wrapped = {}
+        self._saved = None
+
+    def _wrap(self, gate, method):
+        """
+            An instrumented call to a method of a gate.
+        """
+        key = (id(gate), method)
+        if key in self._wrapped:
+            return self._wrapped[key]
+
+        if gate not in self.stats:
+            self.stats[gate] = GateStats()
+
+        stats, clock, calls = self.stats[gate], self.clock, self.stats[gate].calls
+        function = getattr(gate, method)
+        outputs = getattr(gate, 'outputs', None)
+        ports = _ports(gate, outputs) if outputs is not None else []
+
+        def call():
+            before = [root.bits for root, mask in ports]
+            start = clock()
+            function()
+            stats.time += clock() - start
+            calls[method] += 1
+
+            for (root, mask), (value, xmask) in zip(ports, before):
+                after = root.bits
+                if ((after[0] ^ value) | (after[1] ^ xmask)) & mask:
+                    stats.changes += 1
+                    break
+
+        self._wrapped[key] = call
+        return call
+
+    def start(self):
+        """
+            Start profiling. Statistics add up over repeated starts and stops.
+        """
+        if self._saved is not None:
+            return
+
+        sim = self.simulator
+        self._saved = dict((name, getattr(sim, name)) for name in (
+            '_eval', '_tick', '_tock', '_evals', '_ticks', '_tocks', '_ranked',
+        ) if hasattr(sim, name))
+
+        sim._evals = [self._wrap(gate, 'eval') for gate in sim.combinational]
+        sim._ticks = [self._wrap(gate, 'tick') for gate in sim.sequential]
+        sim._tocks = [self._wrap(gate, 'tock') for gate in sim.sequential]
+        sim._tick, sim._tock = sim._sweep_tick, sim._sweep_tock
+
+        if sim.event_driven:
+            sim._ranked = [self._wrap(gate, 'eval') for gate in sim.schedule]
+            sim._eval = sim._settle
+        else:
+            sim._eval = sim._sweep
+
+    def stop(self):
+        """
+            Stop profiling, and restore the simulator.
+        """
+        if self._saved is None:
+            return
+
+        for name, value in self._saved.items():
+            setattr(self.simulator, name, value)
+        self._saved = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def name(self, gate):
+        """
+            A name for a gate, made of its class and its position in the simulator.
+        """
+        return '{0}{1}'.format(type(gate).__name__, self.simulator.gates.index(gate))
+
+    def by_class(self):
+        """
+            The statistics of every gate class, as a dictionary mapping class names to
+            :class:`GateStats`.
+        """
+        classes = {}
+        for gate, stats in self.stats.items():
+            name = type(gate).__name__
+            if name not in classes:
+                classes[name] = GateStats()
+            classes[name].add(stats)
+        return classes
+
+    def hottest(self, count=10):
+        """
+            The gates which took the most time, as a list of ``(gate, stats)`` pairs. Gates
+            which took the same time are listed in the order of the simulator's gates.
+
+            :param count: The number of gates to return.
+            :type count: int
+        """
+        positions = dict((id(gate), position) for position, gate in enumerate(self.simulator.gates))
+        ranked = sorted(self.stats.items(), key=lambda item: (-item[1].time, positions.get(id(item[0]), len(positions))))
+        return [(gate, stats) for gate, stats in ranked if stats.total][:count]
+
+    def report(self, count=10):
+        """
+            A table of the time spent in each gate class, followed by the hottest gates.
+
+            :param count: The number of gates to list.
+            :type count: int
+        """
+        row = '{0:<24} {1:>10} {2:>10} {3:>10} {4:>12} {5:>10}'
+
+        def line(name, stats):
+            return row.format(
+                name, stats.calls['eval'], stats.calls['tick'], stats.calls['tock'],
+                '{0:.6f}'.format(stats.time), stats.changes,
+            )
+
+        classes = sorted(self.by_class().items(), key=lambda item: item[1].time, reverse=True)
+        lines = [row.format('class', 'evals', 'ticks', 'tocks', 'time (s)', 'changes')]
+        lines.extend(line(name, stats) for name, stats in classes)
+        lines.append('')
+        lines.append(row.format('gate', 'evals', 'ticks', 'tocks', 'time (s)', 'changes'))
+        lines.extend(line(self.name(gate), stats) for gate, stats in self.hottest(count))
+        return '\n'.join(lines)
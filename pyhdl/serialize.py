@@ -0,0 +1,289 @@
+"""
+    Save a simulator to a compact binary file, and load it back ready to run.
+
+    Loading a saved simulator skips the code which built its wires and gates, and the
+    levelization of its gates, so it is much faster than building the design again. The
+    file holds the wires, the gates and how they are connected, the values of the wires,
+    the state of the ``DFF``, ``Register`` and ``Memory`` gates, and the simulator's
+    schedule and cycle count. Monitors, profilers and compiled code are not saved.
+
+    The file starts with ``PYHDL`` and a format version, and the rest is compressed
+    with zlib. It holds three sections: small integers packed as 32 bit words, which
+    describe the structure; large integers written in hexadecimal, such as wire values;
+    and byte strings, such as the contents of memories.
+"""
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.storage import ArrayStorage, DictStorage, PagedStorage
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, SubWire, Wire, _format, _render, _resolve
+import functools
+import struct
+import zlib
+
+
+MAGIC = b'PYHDL'
+VERSION = 1
+
+_header = struct.Struct('<5sH')
+_sizes = struct.Struct('<III')
+
+# For each gate class: whether it has lettered ways, whether it takes a width, and
+# the names of its other ports, in the order they are written.
+_layouts = {
+    NandGate: (True, True, ('out',)),
+    AndGate: (True, True, ('out',)),
+    NorGate: (True, True, ('out',)),
+    OrGate: (True, True, ('out',)),
+    XorGate: (True, True, ('out',)),
+    NotGate: (False, True, ('inp', 'out')),
+    Multiplexer: (True, True, ('out', 'sel')),
+    Demultiplexer: (True, True, ('input', 'sel')),
+    HalfAdder: (False, False, ('a', 'b', 'out', 'carry')),
+    FullAdder: (False, False, ('a', 'b', 'cin', 'out', 'cout')),
+    Adder: (False, True, ('a', 'b', 'out')),
+    DFF: (False, False, ('input', 'output')),
+    Register: (False, False, ('input', 'write', 'output')),
+    Memory: (False, True, ('input', 'output', 'write', 'address')),
+    LookupTable: (True, False, ('out',)),
+    RippleCarryAdder: (False, True, ('a', 'b', 'cin', 'out', 'cout')),
+}
+
+# The code of each class is its position in this list, so new classes go at the end.
+_classes = [
+    Adder, AndGate, DFF, Demultiplexer, FullAdder, HalfAdder, Memory, Multiplexer,
+    NandGate, NorGate, NotGate, OrGate, Register, XorGate, LookupTable, RippleCarryAdder,
+]
+_codes = dict((cls, code) for code, cls in enumerate(_classes))
+
+_storages = [DictStorage, ArrayStorage, PagedStorage]
+
+_WIRE, _CONSTANT, _SLICE = range(0, 3)
+
+
+class _Writer(object):
+    """
+        Collects the sections of a saved simulator. The wires are numbered as they are
+        first used, and described in a table which is written before the gates.
+    """
+
+    def __init__(self):
+        self.ints = []
+        self.bigs = []
+        self.blobs = []
+        self.table = []
+        self.constants = []
+        self.wires = []
+        self.refs = {}
+
+    def ref(self, root, shift, width):
+        key = (id(root), shift, width)
+        ref = self.refs.get(key)
+        if ref is not None:
+            return ref
+
+        if width != len(root):
+            self.table.extend((_SLICE, self.ref(root, 0, len(root)), shift, width))
+        elif isinstance(root, ConstantWire):
+            self.table.extend((_CONSTANT, width))
+            self.constants.extend(root.bits)
+        else:
+            self.table.extend((_WIRE, width))
+            self.wires.append(root)
+
+        ref = self.refs[key] = len(self.refs)
+        return ref
+
+    def storage(self, storage):
+        if type(storage) not in _storages:
+            raise HDLError("Cannot save a memory stored in {0}.".format(type(storage).__name__))
+
+        self.ints.append(_storages.index(type(storage)))
+        self.bigs.append(storage.fill)
+        if isinstance(storage, DictStorage):
+            words = sorted(storage.words.items())
+            self.ints.append(len(words))
+            for address, value in words:
+                self.bigs.extend((address, value))
+        elif isinstance(storage, ArrayStorage):
+            self.ints.append(storage.depth)
+            self.blobs.append(bytes(storage.buffer[:storage.depth * storage.word]))
+        else:
+            pages = sorted(storage.dump().items())
+            self.ints.extend((storage.page_size, len(pages)))
+            for number, data in pages:
+                self.bigs.append(number)
+                self.blobs.append(data)
+
+    def gate(self, gate):
+        if type(gate) not in _codes:
+            raise HDLError("Cannot save a {0}.".format(type(gate).__name__))
+
+        lettered, width, ports = _layouts[type(gate)]
+        self.ints.append(_codes[type(gate)])
+        if lettered:
+            self.ints.append(len(gate.signals))
+            ports = gate.signals + ports
+        if width:
+            self.ints.append(len(gate.view(gate.outputs[0])))
+
+        for port in ports:
+            self.ints.append(self.ref(*_resolve(gate.view(port))))
+
+        if isinstance(gate, (DFF, Register)):
+            self.bigs.extend(gate._state)
+        elif isinstance(gate, Memory):
+            self.bigs.append(gate.default)
+            self.storage(gate.memory)
+        elif isinstance(gate, LookupTable):
+            self.bigs.append(gate.table)
+
+    def data(self):
+        ints = [len(self.refs)] + self.table + self.ints + [len(blob) for blob in self.blobs]
+        bigs = ' '.join('{0:x}'.format(value) for value in self.constants + self.bigs).encode('ascii')
+        return b''.join([
+            _sizes.pack(len(ints), len(bigs), len(self.blobs)),
+            struct.pack('<{0}I'.format(len(ints)), *ints),
+            bigs,
+        ] + self.blobs)
+
+
+class _Reader(object):
+
+    def __init__(self, data):
+        count, size, blobs = _sizes.unpack_from(data)
+        start = _sizes.size
+        ints = struct.unpack_from('<{0}I'.format(count), data, start)
+        start += 4 * count
+
+        bigs = data[start:start + size]
+        start += size
+
+        self.blobs = []
+        for length in ints[count - blobs:]:
+            self.blobs.append(data[start:start + length])
+            start += length
+
+        self.int = functools.partial(next, iter(ints[:count - blobs]))
+        self.big = functools.partial(next, iter([int(value, 16) for value in bigs.split()]))
+        self.blob = functools.partial(next, iter(self.blobs))
+        self.refs = self.table()
+
+    def table(self):
+        refs, take, big = [], self.int, self.big
+        for ref in range(0, take()):
+            kind = take()
+            if kind == _WIRE:
+                refs.append(Wire(width=take()))
+            elif kind == _CONSTANT:
+                width = take()
+                refs.append(ConstantWire(_render(big(), big(), _format(width)), width=width))
+            else:
+                root, shift, width = refs[take()], take(), take()
+                stop = len(root) - shift
+                refs.append(SubWire(root, slice(stop - width, stop)))
+        return refs
+
+    def storage(self, width):
+        cls, fill = _storages[self.int()], self.big()
+        if cls is DictStorage:
+            storage = DictStorage(width, fill)
+            for word in range(0, self.int()):
+                address = self.big()
+                storage.words[address] = self.big()
+        elif cls is ArrayStorage:
+            storage = ArrayStorage(self.int(), width, fill, bytearray(self.blob()))
+        else:
+            storage = PagedStorage(width, fill, self.int())
+            storage.restore(dict((self.big(), self.blob()) for page in range(0, self.int())))
+        return storage
+
+    def gate(self):
+        take, refs = self.int, self.refs
+        cls = _classes[take()]
+        lettered, width, ports = _layouts[cls]
+        kwargs = {}
+        if lettered:
+            kwargs['ways'] = take()
+            ports = tuple(cls.attributes[:kwargs['ways']]) + ports
+        if width:
+            kwargs['width'] = take()
+
+        for port in ports:
+            kwargs[port] = refs[take()]
+
+        if cls in (DFF, Register):
+            gate = cls(default='x' * len(kwargs['output']), **kwargs)
+            gate._state = (self.big(), self.big())
+        elif cls is Memory:
+            kwargs['default'] = self.big()
+            gate = cls(storage=self.storage(kwargs['width']), **kwargs)
+        elif cls is LookupTable:
+            gate = cls(table=self.big(), **kwargs)
+        else:
+            gate = cls(**kwargs)
+        return gate
+
+
+def save(simulator, file):
+    """
+        Save a simulator.
+
+        :param simulator: A :class:`~pyhdl.Simulator` made of primitive gates.
+        :param file: A file object opened for writing bytes.
+    """
+    writer = _Writer()
+    positions = dict((id(gate), position) for position, gate in enumerate(simulator.gates))
+
+    writer.ints.extend((len(simulator.gates), simulator.event_driven))
+    for gate in simulator.gates:
+        writer.gate(gate)
+
+    writer.ints.extend(positions[id(gate)] for gate in simulator.schedule)
+    writer.ints.append(len(simulator.loops))
+    for loop in simulator.loops:
+        writer.ints.append(len(loop))
+        writer.ints.extend(positions[id(gate)] for gate in loop)
+    writer.bigs.append(simulator.cycle)
+
+    # The values come last, as building the flip flops sets their outputs.
+    for wire in writer.wires:
+        writer.bigs.extend(wire.bits)
+
+    file.write(_header.pack(MAGIC, VERSION))
+    file.write(zlib.compress(writer.data(), 1))
+
+
+def load(file):
+    """
+        Load a simulator saved by :func:`save`.
+
+        :param file: A file object opened for reading bytes.
+        :returns: A :class:`~pyhdl.Simulator`.
+    """
+    header = file.read(_header.size)
+    if len(header) < _header.size:
+        raise HDLError("Not a saved simulator.")
+
+    magic, version = _header.unpack(header)
+    if magic != MAGIC:
+        raise HDLError("Not a saved simulator.")
+    if version != VERSION:
+        raise HDLError("Unsupported format version {0}.".format(version))
+
+    reader = _Reader(zlib.decompress(file.read()))
+    count, event_driven = reader.int(), reader.int()
+    gates = [reader.gate() for gate in range(0, count)]
+
+    schedule = [gates[reader.int()] for gate in range(0, count)]
+    loops = [[gates[reader.int()] for gate in range(0, reader.int())] for loop in range(0, reader.int())]
+    cycle = reader.big()
+
+    for wire in reader.refs:
+        if isinstance(wire, Wire):
+            wire.bits = (reader.big(), reader.big())
+
+    simulator = Simulator.__new__(Simulator)
+    simulator._setup(gates, schedule, loops, bool(event_driven))
+    simulator.cycle = cycle
+    return simulator
@@ -1,8 +1,27 @@
 """
     A simulator for composite gates.
 
-    You can supply an arbitrarily nested list of gates, sorted in topological order.
+    You can supply an arbitrarily nested list of gates, in any order. The simulator
+    derives the order in which to evaluate the gates from the wires that connect them.
+
+    In event driven mode, the simulator only re-evaluates the gates whose inputs
+    changed since the circuit last settled.
+
+    The state of a simulator can be saved in memory with :meth:`Simulator.snapshot`, and
+    put back with :meth:`Simulator.restore`, or copied into an independent simulator
+    with :meth:`Simulator.fork`.
 """
+from collections import defaultdict
+from heapq import heappush, heappop
+from itertools import chain
+from pyhdl.compiler import compile_gates
+from pyhdl.primitives import Memory, _Flop, _Sequential
+from pyhdl.utils import HDLError, HDLWarning
+from pyhdl.storage import _Storage
+from pyhdl.wire import SubWire, Wire, _resolve
+import six
+import warnings
+import weakref
 
 
 def flatten_list(l):
@@ -18,31 +37,576 @@ def flatten_list(l):
     return out
 
 
+def _ports(gate, signals):
+    """
+        Resolve the signals of a gate to a list of ``(root, mask)`` pairs.
+    """
+    ports = []
+    for signal in signals:
+        root, shift, width = _resolve(gate.view(signal))
+        ports.append((root, ((1 << width) - 1) << shift))
+    return ports
+
+
+def _is_combinatorial(gate):
+    """
+        Whether the simulator knows which wires a gate reads and writes.
+    """
+    return (not isinstance(gate, _Sequential)) and (getattr(gate, 'inputs', None) is not None)
+
+
+def _components(drivers):
+    """
+        Find the strongly connected components of a graph, in topological order.
+
+        :param drivers: The indices of the nodes each node depends on.
+    """
+    index, lowlink, stack, on_stack = {}, {}, [], set()
+    components = []
+
+    for start in range(0, len(drivers)):
+        if start in index:
+            continue
+
+        work = [(start, iter(drivers[start]))]
+        index[start] = lowlink[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+
+        while work:
+            node, edges = work[-1]
+            for edge in edges:
+                if edge not in index:
+                    index[edge] = lowlink[edge] = len(index)
+                    stack.append(edge)
+                    on_stack.add(edge)
+                    work.append((edge, iter(drivers[edge])))
+                    break
+                elif edge in on_stack:
+                    lowlink[node] = min(lowlink[node], index[edge])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+    return components
+
+
+def _levelize(gates):
+    """
+        Sort combinatorial gates so that every gate comes after the gates driving it.
+
+        Gates whose wires are unknown keep their place in the list: the gates listed
+        before such a gate are sorted before it, and the gates listed after it are sorted
+        after it. Sequential gates are placed at level 0. Returns the sorted gates, and a
+        list of the combinational loops.
+    """
+    # The gates driving each bit of each root wire.
+    outputs = defaultdict(dict)
+    for position, gate in enumerate(gates):
+        if _is_combinatorial(gate):
+            for signal in gate.outputs:
+                root, shift, width = _resolve(gate.view(signal))
+                bits = outputs[root]
+                for bit in range(shift, shift + width):
+                    bits.setdefault(bit, []).append(position)
+
+    # Gates with unknown wires split the list into runs, which are sorted separately.
+    runs, barriers, run = [], set(), 0
+    for position, gate in enumerate(gates):
+        runs.append(run)
+        if not (isinstance(gate, _Sequential) or _is_combinatorial(gate)):
+            barriers.add(position)
+            run += 1
+
+    drivers = []
+    for position, gate in enumerate(gates):
+        found = set()
+        if _is_combinatorial(gate):
+            for signal in gate.inputs:
+                root, shift, width = _resolve(gate.view(signal))
+                bits = outputs.get(root)
+                if bits:
+                    for bit in range(shift, shift + width):
+                        found.update(bits.get(bit, ()))
+            found = set(driver for driver in found if runs[driver] == runs[position])
+        drivers.append(found)
+
+    levels = [0] * len(gates)
+    loops = []
+
+    for component in _components(drivers):
+        members = set(component)
+        level = 0
+        for member in component:
+            for driver in drivers[member]:
+                if driver not in members:
+                    level = max(level, levels[driver] + 1)
+
+        for member in component:
+            levels[member] = level
+
+        if (len(component) > 1) or (component[0] in drivers[component[0]]):
+            loops.append([gates[member] for member in sorted(component)])
+
+    order = sorted(range(0, len(gates)), key=lambda position: (
+        runs[position], position in barriers, levels[position], position,
+    ))
+    return [gates[position] for position in order], loops
+
+
+def _slots(cls):
+    """
+        The names of the slots of a class and its bases.
+    """
+    names = []
+    for base in cls.__mro__:
+        slots = base.__dict__.get('__slots__', ())
+        if isinstance(slots, six.string_types):
+            slots = (slots,)
+        names.extend(name for name in slots if name not in ('__dict__', '__weakref__'))
+    return names
+
+
+class _Copier(object):
+    """
+        Copies gates, together with the wires and storages they refer to. Everything else,
+        such as constants and tables, is shared with the original gates.
+    """
+
+    #: The types of values which are always shared.
+    atoms = frozenset(six.integer_types + six.string_types + (bool, float, type(None)))
+
+    def __init__(self):
+        self.copies = {}
+        self.slots = {}
+
+    def value(self, value):
+        if type(value) in self.atoms:
+            return value
+
+        copied = self.copies.get(id(value))
+        if copied is not None:
+            return copied
+
+        if isinstance(value, Wire):
+            copied = Wire(width=len(value), type=value._type)
+            copied.bits = value.bits
+        elif isinstance(value, SubWire):
+            copied = SubWire(self.value(value.node), value.sub, type=value._type)
+        elif isinstance(value, _Storage):
+            copied = value.copy()
+        elif isinstance(value, (tuple, list)):
+            items = [self.value(item) for item in value]
+            if isinstance(value, tuple) and all(item is other for item, other in zip(items, value)):
+                copied = value
+            else:
+                copied = type(value)(items)
+        else:
+            return value
+
+        self.copies[id(value)] = copied
+        return copied
+
+    def gate(self, gate):
+        cls = type(gate)
+        if cls not in self.slots:
+            self.slots[cls] = _slots(cls)
+
+        other = cls.__new__(cls)
+        for name in self.slots[cls]:
+            try:
+                value = getattr(gate, name)
+            except AttributeError:
+                continue
+            setattr(other, name, self.value(value))
+
+        if hasattr(gate, '__dict__'):
+            for name, value in vars(gate).items():
+                setattr(other, name, self.value(value))
+        return other
+
+
+class Snapshot(object):
+    """
+        The state of a simulator, made by :meth:`Simulator.snapshot`: the values of its
+        wires, the state of its flip flops and registers, the contents of its memories,
+        and its cycle count.
+    """
+
+    __slots__ = ('cycle', 'wires', 'flops', 'memories', 'pending')
+
+    def __init__(self, cycle, wires, flops, memories, pending):
+        self.cycle = cycle
+        self.wires = wires
+        self.flops = flops
+        self.memories = memories
+        self.pending = pending
+
+
 class Simulator(object):
     """
         A simulator for composite gates.
 
+        The gates are sorted into levels once, when the simulator is created, so that each
+        gate is evaluated after the gates driving its inputs. The sorted gates are
+        available as :attr:`schedule`, and any combinational loops found are available as
+        :attr:`loops`.
+
+        The gates are also split into :attr:`combinational` gates, which are only evaluated,
+        and :attr:`sequential` gates (``DFF``, ``Register`` and ``Memory``), which only
+        receive ticks and tocks. Gates which do not declare their ``inputs`` and
+        ``outputs`` are treated as both.
+
+        In event driven mode, a write that changes a wire schedules the gates that read
+        that wire, and :meth:`eval` evaluates scheduled gates until the circuit settles.
+        Gates which do not declare their ``inputs`` and ``outputs`` are evaluated on
+        every call to :meth:`eval`.
+
+        Functions in :attr:`monitors` are called with the cycle count at the end of every
+        clock cycle, e.g. to record waveforms.
+
+        :meth:`snapshot` saves the state of the simulator, :meth:`restore` puts it back,
+        and :meth:`fork` makes an independent copy of the simulator, e.g. to run several
+        tests from the state reached after a long reset sequence.
+
         :param gates: An arbitrarily nested list of gates.
         :type gates: list
+        :param event_driven: Only evaluate gates whose inputs have changed.
+        :type event_driven: bool
     """
 
-    def __init__(self, gates):
-        self.gates = flatten_list(gates)
+    #: The average number of evaluations per gate after which an event driven
+    #: simulation is assumed to oscillate.
+    settle_limit = 64
+
+    #: The event driven simulators which are watching their wires.
+    _watching = weakref.WeakSet()
+
+    def __init__(self, gates, event_driven=False):
+        gates = flatten_list(gates)
+        schedule, loops = _levelize(gates)
+        self._setup(gates, schedule, loops, event_driven)
+
+    def _setup(self, gates, schedule, loops, event_driven):
+        """
+            Set up the simulator for gates which have already been put in order.
+        """
+        self.gates = gates
+        self.schedule, self.loops = schedule, loops
+        self.combinational = [gate for gate in self.schedule if not isinstance(gate, _Sequential)]
+        self.sequential = [gate for gate in self.schedule if not _is_combinatorial(gate)]
+        self.event_driven = event_driven
+        self.cycle = 0
+        self.monitors = []
+        self._compiled = False
+        self._state = None
+
+        self._evals = [gate.eval for gate in self.combinational]
+        self._ticks = [gate.tick for gate in self.sequential]
+        self._tocks = [gate.tock for gate in self.sequential]
+
+        for loop in self.loops:
+            warnings.warn("Combinational loop through {0} gates.".format(len(loop)), HDLWarning)
+
+        self._eval = self._sweep
+        self._tick = self._sweep_tick
+        self._tock = self._sweep_tock
+
+        self._release()
+        if event_driven:
+            self._watch()
+            self._eval = self._settle
+
+    def _release(self):
+        """
+            Close the other event driven simulators watching the wires of the gates, which
+            would otherwise keep scheduling their gates when the wires change.
+        """
+        if not (set(Simulator._watching) - set([self])):
+            return
+        for gate in self.gates:
+            for signal in chain(getattr(gate, 'inputs', None) or (), getattr(gate, 'outputs', None) or ()):
+                root = _resolve(gate.view(signal))[0]
+                for watcher in list(getattr(root, '_watchers', None) or ()):
+                    owner = getattr(watcher, '__self__', None)
+                    if isinstance(owner, Simulator) and (owner is not self) and (watcher == owner._notify):
+                        owner.close()
+
+    def _watch(self):
+        """
+            Build the fanout of every wire, and watch the wires for changes.
+        """
+        fanout = defaultdict(dict)
+        self._opaque = []
+        self._queue = []
+
+        for rank, gate in enumerate(self.schedule):
+            if isinstance(gate, _Sequential):
+                continue
+
+            if not _is_combinatorial(gate):
+                self._opaque.append(rank)
+                continue
+
+            for root, mask in _ports(gate, gate.inputs):
+                readers = fanout[root]
+                readers[rank] = readers.get(rank, 0) | mask
+
+            self._queue.append(rank)
+
+        self._pending = set(self._queue)
+        self._ranked = [gate.eval for gate in self.schedule]
+        self._fanout = {}
+
+        for root, readers in fanout.items():
+            if isinstance(root, Wire):
+                self._fanout[root] = [(mask, rank) for rank, mask in readers.items()]
+                root.watch(self._notify)
+        Simulator._watching.add(self)
+
+    def close(self):
+        """
+            Stop watching the wires of an event driven simulator, which then evaluates
+            every gate, like a simulator which is not event driven. Building another
+            simulator on the same wires closes this one.
+        """
+        if not self.event_driven:
+            return
+        for root in self._fanout:
+            root.unwatch(self._notify)
+        self._fanout = {}
+        self._queue, self._pending = [], set()
+        Simulator._watching.discard(self)
+        self.event_driven = False
+        self._eval = self._sweep
+
+    def _notify(self, wire, changed):
+        """
+            Schedule the readers of ``wire`` affected by the ``changed`` bits.
+        """
+        for mask, rank in self._fanout[wire]:
+            if (changed & mask) and (rank not in self._pending):
+                self._pending.add(rank)
+                heappush(self._queue, rank)
+
+    def _settle(self):
+        """
+            Evaluate scheduled gates, in level order, until no more gates are scheduled.
+        """
+        queue, pending, ranked = self._queue, self._pending, self._ranked
+
+        # Gates whose wires are unknown are evaluated every time, in their place.
+        for rank in self._opaque:
+            if rank not in pending:
+                pending.add(rank)
+                heappush(queue, rank)
+        limit = self.settle_limit * max(len(ranked), 1)
+
+        while queue:
+            rank = heappop(queue)
+            pending.discard(rank)
+            ranked[rank]()
+
+            limit -= 1
+            if limit < 0:
+                raise HDLError("The circuit did not settle.")
+
+    def _sweep(self):
+        for evaluate in self._evals:
+            evaluate()
+
+    def _sweep_tick(self):
+        for tick in self._ticks:
+            tick()
+
+    def _sweep_tock(self):
+        for tock in self._tocks:
+            tock()
+        self._eval()
+
+    def compile(self):
+        """
+            Replace :meth:`eval`, :meth:`tick` and :meth:`tock` with generated straight-line
+            Python code, which gives the same results without calling each gate. Compile the
+            simulator again if you change the gates' wires.
+        """
+        if self.event_driven:
+            raise HDLError("Event driven simulators cannot be compiled.")
+
+        evaluate = [(gate, 'eval') for gate in self.combinational]
+        phases = compile_gates({
+            'eval': evaluate,
+            'tick': [(gate, 'tick') for gate in self.sequential],
+            'tock': [(gate, 'tock') for gate in self.sequential] + evaluate,
+        })
+        self._eval, self._tick, self._tock = phases['eval'], phases['tick'], phases['tock']
+        self._compiled = True
+
+    def _find_state(self):
+        """
+            The root wires, flip flops and memories which hold the state of the simulator,
+            in the order of the gates.
+        """
+        if self._state is not None:
+            return self._state
+
+        wires, flops, memories, seen = [], [], [], set()
+        for gate in self.gates:
+            if getattr(gate, 'inputs', None) is None:
+                raise HDLError("Cannot save the state of a {0}, whose wires are unknown.".format(type(gate).__name__))
+            if isinstance(gate, _Flop):
+                flops.append(gate)
+            elif isinstance(gate, Memory):
+                memories.append(gate)
+            elif isinstance(gate, _Sequential):
+                raise HDLError("Cannot save the state of a {0}.".format(type(gate).__name__))
+
+            for signal in gate.inputs + gate.outputs:
+                root = _resolve(gate.view(signal))[0]
+                if isinstance(root, Wire) and id(root) not in seen:
+                    seen.add(id(root))
+                    wires.append(root)
+
+        self._state = (wires, flops, memories)
+        return self._state
+
+    def snapshot(self):
+        """
+            Save the state of the simulator: the values of the wires, the state of the
+            flip flops, registers and memories, and the cycle count. Memories stored in a
+            :class:`~pyhdl.PagedStorage` share their pages with the snapshot until they are
+            next written, and other memories are copied.
+
+            :returns: A :class:`Snapshot`, for :meth:`restore`.
+        """
+        wires, flops, memories = self._find_state()
+        return Snapshot(
+            self.cycle,
+            [wire.bits for wire in wires],
+            [gate._state for gate in flops],
+            [gate.memory.snapshot() for gate in memories],
+            sorted(self._pending) if self.event_driven else [],
+        )
+
+    def restore(self, snapshot):
+        """
+            Put back the state saved by :meth:`snapshot`. The snapshot may also come from the
+            simulator this one was forked from, or from another fork of it, and it can be
+            restored any number of times.
+
+            :param snapshot: A :class:`Snapshot`.
+        """
+        wires, flops, memories = self._find_state()
+        if (len(snapshot.wires), len(snapshot.flops), len(snapshot.memories)) != (len(wires), len(flops), len(memories)):
+            raise HDLError("The snapshot was taken from a different design.")
+
+        for wire, bits in zip(wires, snapshot.wires):
+            wire.bits = bits
+        for gate, state in zip(flops, snapshot.flops):
+            gate._state = state
+        for gate, contents in zip(memories, snapshot.memories):
+            gate.memory.revert(contents)
+
+        if self.event_driven:
+            for rank in snapshot.pending:
+                if rank not in self._pending:
+                    self._pending.add(rank)
+                    heappush(self._queue, rank)
+        self.cycle = snapshot.cycle
+
+    def fork(self):
+        """
+            Make an independent copy of the simulator, in the same state. The copy keeps
+            the order of the gates rather than levelizing them again, and shares its
+            constants, and the pages of its memories until they are written, with this
+            simulator. A compiled simulator is compiled again. Monitors are not copied.
+
+            The netlist is not shared: gates hold their wires, and wires hold their
+            values, so every gate and wire is copied, and a fork takes about as much
+            memory as the design besides its memories.
+
+            :returns: A :class:`Simulator`.
+        """
+        self._find_state()
+        copier = _Copier()
+        gates = [copier.gate(gate) for gate in self.gates]
+        positions = dict((id(gate), position) for position, gate in enumerate(self.gates))
+        schedule = [gates[positions[id(gate)]] for gate in self.schedule]
+        loops = [[gates[positions[id(gate)]] for gate in loop] for loop in self.loops]
+
+        simulator = Simulator.__new__(Simulator)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', HDLWarning)
+            simulator._setup(gates, schedule, loops, self.event_driven)
+        simulator.cycle = self.cycle
+        if self._compiled:
+            simulator.compile()
+        return simulator
 
     def eval(self):
         """
             Evaluate all the gates.
         """
-        [gate.eval() for gate in self.gates]
-    
+        self._eval()
+
     def tick(self):
         """
-            Send a tick to all the gates.
+            Send a tick to the sequential gates.
         """
-        [gate.tick() for gate in self.gates]
-    
+        self._tick()
+
     def tock(self):
         """
-            Send a tock to all the gates.
+            Send a tock to the sequential gates, and then evaluate the combinational gates
+            once, so that the circuit settles on the new state. Counts as the end of a
+            clock cycle.
+        """
+        self._tock()
+        self.cycle += 1
+
+        for monitor in self.monitors:
+            monitor(self.cycle)
+
+    def run(self, cycles, until=None, stimulus=None):
+        """
+            Run the simulator for a number of clock cycles. Each cycle applies the stimulus,
+            evaluates the gates, and sends a tick and a tock.
+
+            :param cycles: The maximum number of cycles to run.
+            :type cycles: int
+            :param until: Called with the cycle count after each cycle. The run stops early
+                          when it returns a true value.
+            :param stimulus: Called with the cycle count before each cycle, to set the inputs.
+            :returns: The number of cycles run.
         """
-        [gate.tock() for gate in self.gates]
+        evaluate, tick, tock = self._eval, self._tick, self._tock
+        monitors = self.monitors
+
+        for cycle in range(0, cycles):
+            if stimulus is not None:
+                stimulus(self.cycle)
+
+            evaluate()
+            tick()
+            tock()
+            self.cycle += 1
+
+            for monitor in monitors:
+                monitor(self.cycle)
+
+            if (until is not None) and until(self.cycle):
+                return cycle + 1
+
+        return cycles
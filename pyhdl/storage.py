@@ -0,0 +1,417 @@
+"""
+    Storage for the contents of a ``Memory``.
+
+    A storage holds one unsigned integer per address, and is accessed through
+    :meth:`read` and :meth:`write`. :class:`DictStorage` only stores the words which have
+    been written, :class:`ArrayStorage` packs a fixed number of words into a
+    ``bytearray`` or a memory mapped file, and :class:`PagedStorage` packs words into
+    pages which are allocated on demand.
+"""
+from pyhdl.utils import HDLError
+import binascii
+import mmap
+import os
+import struct
+
+
+_formats = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+
+def _read_hex(path):
+    """
+        Read a hex image, in the format of Verilog's ``$readmemh``: whitespace separated
+        words, ``//`` comments, and ``@address`` directives. Yields ``(address, word)``.
+    """
+    address = 0
+    with open(path) as image:
+        for line in image:
+            for token in line.split('//')[0].split():
+                if token.startswith('@'):
+                    address = int(token[1:], 16)
+                else:
+                    yield address, int(token.replace('_', ''), 16)
+                    address += 1
+
+
+class _Storage(object):
+
+    def read(self, address):
+        """
+            The word stored at an address.
+        """
+        raise NotImplementedError
+
+    def write(self, address, value):
+        """
+            Store a word at an address.
+        """
+        raise NotImplementedError
+
+    def snapshot(self):
+        """
+            A copy of the contents, which :meth:`revert` puts back.
+        """
+        raise NotImplementedError
+
+    def revert(self, snapshot):
+        """
+            Put back the contents saved by :meth:`snapshot`.
+        """
+        raise NotImplementedError
+
+    def copy(self):
+        """
+            An independent storage with the same contents.
+        """
+        raise NotImplementedError
+
+    def load(self, words, offset=0):
+        """
+            Store a sequence of words, starting at an address.
+
+            :param words: The words to store.
+            :param offset: The address of the first word.
+            :type offset: int
+        """
+        for address, value in enumerate(words, offset):
+            self.write(address, value)
+
+    def load_image(self, path, format='binary', offset=0):
+        """
+            Load the contents of an image file.
+
+            ``binary`` images hold consecutive words, each stored little endian in the
+            smallest whole number of bytes. ``hex`` images are in the format read by
+            Verilog's ``$readmemh``.
+
+            :param path: The path of the image.
+            :param format: ``binary`` or ``hex``.
+            :param offset: The address of the first word.
+            :type offset: int
+        """
+        if format == 'hex':
+            for address, value in _read_hex(path):
+                self.write(address + offset, value)
+        elif format == 'binary':
+            with open(path, 'rb') as image:
+                self.load_bytes(image.read(), offset)
+        else:
+            raise HDLError("Unknown image format {0!r}.".format(format))
+
+    def load_bytes(self, data, offset=0):
+        """
+            Store words packed as in a binary image. Bits above the width of a word are
+            dropped.
+
+            :param data: The packed words.
+            :param offset: The address of the first word.
+            :type offset: int
+        """
+        word = (self.width + 7) // 8
+        if len(data) % word:
+            raise HDLError("The image is not a whole number of {0} byte words.".format(word))
+
+        data, mask = bytearray(data), (1 << self.width) - 1
+        words = [
+            int(binascii.hexlify(bytes(data[start:start + word][::-1])), 16) & mask
+            for start in range(0, len(data), word)
+        ]
+        self.load(words, offset)
+
+
+class DictStorage(_Storage):
+    """
+        Stores the words which have been written in a dictionary. Suits memories whose
+        contents are mostly unwritten.
+
+        :param width: The width of a word.
+        :type width: int
+        :param fill: The value of the words which have not been written.
+        :type fill: int
+    """
+
+    def __init__(self, width, fill=0):
+        self.width = width
+        self.fill = fill
+        self.words = {}
+
+    def read(self, address):
+        return self.words.get(address, self.fill)
+
+    def write(self, address, value):
+        self.words[address] = value
+
+    def dump(self):
+        """
+            A dictionary of the words which have been written.
+        """
+        return dict(self.words)
+
+    def snapshot(self):
+        return dict(self.words)
+
+    def revert(self, snapshot):
+        self.words = dict(snapshot)
+
+    def copy(self):
+        storage = DictStorage(self.width, self.fill)
+        storage.words = dict(self.words)
+        return storage
+
+
+class ArrayStorage(_Storage):
+    """
+        Stores a fixed number of words, packed little endian into a buffer. Suits memories
+        which are mostly in use, such as ROM images. Reading or writing an address beyond
+        the depth raises an :class:`~pyhdl.utils.HDLError`.
+
+        :param depth: The number of words.
+        :type depth: int
+        :param width: The width of a word.
+        :type width: int
+        :param fill: The initial value of every word.
+        :type fill: int
+        :param buffer: A writable buffer to use for the words, such as a ``bytearray`` or
+                       an ``mmap``. Its contents are kept.
+    """
+
+    def __init__(self, depth, width, fill=0, buffer=None):
+        self.depth = depth
+        self.width = width
+        self.fill = fill
+        self.word = (width + 7) // 8
+        self._mask = (1 << width) - 1
+        self._file = None
+
+        if self.word in _formats:
+            self._struct = struct.Struct('<' + _formats[self.word])
+        else:
+            self._struct = None
+
+        if buffer is None:
+            buffer = bytearray(self._pack(fill) * depth) if fill else bytearray(depth * self.word)
+        elif len(buffer) < depth * self.word:
+            raise HDLError("The buffer is smaller than {0} words.".format(depth))
+        self.buffer = buffer
+
+    @classmethod
+    def open(cls, path, depth, width, fill=0):
+        """
+            Store the words in a memory mapped file, so that the contents are read from
+            the file on demand, and writes go straight to the file. A missing file is
+            created, with every word set to ``fill``.
+
+            :param path: The path of the file.
+            :param depth: The number of words.
+            :type depth: int
+            :param width: The width of a word.
+            :type width: int
+            :param fill: The initial value of every word, if the file is created.
+            :type fill: int
+        """
+        storage = cls(0, width)
+        size = depth * storage.word
+
+        if not os.path.exists(path):
+            with open(path, 'wb') as image:
+                image.write(storage._pack(fill) * depth if fill else bytearray(size))
+
+        image = open(path, 'r+b')
+        if os.fstat(image.fileno()).st_size < size:
+            image.close()
+            raise HDLError("{0} is smaller than {1} words.".format(path, depth))
+
+        storage = cls(depth, width, fill, mmap.mmap(image.fileno(), size))
+        storage._file = image
+        return storage
+
+    def _pack(self, value):
+        if self._struct is not None:
+            return self._struct.pack(value)
+        return bytearray(binascii.unhexlify('{0:0{1}x}'.format(value, self.word * 2)))[::-1]
+
+    def _offset(self, address):
+        if not 0 <= address < self.depth:
+            raise HDLError("Address {0} is out of range.".format(address))
+        return address * self.word
+
+    def read(self, address):
+        start = self._offset(address)
+        if self._struct is not None:
+            return self._struct.unpack_from(self.buffer, start)[0]
+
+        data = bytearray(self.buffer[start:start + self.word])[::-1]
+        return int(binascii.hexlify(bytes(data)), 16)
+
+    def write(self, address, value):
+        start = self._offset(address)
+        value &= self._mask
+        if self._struct is not None:
+            self._struct.pack_into(self.buffer, start, value)
+        else:
+            self.buffer[start:start + self.word] = self._pack(value)
+
+    def load(self, words, offset=0):
+        words = [value & self._mask for value in words]
+        if not words:
+            return
+
+        start = self._offset(offset)
+        self._offset(offset + len(words) - 1)
+
+        if self._struct is None:
+            return _Storage.load(self, words, offset)
+
+        fmt = '<{0}{1}'.format(len(words), _formats[self.word])
+        struct.pack_into(fmt, self.buffer, start, *words)
+
+    def load_bytes(self, data, offset=0):
+        if len(data) % self.word:
+            raise HDLError("The image is not a whole number of {0} byte words.".format(self.word))
+        if not data:
+            return
+        if self.width % 8:
+            # The words have spare high bits, which must be cleared.
+            return _Storage.load_bytes(self, data, offset)
+
+        start = self._offset(offset)
+        self._offset(offset + len(data) // self.word - 1)
+        self.buffer[start:start + len(data)] = data
+
+    def dump(self):
+        """
+            A ``memoryview`` of the packed words, sharing memory with the storage.
+        """
+        return memoryview(self.buffer)
+
+    def snapshot(self):
+        return bytes(self.buffer[:self.depth * self.word])
+
+    def revert(self, snapshot):
+        self.buffer[:len(snapshot)] = snapshot
+
+    def copy(self):
+        """
+            An independent storage with the same contents, held in memory even when this
+            storage is a memory mapped file.
+        """
+        return ArrayStorage(self.depth, self.width, self.fill, bytearray(self.snapshot()))
+
+    def close(self):
+        """
+            Write the contents back to a memory mapped file, and close it.
+        """
+        if self._file is not None:
+            self.buffer.flush()
+            self.buffer.close()
+            self._file.close()
+            self._file = None
+
+
+class PagedStorage(_Storage):
+    """
+        Stores words in fixed size pages, which are allocated when a word in them is first
+        written. Reading a word from a page which has not been allocated returns ``fill``,
+        without allocating the page. Suits memories with a huge address space, such as
+        those addressed by 32 or 48 bit wires.
+
+        Snapshots and copies share their pages with the storage, and a shared page is only
+        copied when it is next written, so taking them costs little however large the
+        memory is.
+
+        :param width: The width of a word.
+        :type width: int
+        :param fill: The value of the words which have not been written.
+        :type fill: int
+        :param page_size: The number of words in a page, which must be a power of two.
+        :type page_size: int
+    """
+
+    def __init__(self, width, fill=0, page_size=4096):
+        if (page_size < 1) or (page_size & (page_size - 1)):
+            raise HDLError("The page size must be a power of two.")
+
+        self.width = width
+        self.fill = fill
+        self.page_size = page_size
+        self.pages = {}
+        self._shift = page_size.bit_length() - 1
+        self._offset = page_size - 1
+        # The numbers of the pages shared with a snapshot or a copy.
+        self._shared = set()
+
+    def _page(self, number):
+        """
+            The page to write to, allocated or unshared if necessary.
+        """
+        page = self.pages.get(number)
+        if page is None:
+            page = self.pages[number] = ArrayStorage(self.page_size, self.width, self.fill)
+        elif number in self._shared:
+            self._shared.discard(number)
+            page = self.pages[number] = ArrayStorage(self.page_size, self.width, self.fill, bytearray(page.buffer))
+        return page
+
+    def read(self, address):
+        page = self.pages.get(address >> self._shift)
+        if page is None:
+            return self.fill
+        return page.read(address & self._offset)
+
+    def write(self, address, value):
+        self._page(address >> self._shift).write(address & self._offset, value)
+
+    def load(self, words, offset=0):
+        words = list(words)
+        done = 0
+        while done < len(words):
+            address = offset + done
+            start = address & self._offset
+            count = min(self.page_size - start, len(words) - done)
+            self._page(address >> self._shift).load(words[done:done + count], start)
+            done += count
+
+    def load_bytes(self, data, offset=0):
+        word = (self.width + 7) // 8
+        if len(data) % word:
+            raise HDLError("The image is not a whole number of {0} byte words.".format(word))
+
+        done = 0
+        while done < len(data):
+            address = offset + done // word
+            start = address & self._offset
+            count = min(self.page_size - start, (len(data) - done) // word) * word
+            self._page(address >> self._shift).load_bytes(data[done:done + count], start)
+            done += count
+
+    def dump(self):
+        """
+            A dictionary mapping the number of each allocated page to a copy of its packed
+            words. Page ``n`` holds the words from address ``n * page_size``.
+        """
+        return dict((number, bytes(page.buffer)) for number, page in self.pages.items())
+
+    def restore(self, pages):
+        """
+            Replace the contents with pages returned by :meth:`dump`.
+
+            :param pages: A dictionary mapping page numbers to packed words.
+            :type pages: dict
+        """
+        self.pages = {}
+        self._shared = set()
+        for number, data in pages.items():
+            self.pages[number] = ArrayStorage(self.page_size, self.width, self.fill, bytearray(data))
+
+    def snapshot(self):
+        self._shared = set(self.pages)
+        return dict(self.pages)
+
+    def revert(self, snapshot):
+        self.pages = dict(snapshot)
+        self._shared = set(snapshot)
+
+    def copy(self):
+        storage = PagedStorage(self.width, self.fill, self.page_size)
+        storage.revert(self.snapshot())
+        return storage
@@ -3,5 +3,12 @@
 """
 
 
-class HDLError(RuntimeError):
+class HDLError(RuntimeError, ValueError):
+    """
+        An error in a design or in its simulation. It is also a ``ValueError``, which
+        reading an undefined wire as an integer used to raise.
+    """
+
+
+class HDLWarning(UserWarning):
     pass
@@ -0,0 +1,184 @@
+"""
+    Record the wires of a simulation to a Value Change Dump (VCD) file.
+
+    The recorder samples the wires at the end of every clock cycle, writes only the wires
+    whose value changed, and buffers its output so that the file is written in large
+    chunks.
+"""
+from pyhdl.wire import _resolve, _render
+
+
+def _identifier(number):
+    """
+        The VCD identifier code for a number.
+    """
+    code = ''
+    while True:
+        code += chr(33 + number % 94)
+        number //= 94
+        if not number:
+            return code
+
+
+class _Signal(object):
+    """
+        The bits of a root wire recorded under one identifier code.
+    """
+
+    def __init__(self, code, shift, width):
+        self.code = code
+        self.shift = shift
+        self.width = width
+        self.mask = (1 << width) - 1
+        self.format = '0>{}b'.format(width)
+
+    def change(self, value, xmask):
+        value = (value >> self.shift) & self.mask
+        xmask = (xmask >> self.shift) & self.mask
+        bits = _render(value, xmask, self.format)
+
+        if self.width == 1:
+            return bits + self.code
+        return 'b{0} {1}'.format(bits, self.code)
+
+
+class VCDWriter(object):
+    """
+        Record the wires of a simulator to a VCD file, with one time step per clock cycle.
+
+        By default every wire connected to a gate is recorded, in a scope named after the
+        gate, using the signal names accepted by the gate's ``view`` method. Pass
+        ``signals`` to record only some wires. The writer can be used as a context manager.
+
+        :param simulator: The simulator to record.
+        :param file: A filename, or a file object opened for writing text.
+        :param signals: A dictionary mapping names to the wires to record.
+        :type signals: dict
+        :param buffer_size: The number of characters to buffer before writing to the file.
+        :type buffer_size: int
+        :param timescale: The duration of a clock cycle.
+        :type timescale: str
+    """
+
+    def __init__(self, simulator, file, signals=None, buffer_size=1 << 20, timescale='1 ns'):
+        self.simulator = simulator
+        self.buffer_size = buffer_size
+
+        if hasattr(file, 'write'):
+            self.file, self._owned = file, False
+        else:
+            self.file, self._owned = open(file, 'w'), True
+
+        self._buffer = []
+        self._buffered = 0
+        self._roots = {}
+        self._codes = {}
+
+        if signals is None:
+            scopes = self._discover()
+        else:
+            scopes = [(None, sorted(signals.items()))]
+
+        self._emit('$version pyhdl $end\n$timescale {0} $end\n$scope module top $end\n'.format(timescale))
+        for scope, wires in scopes:
+            if scope is not None:
+                self._emit('$scope module {0} $end\n'.format(scope))
+            for name, wire in wires:
+                self._declare(name, wire)
+            if scope is not None:
+                self._emit('$upscope $end\n')
+        self._emit('$upscope $end\n$enddefinitions $end\n')
+
+        self._dump()
+        simulator.monitors.append(self)
+
+    def _discover(self):
+        """
+            Find every wire connected to a gate, grouped by gate.
+        """
+        scopes = []
+        for number, gate in enumerate(self.simulator.gates):
+            signals = tuple(getattr(gate, 'inputs', None) or ()) + tuple(getattr(gate, 'outputs', None) or ())
+            wires = [(signal, gate.view(signal)) for signal in signals]
+            if wires:
+                scopes.append(('{0}{1}'.format(type(gate).__name__, number), wires))
+        return scopes
+
+    def _declare(self, name, wire):
+        root, shift, width = _resolve(wire)
+        key = (id(root), shift, width)
+
+        if key not in self._codes:
+            signal = _Signal(_identifier(len(self._codes)), shift, width)
+            self._codes[key] = signal
+            if root not in self._roots:
+                self._roots[root] = [None, []]
+            self._roots[root][1].append(signal)
+
+        signal = self._codes[key]
+        if width == 1:
+            self._emit('$var wire 1 {0} {1} $end\n'.format(signal.code, name))
+        else:
+            self._emit('$var wire {0} {1} {2} [{3}:0] $end\n'.format(width, signal.code, name, width - 1))
+
+    def _emit(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def _dump(self):
+        """
+            Write the value of every recorded wire.
+        """
+        changes = []
+        for root, recorded in self._roots.items():
+            recorded[0] = bits = root.bits
+            changes.extend(signal.change(bits[0], bits[1]) for signal in recorded[1])
+        self._emit('#{0}\n$dumpvars\n{1}\n$end\n'.format(self.simulator.cycle, '\n'.join(changes)))
+
+    def __call__(self, cycle):
+        """
+            Write the wires which changed since the last sample.
+        """
+        changes = []
+        for root, recorded in self._roots.items():
+            bits = root.bits
+            last = recorded[0]
+            if bits == last:
+                continue
+
+            recorded[0] = bits
+            for signal in recorded[1]:
+                if ((bits[0] ^ last[0]) | (bits[1] ^ last[1])) & (signal.mask << signal.shift):
+                    changes.append(signal.change(bits[0], bits[1]))
+
+        if changes:
+            changes.append('')
+            self._emit('#{0}\n{1}'.format(cycle, '\n'.join(changes)))
+
+    def flush(self):
+        """
+            Write the buffered output to the file.
+        """
+        self.file.write(''.join(self._buffer))
+        self._buffer = []
+        self._buffered = 0
+
+    def close(self):
+        """
+            Stop recording, and write the buffered output to the file.
+        """
+        if self in self.simulator.monitors:
+            self.simulator.monitors.remove(self)
+        self.flush()
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
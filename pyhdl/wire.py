@@ -1,76 +1,106 @@
 """
     A circuit wire.
+
+    Wire values are stored as a pair of integers: the value bits, and a mask of
+    the bits which are undefined (``x``). Bit ``width - 1`` of both integers is
+    the leftmost character of the binary string view.
 """
 from pyhdl.utils import *
+import warnings
 
 
-class Wire(object):
+def _parse(value):
     """
-        An arbitrary width wire.
+        Convert a binary string into a ``(value, xmask)`` integer pair.
+    """
+    xmask = int(value.replace('1', '0').replace('x', '1').replace('X', '1'), 2)
+    bits = int(value.replace('x', '0').replace('X', '0'), 2)
+    return bits, xmask
 
-        :param width: The width of the wire.
-        :type width: int
-        :param type: An arbitrary string to tag a wire. (DEPRECATED)
-        :type type: str
+
+def _resolve(wire):
+    """
+        Find the ``(root, shift, width)`` of the bits a wire refers to.
     """
+    if isinstance(wire, SubWire):
+        return wire.root, wire._shift, wire._width
+    return wire, 0, len(wire)
 
-    allowed = set('01xX')
 
-    def __init__(self, width=1, type="undefined"):
-        self._width = width
-        self._value = width * 'x'
-        self._msb = 1 << (self._width - 1)
-        self._max = (1 << self._width) - 1
+_formats = {}
+
+
+def _format(width):
+    """
+        The format spec rendering ``width`` bits, shared between wires of the same width.
+    """
+    if width not in _formats:
+        _formats[width] = '0>{}b'.format(width)
+    return _formats[width]
+
+
+def _render(value, xmask, fmt):
+    """
+        Convert a ``(value, xmask)`` integer pair into a binary string.
+    """
+    if not xmask:
+        return format(value, fmt)
+
+    return ''.join(
+        'x' if x == '1' else v for v, x in zip(format(value, fmt), format(xmask, fmt))
+    )
 
-        self._format_trunc = '0>{}b'.format(self._width - 1)
-        self._format = '0>{}b'.format(self._width)
 
-        self.type = type
+class _WireBase(object):
+    """
+        Views shared by all wires, derived from the ``bits`` of the wire.
+    """
+
+    __slots__ = ('_type',)
 
     @property
-    def val(self):
+    def type(self):
         """
-            The binary value of a wire.
+            The string the wire was tagged with. (DEPRECATED)
         """
-        return self._value
+        warnings.warn("The type of a wire is deprecated.", DeprecationWarning, stacklevel=2)
+        return self._type
 
-    @val.setter
-    def val(self, value):
-        if (set(value) <= self.allowed) or (len(value) != self._width):
-            self._value = value
-        else:
-            raise HDLError("Invalid value passed to wire: {0}".format(value))
+    @property
+    def val(self):
+        """
+            The binary value of the wire.
+        """
+        value, xmask = self.bits
+        return _render(value, xmask, _format(self._width))
 
     @property
     def uival(self):
         """
             The (unsigned) integer value of the wire.
         """
-        return int(self._value, 2)
+        value, xmask = self.bits
+        if xmask:
+            raise HDLError("Wire has undefined bits: {0}".format(self.val))
+        return value
 
     @uival.setter
-    def uival(self, val):
-        self._value = format(val, self._format)[-self._width:]
+    def uival(self, value):
+        self.bits = (value & self._mask, 0)
 
     @property
     def ival(self):
         """
             The two's complement value of the wire.
         """
-        msb = self._msb if self._value[0] == '1' else 0
-        val = int(self._value[1:], 2)
-        return val - msb
+        value = self.uival
+        if value >> (self._width - 1):
+            return value - (1 << self._width)
+        return value
 
     @ival.setter
     def ival(self, value):
-        if value == 0:
-            self._value = '0' * self._width
-        elif (value/abs(value)) == 1:
-            truncated = value % (self._msb - 1)
-            self._value = '0' + format(truncated, self._format_trunc)[-(self._width-1):]
-        else:
-            truncated = value % (self._msb)
-            self._value = '1' + format(truncated, self._format_trunc)[-(self._width-1):]
+        self.bits = (value & self._mask, 0)
 
     def __len__(self):
         return self._width
@@ -89,70 +119,152 @@ class Wire(object):
             return True
 
 
-class ConstantWire(object):
+class Wire(_WireBase):
     """
-        A wire with a constant value.
+        An arbitrary width wire.
 
-        :param value: The (binary) value of the wire.
-        :type value: str
         :param width: The width of the wire.
         :type width: int
         :param type: An arbitrary string to tag a wire. (DEPRECATED)
         :type type: str
     """
 
-    def __init__(self, value, width=1, type="undefined"):
+    __slots__ = ('_width', '_mask', '_format', '_value', '_xmask', '_string', '_watchers')
+
+    allowed = set('01xX')
+
+    def __init__(self, width=1, type="undefined"):
+        self._type = type
         self._width = width
-        self._value = value
-        self._msb = 1 << (self._width - 1)
+        self._mask = (1 << width) - 1
+        self._format = _format(width)
 
-        self.type = type
+        self._value = 0
+        self._xmask = self._mask
+        self._string = None
+        self._watchers = None
 
     @property
-    def val(self):
+    def bits(self):
         """
-            The binary value of the wire.
+            The ``(value, xmask)`` integer pair holding the wire's value.
         """
-        return self._value
+        return self._value, self._xmask
+
+    @bits.setter
+    def bits(self, bits):
+        if self._watchers is None:
+            self._value, self._xmask = bits
+            self._string = None
+            return
+
+        changed = (bits[0] ^ self._value) | (bits[1] ^ self._xmask)
+        self._value, self._xmask = bits
+        self._string = None
+
+        if changed:
+            for watcher in self._watchers:
+                watcher(self, changed)
+
+    def watch(self, watcher):
+        """
+            Call ``watcher(wire, changed)`` whenever a write changes the value of the wire.
+            ``changed`` is a mask of the bits that changed.
+
+            :param watcher: The callback.
+        """
+        if self._watchers is None:
+            self._watchers = []
+        self._watchers.append(watcher)
+
+    def unwatch(self, watcher):
+        """
+            Stop calling a watcher added with :meth:`watch`.
+
+            :param watcher: The callback.
+        """
+        if (self._watchers is None) or (watcher not in self._watchers):
+            raise HDLError("The watcher is not watching this wire.")
+        self._watchers.remove(watcher)
+        if not self._watchers:
+            self._watchers = None
 
     @property
-    def uival(self):
+    def val(self):
         """
-            The (unsigned) integer value of the wire.
+            The binary value of a wire.
         """
-        return int(self._value, 2)
+        if self._string is None:
+            self._string = _render(self._value, self._xmask, self._format)
+        return self._string
+
+    @val.setter
+    def val(self, value):
+        if (set(value) <= self.allowed) and (len(value) == self._width):
+            self.bits = _parse(value)
+            self._string = value
+        else:
+            raise HDLError("Invalid value passed to wire: {0}".format(value))
 
     @property
-    def ival(self):
+    def uival(self):
         """
-            The two's complement value of the wire.
+            The (unsigned) integer value of the wire.
         """
-        msb = self._msb if self._value[0] == '1' else 0
-        val = int(self._value[1:], 2)
-        return val - msb
+        if self._xmask:
+            raise HDLError("Wire has undefined bits: {0}".format(self.val))
+        return self._value
 
-    def __len__(self):
-        return self._width
+    @uival.setter
+    def uival(self, value):
+        self.bits = (value & self._mask, 0)
 
-    def __getitem__(self, key):
-        return SubWire(self, key)
 
-    def __iter__(self):
-        for i in range(0, self._width):
-            yield slice(i, i + 1)
+class ConstantWire(_WireBase):
+    """
+        A wire with a constant value.
 
-    def __contains__(self, key):
-        if key.stop > self._width:
-            return False
-        else:
-            return True
+        :param value: The (binary) value of the wire.
+        :type value: str
+        :param width: The width of the wire.
+        :type width: int
+        :param type: An arbitrary string to tag a wire. (DEPRECATED)
+        :type type: str
+    """
+
+    __slots__ = ('_width', '_string', '_bits')
+
+    def __init__(self, value, width=1, type="undefined"):
+        if (not set(value) <= Wire.allowed) or (len(value) != width):
+            raise HDLError("Invalid value passed to wire: {0}".format(value))
 
+        self._width = width
+        self._string = value
+        self._bits = _parse(value)
+        self._type = type
 
-class SubWire(object):
+    @property
+    def bits(self):
+        """
+            The ``(value, xmask)`` integer pair holding the wire's value.
+        """
+        return self._bits
+
+    @property
+    def val(self):
+        """
+            The binary value of the wire.
+        """
+        return self._string
+
+
+class SubWire(_WireBase):
     """
         A slice of a wire.
 
-        You can index into a wire using standard array notation to create a slice. e.g:
+        A slice refers directly to the bits of the wire at the root of any nested slices,
+        so reading and writing it only touches the bits it covers. You can index into a
+        wire using standard array notation to create a slice, e.g:
 
         >>> from pyhdl import ConstantWire
         >>> a = ConstantWire(value="010101", width=6)
@@ -169,52 +281,62 @@ class SubWire(object):
         :type type: str
     """
 
+    __slots__ = ('node', 'sub', 'root', '_width', '_shift', '_mask')
+
     def __init__(self, node, sub, type="undefined"):
         self.node = node
-        self.type = type
         self.sub = sub
+        self._type = type
 
-    @property
-    def val(self):
-        """
-            The binary value of the wire.
-        """
-        return self.node.val[self.sub]
+        if isinstance(sub, slice):
+            start, stop, step = sub.indices(len(node))
+            if step != 1:
+                raise HDLError("Wire slices must be contiguous: {0}".format(sub))
+        else:
+            start = sub + len(node) if sub < 0 else sub
+            stop = start + 1
 
-    @val.setter
-    def val(self, val):
-        l = list(self.node.val) 
-        l[self.sub] = val
-        self.node.val = ''.join(l)
+        if not 0 <= start < stop <= len(node):
+            raise HDLError("Invalid slice of wire: {0}".format(sub))
+
+        self.root, shift, _ = _resolve(node)
+        self._width = stop - start
+        self._shift = shift + len(node) - stop
+        self._mask = (1 << self._width) - 1
 
     @property
-    def ival(self):
+    def bits(self):
         """
-            The two's complement value of the wire.
+            The ``(value, xmask)`` integer pair holding the wire's value.
         """
-        msb = self._msb if self.val[0] == '1' else 0
-        val = int(self.val[1:], 2)
-        return val - msb
+        value, xmask = self.root.bits
+        return (value >> self._shift) & self._mask, (xmask >> self._shift) & self._mask
+
+    @bits.setter
+    def bits(self, bits):
+        value, xmask = self.root.bits
+        keep = ~(self._mask << self._shift)
+        self.root.bits = (
+            (value & keep) | ((bits[0] & self._mask) << self._shift),
+            (xmask & keep) | ((bits[1] & self._mask) << self._shift),
+        )
 
     @property
-    def uival(self):
+    def val(self):
         """
-            The (unsigned) integer value of the wire.
+            The binary value of the wire.
         """
-        return int(self.val, 2)
+        string = getattr(self.root, '_string', None)
+        if string is not None:
+            stop = len(string) - self._shift
+            return string[stop - self._width:stop]
 
-    def __len__(self):
-        return self._width
+        value, xmask = self.bits
+        return _render(value, xmask, _format(self._width))
 
-    def __getitem__(self, key):
-        return SubWire(self, key)
-
-    def __iter__(self):
-        for i in range(0, self._width):
-            yield slice(i, i + 1)
-
-    def __contains__(self, key):
-        if key.stop > self._width:
-            return False
+    @val.setter
+    def val(self, val):
+        if (set(val) <= Wire.allowed) and (len(val) == self._width):
+            self.bits = _parse(val)
         else:
-            return True
+            raise HDLError("Invalid value passed to wire: {0}".format(val))
@@ -38,6 +38,9 @@ setup(
     install_requires=[
         'six==1.10.0'
     ],
+    extras_require={
+        'lanes': ['numpy'],
+    },
     test_suite='nose.collector',
     tests_require=['nose'],
     zip_safe=False)
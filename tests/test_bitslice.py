@@ -0,0 +1,78 @@
+from pyhdl.bitslice import BitSliceSimulator
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.utils import HDLError
+from pyhdl.wire import Wire, ConstantWire
+import random
+import unittest
+
+
+def build():
+    a, b, c = Wire(width=4), Wire(width=4), Wire()
+    nand, both, either = Wire(width=4), Wire(width=4), Wire(width=4)
+    odd, inverted, sums = Wire(width=4), Wire(width=4), Wire(width=4)
+    carry, cout, masked = Wire(), Wire(), Wire()
+
+    gates = [
+        NandGate(a=a, b=b, out=nand, width=4),
+        AndGate(a=a, b=nand, out=both, width=4),
+        OrGate(a=both, b=ConstantWire('0101', width=4), out=either, width=4),
+        NorGate(a=either, b=b, out=inverted, width=4),
+        XorGate(a=a, b=b, c=inverted, out=odd, width=4, ways=3),
+        NotGate(inp=odd[0:2], out=sums[0:2], width=2),
+        HalfAdder(a=odd[0], b=a[2], out=sums[2], carry=carry),
+        AndGate(a=c, b=b[1], out=masked),
+        FullAdder(a=a[0], b=b[3], cin=carry, out=sums[3], cout=cout),
+    ]
+
+    return gates, [a, b], [nand, both, either, odd, inverted, sums, carry, cout, masked]
+
+
+class TestBitSliceSimulator(unittest.TestCase):
+
+    def setUp(self):
+        gates, self.inputs, self.outputs = build()
+        self.simulator = BitSliceSimulator(gates, 256)
+
+    def test_exhaustive(self):
+        self.simulator.exhaustive(self.inputs)
+        self.simulator.eval()
+
+        self.assertEqual(self.simulator.get(self.inputs[0]), [k & 15 for k in range(0, 256)])
+        self.assertEqual(self.simulator.get(self.inputs[1]), [k >> 4 for k in range(0, 256)])
+        self.assertEqual(self.simulator.get(self.outputs[0]), [~((k & 15) & (k >> 4)) & 15 for k in range(0, 256)])
+
+    def test_reference(self):
+        self.simulator.exhaustive(self.inputs)
+        self.simulator.eval()
+
+        for vector in random.Random(3).sample(range(0, 256), 16):
+            gates, inputs, outputs = build()
+            inputs[0].uival, inputs[1].uival = vector & 15, vector >> 4
+            Simulator(gates).eval()
+
+            for wire, reference in zip(self.outputs, outputs):
+                values, xmasks = self.simulator.read(wire)
+                self.assertEqual(
+                    reference.val,
+                    ''.join('x' if (x >> vector) & 1 else str((v >> vector) & 1)
+                            for v, x in reversed(list(zip(values, xmasks)))),
+                )
+
+    def test_set(self):
+        vectors = [3, 12, 7, 0]
+        simulator = BitSliceSimulator(build()[0], 4)
+        simulator.set(self.inputs[0], vectors)
+        self.assertEqual(simulator.get(self.inputs[0]), vectors)
+
+    def test_undefined(self):
+        with self.assertRaises(HDLError):
+            self.simulator.get(self.outputs[0])
+
+    def test_exhaustive_size(self):
+        with self.assertRaises(HDLError):
+            BitSliceSimulator(build()[0], 16).exhaustive(self.inputs)
+
+    def test_unsupported(self):
+        with self.assertRaises(HDLError):
+            BitSliceSimulator([Adder(a=Wire(), b=Wire(), out=Wire())], 4)
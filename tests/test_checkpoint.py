@@ -0,0 +1,177 @@
+from pyhdl.checkpoint import CheckpointFile
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.storage import ArrayStorage, PagedStorage
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, Wire
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+
+def counter(event_driven=False):
+    """
+        A counter which writes its count to three memories, at the address given by the
+        count, and sums the words read back. Returns the simulator and the count and sum.
+    """
+    count, step, total, read = Wire(width=12), Wire(width=12), Wire(width=12), Wire(width=12)
+    one, enable = ConstantWire('0' * 11 + '1', width=12), ConstantWire('1')
+    outputs = [Wire(width=12) for memory in range(0, 3)]
+    storages = [None, ArrayStorage(4096, 12), PagedStorage(12, page_size=64)]
+    gates = [
+        Adder(a=count, b=one, out=step, width=12),
+        Register(input=step, write=enable, output=count, default='0' * 12),
+        Adder(a=total, b=outputs[0], out=read, width=12),
+        DFF(input=read, output=total, default='0' * 12),
+    ]
+    for output, storage in zip(outputs, storages):
+        gates.append(Memory(input=count, output=output, write=enable, address=count, default=0, width=12, storage=storage))
+    return Simulator(gates, event_driven=event_driven), count, total
+
+
+class TestCheckpointFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'run.ckpt')
+
+    def state(self, simulator):
+        memories = [gate.memory for gate in simulator.gates if isinstance(gate, Memory)]
+        return (
+            [gate.view(port).val for gate in simulator.gates for port in gate.inputs + gate.outputs],
+            memories[0].dump(), memories[1].dump().tobytes(), memories[2].dump(),
+        )
+
+    def test_resume(self):
+        for event_driven in (False, True):
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+            reference, count, total = counter(event_driven)
+            reference.run(100)
+            expected = self.state(reference)
+
+            # A run stopped after cycle 73 has saved checkpoints up to cycle 70.
+            simulator, count, total = counter(event_driven)
+            checkpoints = CheckpointFile(simulator, self.path, interval=10, full_interval=3)
+            simulator.run(73)
+            checkpoints.close()
+
+            simulator, count, total = counter(event_driven)
+            with CheckpointFile(simulator, self.path, interval=10) as checkpoints:
+                self.assertEqual(checkpoints.cycles, list(range(10, 80, 10)))
+                checkpoints.restore()
+                self.assertEqual((simulator.cycle, count.uival), (70, 70))
+                simulator.run(30)
+                self.assertEqual(self.state(simulator), expected)
+                self.assertEqual(checkpoints.cycles, list(range(10, 110, 10)))
+
+    def test_any_cycle(self):
+        simulator, count, total = counter()
+        checkpoints = CheckpointFile(simulator, self.path, full_interval=2)
+        states = {}
+        for cycle in range(0, 8):
+            simulator.run(7)
+            checkpoints.save()
+            states[simulator.cycle] = self.state(simulator)
+
+        for cycle in (21, 7, 56, 35):
+            checkpoints.restore(cycle)
+            self.assertEqual(simulator.cycle, cycle)
+            self.assertEqual(self.state(simulator), states[cycle])
+
+        # Checkpoints saved after restoring an earlier one start a new run of records,
+        # and leave the later checkpoints as they were.
+        checkpoints.restore(14)
+        simulator.run(3)
+        checkpoints.save()
+        checkpoints.restore(49)
+        self.assertEqual(self.state(simulator), states[49])
+        checkpoints.restore(17)
+        self.assertEqual(count.uival, 17)
+
+        with self.assertRaises(HDLError):
+            checkpoints.restore(15)
+        checkpoints.close()
+
+    def test_incremental(self):
+        simulator, count, total = counter()
+        rng = random.Random(0)
+        for gate in simulator.gates:
+            if isinstance(gate, Memory):
+                gate.memory.load([rng.getrandbits(12) for address in range(0, 4096)])
+
+        checkpoints = CheckpointFile(simulator, self.path, full_interval=4)
+        for cycle in range(0, 6):
+            simulator.run(1)
+            checkpoints.save()
+        checkpoints.close()
+
+        # Only the first record, and every fifth, hold the whole state, and the others
+        # hold a few words and one block or page of each memory.
+        records = checkpoints._records
+        self.assertEqual([record[1] for record in records], [True, False, False, False, False, True])
+        self.assertLess(max(record[3] for record in records[1:5]), records[0][3] // 3)
+
+    def test_cut_short(self):
+        simulator, count, total = counter()
+        checkpoints = CheckpointFile(simulator, self.path)
+        for cycle in range(0, 3):
+            simulator.run(5)
+            checkpoints.save()
+        checkpoints.close()
+
+        size = os.path.getsize(self.path)
+        with open(self.path, 'r+b') as data:
+            data.truncate(size - 10)
+
+        simulator, count, total = counter()
+        with CheckpointFile(simulator, self.path) as checkpoints:
+            self.assertEqual(checkpoints.cycles, [5, 10])
+            checkpoints.restore()
+            self.assertEqual(count.uival, 10)
+            simulator.run(5)
+            checkpoints.save()
+
+        simulator, count, total = counter()
+        with CheckpointFile(simulator, self.path) as checkpoints:
+            self.assertEqual(checkpoints.cycles, [5, 10, 15])
+            checkpoints.restore()
+            self.assertEqual(count.uival, 15)
+
+    def test_corrupt(self):
+        simulator, count, total = counter()
+        with CheckpointFile(simulator, self.path) as checkpoints:
+            checkpoints.save()
+
+        with open(self.path, 'r+b') as data:
+            data.seek(-4, 2)
+            data.write(b'\x00\x01\x02\x03')
+
+        with CheckpointFile(simulator, self.path) as checkpoints:
+            with self.assertRaises(HDLError):
+                checkpoints.restore()
+
+    def test_errors(self):
+        with open(self.path, 'wb') as data:
+            data.write(b'NOT A CHECKPOINT')
+        with self.assertRaises(HDLError):
+            CheckpointFile(counter()[0], self.path)
+        os.remove(self.path)
+
+        with CheckpointFile(counter()[0], self.path) as checkpoints:
+            with self.assertRaises(HDLError):
+                checkpoints.restore()
+            checkpoints.save()
+
+        other = Simulator([NotGate(inp=Wire(), out=Wire())])
+        with CheckpointFile(other, self.path) as checkpoints:
+            with self.assertRaises(HDLError):
+                checkpoints.restore()
+
+
+if __name__ == '__main__':
+    unittest.main()
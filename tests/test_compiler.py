@@ -0,0 +1,99 @@
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.utils import HDLError
+from pyhdl.wire import Wire, ConstantWire
+import random
+import unittest
+
+
+class Opaque(object):
+
+    inputs = None
+    outputs = None
+
+    def __init__(self, inp, out):
+        self.inp = inp
+        self.out = out
+
+    def eval(self):
+        self.out.val = self.inp.val[::-1]
+
+    def tick(self):
+        self.eval()
+
+    def tock(self):
+        self.eval()
+
+
+def build():
+    a, b = Wire(width=8), Wire(width=8)
+    bits, sel, carry = Wire(width=3), Wire(width=2), Wire(width=8)
+    total, mux, inverted = Wire(width=8), Wire(width=4), Wire(width=8)
+    halves, demux, reverse = Wire(width=2), Wire(width=8), Wire(width=8)
+    q, r, write, parity = Wire(width=4), Wire(width=4), Wire(), Wire()
+    sums, cout = Wire(width=4), Wire()
+    ones = ConstantWire('1111', width=4)
+
+    gates = [
+        NandGate(a=a, b=b, out=inverted, width=8),
+        AndGate(a=inverted[0:4], b=ones, out=carry[4:8], width=4),
+        OrGate(a=a[0:4], b=b[4:8], out=carry[0:4], width=4),
+        NorGate(a=bits[0], b=bits[1], out=halves[0]),
+        XorGate(a=bits[1], b=bits[2], out=halves[1]),
+        NotGate(inp=carry, out=reverse, width=8),
+        Adder(a=a, b=carry, out=total, width=8),
+        HalfAdder(a=halves[0], b=halves[1], out=mux[0], carry=mux[1]),
+        FullAdder(a=bits[0], b=bits[1], cin=bits[2], out=mux[2], cout=mux[3]),
+        Multiplexer(a=total[0:4], b=total[4:8], c=q, d=r, sel=sel, out=demux[2:6], width=4, ways=4),
+        Demultiplexer(a=demux[0], b=demux[1], c=demux[6], d=demux[7], input=write, sel=sel, ways=4),
+        DFF(input=mux, output=q, default='0000'),
+        Register(input=total[2:6], write=write, output=r, default='1010'),
+        LookupTable(table=0b10010110, a=bits[0], b=bits[1], c=bits[2], out=parity, ways=3),
+        RippleCarryAdder(a=total[0:4], b=q, cin=write, out=sums, cout=cout, width=4),
+        Opaque(inp=reverse, out=b),
+    ]
+
+    inputs = [a, bits, sel, write]
+    wires = [a, b, bits, sel, carry, total, mux, inverted, halves, demux, reverse, q, r, write, parity, sums, cout]
+    return gates, inputs, wires
+
+
+class TestCompiler(unittest.TestCase):
+
+    def setUp(self):
+        gates, self.inputs, self.wires = build()
+        self.simulator = Simulator(gates)
+
+        gates, self.compiled_inputs, self.compiled_wires = build()
+        self.compiled = Simulator(gates)
+        self.compiled.compile()
+
+    def step(self, values, method):
+        for wires in (self.inputs, self.compiled_inputs):
+            for wire, value in zip(wires, values):
+                wire.val = value
+
+        getattr(self.simulator, method)()
+        getattr(self.compiled, method)()
+
+        for wire, compiled in zip(self.wires, self.compiled_wires):
+            self.assertEqual(wire.val, compiled.val)
+
+    def test_default(self):
+        for method in ('eval', 'tick', 'tock'):
+            self.step(['x' * len(wire) for wire in self.inputs], method)
+
+    def test_random(self):
+        rng = random.Random(4)
+        for x in range(0, 200):
+            values = [''.join(rng.choice('01x' if x % 5 == 0 else '01') for bit in range(0, len(wire)))
+                      for wire in self.inputs]
+            self.step(values, rng.choice(['eval', 'tick', 'tock']))
+
+    def test_source(self):
+        self.assertIn('def eval', self.compiled._eval.source)
+
+    def test_event_driven(self):
+        simulator = Simulator(build()[0], event_driven=True)
+        with self.assertRaises(HDLError):
+            simulator.compile()
@@ -0,0 +1,219 @@
+from pyhdl.exporter import write_blif, write_verilog
+from pyhdl.generator import random_netlist
+from pyhdl.importer import read_blif
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, Wire
+from pyhdl.storage import ArrayStorage, PagedStorage
+import random
+import six
+import time
+import unittest
+
+
+def export(write, gates, **kwargs):
+    output = six.StringIO()
+    write(gates, output, **kwargs)
+    return output.getvalue()
+
+
+class TestBlif(unittest.TestCase):
+
+    def round_trip(self, gates, inputs, outputs, cycles=20, seed=0):
+        """
+            Simulate the gates and the netlist read back from their BLIF side by side, and
+            compare their outputs.
+        """
+        names = dict(('in{0}'.format(index), wire) for index, wire in enumerate(inputs))
+        names.update(('out{0}'.format(index), wire) for index, wire in enumerate(outputs))
+        netlist = read_blif(export(write_blif, gates, names=names).splitlines())
+
+        def bits(name, wire):
+            if len(wire) == 1:
+                return [netlist.wires[name]]
+            return [netlist.wires['{0}[{1}]'.format(name, bit)] for bit in range(0, len(wire))]
+
+        original, copy = Simulator(gates), netlist.simulator()
+        rng = random.Random(seed)
+        for cycle in range(0, cycles):
+            for name, wire in sorted(names.items()):
+                if name.startswith('in'):
+                    wire.uival = rng.getrandbits(len(wire))
+                    for bit, other in enumerate(bits(name, wire)):
+                        other.uival = (wire.uival >> bit) & 1
+
+            original.eval()
+            copy.eval()
+            for name, wire in sorted(names.items()):
+                value = sum(other.uival << bit for bit, other in enumerate(bits(name, wire)))
+                self.assertEqual(value, wire.uival, (cycle, name))
+
+            original.run(1)
+            copy.run(1)
+
+    def test_random(self):
+        for width in (1, 3):
+            gates, inputs, outputs = random_netlist(60, depth=6, width=width, sequential=0.1, seed=width)
+            self.round_trip(gates, inputs, outputs)
+
+    def test_wide_gates(self):
+        a, b, c, out = Wire(width=2), Wire(width=2), Wire(width=2), Wire(width=2)
+        for gate in (NandGate, NorGate, XorGate):
+            gates = [gate(a=a, b=b, c=c, out=out, ways=3, width=2)]
+            self.round_trip(gates, [a, b, c], [out])
+
+    def test_arithmetic(self):
+        a, b, cin = Wire(width=4), Wire(width=4), Wire()
+        total, half, carry, full, cout = Wire(width=4), Wire(), Wire(), Wire(), Wire()
+        gates = [
+            Adder(a=a, b=b, out=total, width=4),
+            HalfAdder(a=a[3], b=b[3], out=half, carry=carry),
+            FullAdder(a=a[0], b=b[0], cin=cin, out=full, cout=cout),
+        ]
+        self.round_trip(gates, [a, b, cin], [total, half, carry, full, cout])
+
+    def test_ripple_carry_adder(self):
+        a, b, cin, out, cout = Wire(width=5), Wire(width=5), Wire(), Wire(width=5), Wire()
+        gates = [RippleCarryAdder(a=a, b=b, cin=cin, out=out, cout=cout, width=5)]
+        self.round_trip(gates, [a, b, cin], [out, cout])
+
+    def test_selection(self):
+        a, b, c, d, sel, out = [Wire(width=2) for wire in range(0, 6)]
+        w, x, y, z = [Wire(width=2) for wire in range(0, 4)]
+        gates = [
+            Multiplexer(a=a, b=b, c=c, d=d, sel=sel, out=out, width=2, ways=4),
+            Demultiplexer(a=w, b=x, c=y, d=z, sel=sel, input=a, width=2, ways=4),
+        ]
+        self.round_trip(gates, [a, b, c, d, sel], [out, w, x, y, z])
+
+    def test_register(self):
+        value, write, output = Wire(width=3), Wire(), Wire(width=3)
+        gates = [Register(input=value, write=write, output=output, default='101')]
+        self.round_trip(gates, [value, write], [output])
+
+        text = export(write_blif, gates, names={'d': value, 'w': write, 'q': output})
+        self.assertIn('.inputs clk d[0] d[1] d[2] w\n', text)
+
+    def test_lookup_table(self):
+        a, b, c, out = Wire(), Wire(), Wire(), Wire()
+        gates = [LookupTable(table=0b01101001, a=a, b=b, c=c, out=out, ways=3)]
+        self.round_trip(gates, [a, b, c], [out])
+
+    def test_constants_and_slices(self):
+        bus = Wire(width=4)
+        gates = [
+            AndGate(a=bus[0:2], b=ConstantWire('10', width=2), out=bus[2:4], width=2),
+        ]
+        text = export(write_blif, gates, names={'bus': bus})
+        self.assertIn('.inputs bus[2] bus[3]', text)
+        self.assertIn('.outputs bus[0] bus[1]', text)
+        self.assertIn('.names const0', text)
+        self.assertIn('.names const1\n1', text)
+
+    def test_names(self):
+        a, b, out = Wire(), Wire(), Wire()
+        text = export(write_blif, [NotGate(inp=a, out=b), NotGate(inp=b, out=out)], name='chain')
+        self.assertEqual(text.splitlines()[:3], ['.model chain', '.inputs NotGate0_inp', '.outputs NotGate1_out'])
+        self.assertIn('.names NotGate0_out NotGate1_out\n0 1', text)
+
+    def test_memory(self):
+        memory = Memory(input=Wire(), output=Wire(), write=Wire(), address=Wire(width=2), default=0)
+        with self.assertRaises(HDLError):
+            export(write_blif, [memory])
+
+
+class TestVerilog(unittest.TestCase):
+
+    def test_combinational(self):
+        a, b, c, out = Wire(width=4), Wire(width=4), Wire(width=4), Wire(width=4)
+        text = export(write_verilog, [NandGate(a=a, b=b, c=c, out=out, ways=3, width=4)], names={'a': a, 'b': b, 'c': c, 'q': out})
+        self.assertEqual(text.splitlines(), [
+            'module top(a, b, c, q);',
+            'input [3:0] a;',
+            'input [3:0] b;',
+            'input [3:0] c;',
+            'output [3:0] q;',
+            'assign q = ~(~(a & b) & c);',
+            'endmodule',
+        ])
+
+    def test_sequential(self):
+        value, output, address = Wire(width=2), Wire(width=2), Wire(width=3)
+        gates = [
+            DFF(input=value, output=output, default='01'),
+            Memory(input=output, output=Wire(width=2), write=ConstantWire('1'), address=address, default=0, width=2),
+        ]
+        text = export(write_verilog, gates, name='pipe', names={'d': value, 'q': output, 'addr': address})
+        self.assertTrue(text.startswith('module pipe(clk, addr, d, Memory1_output);\ninput clk;\n'))
+        self.assertIn("reg [1:0] r0;\ninitial r0 = 2'b01;\nassign q = r0;\nalways @(posedge clk) r0 <= d;", text)
+        self.assertIn('reg [1:0] m1 [0:7];', text)
+        self.assertIn("    if (1'b1) m1[addr] = q;", text)
+
+    def test_memory_depth(self):
+        address = Wire(width=48)
+        dense = Memory(input=Wire(width=8), output=Wire(width=8), write=Wire(), address=address, default=0,
+                       width=8, storage=ArrayStorage(1024, 8))
+        self.assertIn('reg [7:0] m0 [0:1023];', export(write_verilog, [dense]))
+
+        sparse = Memory(input=Wire(width=8), output=Wire(width=8), write=Wire(), address=address, default=0,
+                        width=8, storage=PagedStorage(8))
+        with self.assertRaises(HDLError):
+            export(write_verilog, [sparse])
+
+    def test_slices(self):
+        bus = Wire(width=4)
+        text = export(write_verilog, [HalfAdder(a=bus[3], b=bus[2], out=bus[1], carry=bus[0])], names={'input': bus})
+        self.assertIn('output [3:0] n_input;', text)
+        self.assertIn('assign {n_input[3], n_input[2]} = n_input[0] + n_input[1];', text)
+
+    def test_partly_driven(self):
+        bus = Wire(width=6)
+        text = export(write_verilog, [HalfAdder(a=bus[5], b=bus[0], out=bus[2], carry=bus[3])], names={'bus': bus})
+        self.assertEqual(text.splitlines(), [
+            'module top(bus_in, bus);',
+            'output [5:0] bus;',
+            'input [3:0] bus_in;',
+            'assign {bus[5:4], bus[1:0]} = bus_in;',
+            'assign {bus[2], bus[3]} = bus[0] + bus[5];',
+            'endmodule',
+        ])
+
+        bus = Wire(width=2)
+        text = export(write_verilog, [NotGate(inp=bus[0], out=bus[1])], names={'bus': bus})
+        self.assertIn('input bus_in;\nassign bus[1] = bus_in;\nassign bus[0] = ~bus[1];', text)
+
+    def test_scaling(self):
+        def measure(count):
+            gates = random_netlist(count, depth=8, width=4, sequential=0.1, seed=count)[0]
+            times = []
+            for attempt in range(0, 3):
+                start = time.time()
+                export(write_verilog, gates)
+                times.append(time.time() - start)
+            return min(times)
+
+        # Exporting eight times as many gates takes about eight times as long.
+        self.assertLess(measure(8000) / measure(1000), 20)
+
+    def test_lookup_table(self):
+        a, b, out = Wire(), Wire(), Wire()
+        text = export(write_verilog, [LookupTable(table=0b0110, a=a, b=b, out=out)], names={'a': a, 'b': b, 'q': out})
+        self.assertIn("assign q = 4'h6 >> {b, a};", text)
+
+    def test_ripple_carry_adder(self):
+        a, b, out, cout = Wire(width=4), Wire(width=4), Wire(width=4), Wire()
+        gates = [RippleCarryAdder(a=a, b=b, cin=ConstantWire('1'), out=out, cout=cout, width=4)]
+        text = export(write_verilog, gates, names={'a': a, 'b': b, 'q': out, 'c': cout})
+        self.assertIn("assign {c, q} = a + b + 1'b1;", text)
+
+    def test_unknown_gate(self):
+        class Opaque(object):
+            inputs = outputs = ()
+
+        with self.assertRaises(HDLError):
+            export(write_verilog, [Opaque()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+from pyhdl.generator import random_netlist
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.utils import HDLError
+import unittest
+
+
+def shape(gates):
+    return [type(gate).__name__ for gate in gates]
+
+
+class TestRandomNetlist(unittest.TestCase):
+
+    def test_size(self):
+        gates, inputs, outputs = random_netlist(500, sequential=0.2, width=4)
+        self.assertEqual(len(gates), 500)
+        self.assertEqual(len([gate for gate in gates if isinstance(gate, DFF)]), 100)
+        self.assertEqual(len(inputs), 50)
+        self.assertTrue(outputs)
+        self.assertTrue(all(len(wire) == 4 for wire in inputs + outputs))
+
+    def test_seed(self):
+        self.assertEqual(shape(random_netlist(200, seed=3)[0]), shape(random_netlist(200, seed=3)[0]))
+        self.assertNotEqual(shape(random_netlist(200, seed=3)[0]), shape(random_netlist(200, seed=4)[0]))
+
+    def test_acyclic(self):
+        gates, inputs, outputs = random_netlist(1000, depth=8, sequential=0.1, fanout=2.0)
+        sim = Simulator(gates)
+        self.assertEqual(sim.loops, [])
+
+        for wire in inputs:
+            wire.uival = 1
+        sim.eval()
+        sim.run(3)
+        self.assertTrue(all('x' not in wire.val for wire in outputs))
+
+    def test_invalid(self):
+        self.assertRaises(HDLError, random_netlist, 10, depth=0)
+        self.assertRaises(HDLError, random_netlist, 10, sequential=2)
@@ -0,0 +1,196 @@
+from pyhdl.importer import Netlist, load, read_bench, read_blif
+from pyhdl.primitives import *
+from pyhdl.utils import HDLError
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+
+C17 = """
+# c17, the smallest ISCAS-85 circuit
+INPUT(1)
+INPUT(2)
+INPUT(3)
+INPUT(6)
+INPUT(7)
+
+OUTPUT(22)
+OUTPUT(23)
+
+10 = NAND(1, 3)
+11 = NAND(3, 6)
+16 = NAND(2, 11)
+19 = NAND(11, 7)
+22 = NAND(10, 16)
+23 = NAND(16, 19)
+""".splitlines()
+
+
+def nand(*values):
+    return int(not all(values))
+
+
+class TestBench(unittest.TestCase):
+
+    def test_c17(self):
+        netlist = read_bench(C17)
+        self.assertEqual(netlist.inputs, ['1', '2', '3', '6', '7'])
+        self.assertEqual(netlist.outputs, ['22', '23'])
+        self.assertEqual(len(netlist.gates), 6)
+
+        sim = netlist.simulator()
+        for values in itertools.product((0, 1), repeat=5):
+            for name, value in zip(netlist.inputs, values):
+                netlist.wires[name].uival = value
+            sim.eval()
+
+            n1, n2, n3, n6, n7 = values
+            n11 = nand(n3, n6)
+            n16 = nand(n2, n11)
+            self.assertEqual(netlist.wires['22'].uival, nand(nand(n1, n3), n16))
+            self.assertEqual(netlist.wires['23'].uival, nand(n16, nand(n11, n7)))
+
+    def test_gates(self):
+        netlist = read_bench("""
+            INPUT(a)
+            INPUT(b)
+            INPUT(c)
+            OUTPUT(q)
+            n3 = NAND(a, b, c)
+            x3 = XNOR(a, b, c)
+            o3 = NOR(a, b, c)
+            y = BUFF(a)
+            q = DFF(n3)
+        """.splitlines())
+        sim = netlist.simulator()
+        self.assertEqual(sim.loops, [])
+
+        for values in itertools.product((0, 1), repeat=3):
+            for name, value in zip('abc', values):
+                netlist.wires[name].uival = value
+            sim.eval()
+            sim.tick(), sim.tock()
+
+            self.assertEqual(netlist.wires['n3'].uival, nand(*values))
+            self.assertEqual(netlist.wires['x3'].uival, 1 - (sum(values) % 2))
+            self.assertEqual(netlist.wires['o3'].uival, int(not any(values)))
+            self.assertEqual(netlist.wires['y'].uival, values[0])
+            self.assertEqual(netlist.wires['q'].uival, nand(*values))
+
+    def test_wide(self):
+        names = ['i{0}'.format(i) for i in range(0, 60)]
+        netlist = read_bench(['INPUT({0})'.format(name) for name in names] + ['o = AND({0})'.format(', '.join(names))])
+        sim = netlist.simulator()
+
+        for name in names:
+            netlist.wires[name].uival = 1
+        sim.eval()
+        self.assertEqual(netlist.wires['o'].uival, 1)
+
+        netlist.wires['i59'].uival = 0
+        sim.eval()
+        self.assertEqual(netlist.wires['o'].uival, 0)
+
+    def test_errors(self):
+        self.assertRaises(HDLError, read_bench, ['x = FOO(a, b)'])
+        self.assertRaises(HDLError, read_bench, ['what is this'])
+
+
+FULL_ADDER = r"""
+.model full_adder
+.inputs a b \
+  cin
+.outputs sum cout
+# sum is the parity of the inputs
+.names a b cin sum
+100 1
+010 1
+001 1
+111 1
+.names a b cin cout
+11- 1
+1-1 1
+-11 1
+.end
+"""
+
+
+class TestBlif(unittest.TestCase):
+
+    def test_full_adder(self):
+        netlist = read_blif(FULL_ADDER.splitlines())
+        self.assertEqual(netlist.name, 'full_adder')
+        self.assertEqual(netlist.inputs, ['a', 'b', 'cin'])
+
+        sim = netlist.simulator()
+        for values in itertools.product((0, 1), repeat=3):
+            for name, value in zip(netlist.inputs, values):
+                netlist.wires[name].uival = value
+            sim.eval()
+
+            self.assertEqual(netlist.wires['sum'].uival, sum(values) % 2)
+            self.assertEqual(netlist.wires['cout'].uival, int(sum(values) >= 2))
+
+    def test_counter(self):
+        netlist = read_blif("""
+            .model toggle
+            .inputs enable
+            .outputs q
+            .latch next q re clk 1
+            .names enable q next
+            10 1
+            01 1
+            .names zero
+            .names one
+            1
+            .names q nq
+            1 0
+            .end
+        """.splitlines())
+        sim = netlist.simulator()
+        self.assertEqual(netlist.wires['q'].val, '1')
+
+        netlist.wires['enable'].uival = 1
+        sim.eval()
+        self.assertEqual(netlist.wires['zero'].uival, 0)
+        self.assertEqual(netlist.wires['one'].uival, 1)
+
+        values = []
+        for cycle in range(0, 4):
+            sim.run(1)
+            values.append((netlist.wires['q'].uival, netlist.wires['nq'].uival))
+        self.assertEqual(values, [(0, 1), (1, 0), (0, 1), (1, 0)])
+
+    def test_latch_init(self):
+        # An omitted initial value is unknown, like an initial value of 2 or 3.
+        netlist = read_blif("""
+            .inputs d
+            .latch d q
+            .latch d r re clk
+            .latch d s re clk 0
+            .latch d t 1
+            .latch d u re clk 3
+            .end
+        """.splitlines())
+        self.assertEqual([gate.state for gate in netlist.gates], ['x', 'x', '0', '1', 'x'])
+
+    def test_errors(self):
+        self.assertRaises(HDLError, read_blif, ['.subckt adder a=x'])
+        self.assertRaises(HDLError, read_blif, ['11 1'])
+        self.assertRaises(HDLError, read_blif, ['.names a b c', '1 1'])
+
+
+class TestLoad(unittest.TestCase):
+
+    def test_extension(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        path = os.path.join(directory, 'c17.bench')
+        with open(path, 'w') as bench:
+            bench.write('\n'.join(C17))
+
+        self.assertEqual(len(load(path).gates), 6)
+        self.assertRaises(HDLError, load, path, 'edif')
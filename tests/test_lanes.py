@@ -0,0 +1,92 @@
+from pyhdl.lanes import LaneSimulator, numpy
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.utils import HDLError
+from pyhdl.wire import Wire, ConstantWire
+import random
+import unittest
+
+
+def build():
+    a, b, bits, sel = Wire(width=16), Wire(width=16), Wire(width=3), Wire(width=2)
+    total, inverted, mux, halves = Wire(width=16), Wire(width=16), Wire(width=4), Wire(width=2)
+    demux, q, write, r = Wire(width=4), Wire(width=4), Wire(), Wire(width=4)
+    mask = ConstantWire('0000111100001111', width=16)
+
+    gates = [
+        Adder(a=a, b=b, out=total, width=16),
+        NandGate(a=total, b=mask, out=inverted, width=16),
+        NorGate(a=bits[0], b=bits[1], out=halves[0]),
+        XorGate(a=bits[1], b=bits[2], out=halves[1]),
+        HalfAdder(a=halves[0], b=halves[1], out=mux[0], carry=mux[1]),
+        FullAdder(a=bits[0], b=bits[1], cin=bits[2], out=mux[2], cout=mux[3]),
+        Multiplexer(a=total[0:4], b=inverted[4:8], c=q, d=r, sel=sel, out=demux, width=4, ways=4),
+        NotGate(inp=sel[0], out=write),
+        DFF(input=mux, output=q, default='0000'),
+        Register(input=demux, write=write, output=r, default='1010'),
+    ]
+
+    return gates, [a, b, bits, sel], [total, inverted, mux, halves, demux, q, r, write]
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestLaneSimulator(unittest.TestCase):
+
+    lanes = 16
+
+    def setUp(self):
+        gates, self.inputs, self.outputs = build()
+        self.simulator = LaneSimulator(gates, self.lanes)
+
+        rng = random.Random(7)
+        self.vectors = [[rng.randrange(0, 1 << len(wire)) for wire in self.inputs]
+                        for lane in range(0, self.lanes)]
+
+    def reference(self, steps):
+        results = []
+        for vector in self.vectors:
+            gates, inputs, outputs = build()
+            simulator = Simulator(gates)
+            for wire, value in zip(inputs, vector):
+                wire.uival = value
+            for step in steps:
+                getattr(simulator, step)()
+            results.append([wire.val for wire in outputs])
+        return results
+
+    def run_lanes(self, steps):
+        for position, wire in enumerate(self.inputs):
+            self.simulator.set(wire, [vector[position] for vector in self.vectors])
+        for step in steps:
+            getattr(self.simulator, step)()
+
+        results = [[] for lane in range(0, self.lanes)]
+        for wire in self.outputs:
+            values, xmasks = self.simulator.read(wire)
+            for lane in range(0, self.lanes):
+                scratch = Wire(width=len(wire))
+                scratch.bits = (int(numpy.broadcast_to(values, (self.lanes,))[lane]),
+                                int(numpy.broadcast_to(xmasks, (self.lanes,))[lane]))
+                results[lane].append(scratch.val)
+        return results
+
+    def test_eval(self):
+        self.assertEqual(self.run_lanes(['eval']), self.reference(['eval']))
+
+    def test_cycle(self):
+        steps = ['eval', 'tick', 'tock', 'eval', 'tick', 'tock', 'eval']
+        self.assertEqual(self.run_lanes(steps), self.reference(steps))
+
+    def test_get(self):
+        self.run_lanes(['eval'])
+        expected = [(vector[0] + vector[1]) & 0xffff for vector in self.vectors]
+        self.assertEqual(list(self.simulator.get(self.outputs[0])), expected)
+
+    def test_undefined(self):
+        with self.assertRaises(HDLError):
+            self.simulator.get(self.outputs[0])
+
+    def test_unsupported(self):
+        memory = Memory(input=Wire(), output=Wire(), write=Wire(), address=Wire(), default=0)
+        with self.assertRaises(HDLError):
+            LaneSimulator([memory], self.lanes)
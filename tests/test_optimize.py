@@ -0,0 +1,358 @@
+from pyhdl.generator import random_netlist
+from pyhdl.optimize import collapse, optimize, recover_adders
+from pyhdl.utils import HDLError
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.wire import ConstantWire, Wire
+import random
+import unittest
+
+
+def shape(gates):
+    return sorted(type(gate).__name__ for gate in gates)
+
+
+def random_design(seed, gates=300, width=4):
+    """
+        A random design reading from a mix of input wires and constants, with some flip
+        flops. Returns the gates, the input wires and the flip flop outputs.
+    """
+    rng = random.Random(seed)
+    inputs = [Wire(width=width) for wire in range(0, 8)]
+    constants = [ConstantWire(value, width=width) for value in ('0000', '1111', '0101', '0000', '1111')]
+    states = [Wire(width=width) for state in range(0, 4)]
+    select = [ConstantWire(value, width=2) for value in ('00', '01', '10', '11')]
+    pool = inputs + constants + states
+    design = []
+
+    for gate in range(0, gates):
+        kind = rng.choice((NandGate, AndGate, NorGate, OrGate, XorGate, NotGate, Multiplexer))
+        out = Wire(width=width)
+        if kind is NotGate:
+            design.append(NotGate(inp=rng.choice(pool), out=out, width=width))
+        elif kind is Multiplexer:
+            ways = [rng.choice(pool) for way in range(0, 4)]
+            sel = rng.choice(select + [inputs[0][0:2]])
+            design.append(Multiplexer(a=ways[0], b=ways[1], c=ways[2], d=ways[3], sel=sel, out=out, width=width, ways=4))
+        else:
+            ways = rng.randint(2, 3)
+            letters = dict(zip('abc', [rng.choice(pool) for way in range(0, ways)]))
+            design.append(kind(out=out, ways=ways, width=width, **letters))
+        pool.append(out)
+
+    for state in states:
+        design.append(DFF(input=rng.choice(pool[-50:]), output=state, default='0' * width))
+
+    return design, inputs, states
+
+
+class TestOptimize(unittest.TestCase):
+
+    def test_fold(self):
+        a, b, c, d = Wire(), Wire(), Wire(), Wire()
+        gates = [
+            AndGate(a=a, b=ConstantWire('0'), out=b),
+            NotGate(inp=b, out=c),
+            OrGate(a=c, b=a, out=d),
+        ]
+        self.assertEqual(optimize(gates, keep=[b, c, d], controlling=True), [])
+        self.assertEqual((b.val, c.val, d.val), ('0', '1', '1'))
+
+    def test_undefined(self):
+        # and(0, x) is x, so it is only folded when asked to.
+        a, b, q = Wire(), Wire(), Wire(width=2)
+        gates = [AndGate(a=ConstantWire('0'), b=a, out=b), DFF(input=b, output=q[0], default='0'), DFF(input=b, output=q[1], default='0')]
+        optimized = optimize(gates)
+        self.assertEqual(shape(optimized), ['AndGate', 'DFF', 'DFF'])
+        Simulator(optimized).run(1)
+        self.assertEqual(q.val, 'xx')
+
+        folded = optimize(gates, controlling=True)
+        self.assertEqual(shape(folded), ['DFF', 'DFF'])
+        Simulator(folded).run(1)
+        self.assertEqual(q.val, '00')
+
+    def test_identity(self):
+        a, b, c, out = Wire(width=2), Wire(width=2), Wire(width=2), Wire(width=2)
+        one = ConstantWire('11', width=2)
+        gates = optimize([AndGate(a=a, b=one, c=b, out=out, ways=3, width=2)], keep=[out])
+        self.assertEqual(shape(gates), ['AndGate'])
+        self.assertEqual((gates[0].a, gates[0].b, len(gates[0].signals)), (a, b, 2))
+
+        nand = optimize([NandGate(a=one, b=c, out=out, width=2)], keep=[out])
+        self.assertEqual(shape(nand), ['NotGate'])
+        self.assertIs(nand[0].inp, c)
+
+        nor = optimize([NorGate(a=c, b=one, out=out, width=2)], keep=[out])
+        self.assertEqual(shape(nor), ['NorGate'])
+        nor = optimize([NorGate(a=c, b=one, out=out, width=2)], keep=[out], controlling=True)
+        self.assertEqual(nor, [])
+        self.assertEqual(out.val, '00')
+
+    def test_inverted_fold(self):
+        # nand(nand(a, 1), c) depends on both a and c, so it is left alone.
+        a, c, out = Wire(), Wire(), Wire()
+        gates = [NandGate(a=a, b=ConstantWire('1'), c=c, out=out, ways=3)]
+        self.assertEqual(optimize(gates, keep=[out]), gates)
+
+    def test_selection(self):
+        a, b, out, x, y = Wire(), Wire(), Wire(), Wire(), Wire()
+        gates = optimize([
+            Multiplexer(a=a, b=b, sel=ConstantWire('1'), out=out),
+            Demultiplexer(a=x, b=y, sel=ConstantWire('0'), input=a),
+        ], keep=[out, x, y])
+
+        self.assertEqual(shape(gates), ['OrGate', 'OrGate'])
+        self.assertEqual(y.val, '0')
+
+        sim = Simulator(gates)
+        a.val, b.val = '1', '0'
+        sim.eval()
+        self.assertEqual((out.val, x.val), ('0', '1'))
+        b.val = '1'
+        sim.eval()
+        self.assertEqual(out.val, '1')
+
+    def test_dead(self):
+        a, b, c, d, q = Wire(), Wire(), Wire(), Wire(), Wire()
+        read = NotGate(inp=a, out=b)
+        unread = NotGate(inp=a, out=c)
+        observed = NotGate(inp=c, out=d)
+        flop = DFF(input=b, output=q, default='0')
+
+        self.assertEqual(optimize([read, unread, observed, flop], keep=[]), [read, flop])
+        self.assertEqual(optimize([read, unread, observed, flop], keep=[d]), [read, unread, observed, flop])
+
+        # Without keep, the wires which nothing reads are outputs.
+        self.assertEqual(optimize([read, unread, observed, flop]), [read, unread, observed, flop])
+        self.assertEqual(optimize([read, unread, flop]), [read, unread, flop])
+
+    def test_shared(self):
+        # Bits driven by two gates are not constant, whatever either gate does.
+        bus = Wire(width=2)
+        gates = [
+            AndGate(a=ConstantWire('0'), b=ConstantWire('1'), out=bus[0]),
+            AndGate(a=ConstantWire('1'), b=ConstantWire('1'), out=bus[0]),
+        ]
+        self.assertEqual(optimize(gates, keep=[bus]), gates)
+
+    def test_equivalent(self):
+        for seed in range(0, 5):
+            original, inputs, states = random_design(seed)
+            copy, copy_inputs, copy_states = random_design(seed)
+            optimized = optimize(copy, keep=copy_states)
+            self.assertLess(len(optimized), len(copy))
+            self.assertLessEqual(len(optimize(copy, keep=copy_states, controlling=True)), len(optimized))
+
+            sim, fast = Simulator(original), Simulator(optimized)
+            rng = random.Random(seed)
+            for cycle in range(0, 20):
+                for wire, other in zip(inputs, copy_inputs):
+                    wire.uival = other.uival = rng.getrandbits(4)
+                sim.run(1)
+                fast.run(1)
+                self.assertEqual([wire.val for wire in states], [wire.val for wire in copy_states])
+
+
+def nand_adder(width):
+    """
+        A ripple carry adder built from nine NAND gates per bit.
+    """
+    a, b, out = Wire(width=width), Wire(width=width), Wire(width=width)
+    carry, gates = ConstantWire('0'), []
+    # Index 0 of a wire is its most significant bit.
+    for bit in reversed(range(0, width)):
+        n1, n2, n3, half, n4, n5, n6, cout = [Wire() for wire in range(0, 8)]
+        gates.extend([
+            NandGate(a=a[bit], b=b[bit], out=n1),
+            NandGate(a=a[bit], b=n1, out=n2),
+            NandGate(a=b[bit], b=n1, out=n3),
+            NandGate(a=n2, b=n3, out=half),
+            NandGate(a=half, b=carry, out=n4),
+            NandGate(a=half, b=n4, out=n5),
+            NandGate(a=carry, b=n4, out=n6),
+            NandGate(a=n5, b=n6, out=out[bit]),
+            NandGate(a=n4, b=n1, out=cout),
+        ])
+        carry = cout
+    return gates, a, b, out
+
+
+class TestCollapse(unittest.TestCase):
+
+    def test_chain(self):
+        a, b, c, d, e, out = Wire(), Wire(), Wire(), Wire(), Wire(), Wire()
+        gates = collapse([
+            NandGate(a=a, b=b, out=c),
+            NotGate(inp=c, out=d),
+            OrGate(a=d, b=ConstantWire('0'), c=e, out=out, ways=3),
+        ])
+        self.assertEqual(shape(gates), ['LookupTable'])
+        self.assertEqual((gates[0].a, gates[0].b, gates[0].c), (e, a, b))
+
+        sim = Simulator(gates)
+        for row in range(0, 8):
+            e.uival, a.uival, b.uival = row & 1, (row >> 1) & 1, row >> 2
+            sim.eval()
+            self.assertEqual(out.uival, int(e.uival or (a.uival and b.uival)))
+        b.val = 'x'
+        sim.eval()
+        self.assertEqual(out.val, 'x')
+
+    def test_fanout(self):
+        a, b, c, d, e = Wire(), Wire(), Wire(), Wire(), Wire()
+        shared = NandGate(a=a, b=b, out=c)
+        gates = [shared, NotGate(inp=c, out=d), NotGate(inp=c, out=e)]
+        self.assertEqual(collapse(gates), gates)
+
+        # A wire read only inside one cone is absorbed, even when read twice.
+        out = Wire()
+        gates = collapse(gates + [XorGate(a=d, b=e, out=out)])
+        self.assertEqual(shape(gates), ['LookupTable'])
+        self.assertEqual(gates[0].table, 0)
+
+    def test_keep(self):
+        a, b, c, d = Wire(), Wire(), Wire(), Wire()
+        gates = [NandGate(a=a, b=b, out=c), NotGate(inp=c, out=d)]
+        self.assertEqual(collapse(gates, keep=[c]), gates)
+        self.assertEqual(shape(collapse(gates, keep=[d])), ['LookupTable'])
+
+    def test_max_inputs(self):
+        gates, a, b, out = nand_adder(8)
+        for limit in (2, 3, 5, 12):
+            tables = [gate for gate in collapse(gates, max_inputs=limit) if isinstance(gate, LookupTable)]
+            self.assertTrue(tables)
+            self.assertTrue(all(len(gate.signals) <= limit for gate in tables))
+
+        with self.assertRaises(HDLError):
+            collapse(gates, max_inputs=27)
+
+    def test_adder(self):
+        gates, a, b, out = nand_adder(16)
+        copy, copy_a, copy_b, copy_out = nand_adder(16)
+        collapsed = collapse(copy, keep=[copy_out])
+        self.assertLess(len(collapsed), len(copy) * 2 // 3)
+
+        rng = random.Random(1)
+        sim, fast = Simulator(gates), Simulator(collapsed)
+        for x in range(0, 50):
+            a.uival = copy_a.uival = rng.getrandbits(16)
+            b.uival = copy_b.uival = rng.getrandbits(16)
+            sim.eval()
+            fast.eval()
+            self.assertEqual(copy_out.uival, out.uival)
+            self.assertEqual(out.uival, (a.uival + b.uival) & 0xffff)
+
+    def test_random(self):
+        kinds = (NandGate, NorGate, AndGate, OrGate, XorGate, NotGate)
+        for seed in range(0, 4):
+            gates, inputs, outputs = random_netlist(400, depth=12, fanout=0.5, sequential=0.05, kinds=kinds, seed=seed)
+            copy, copy_inputs, copy_outputs = random_netlist(400, depth=12, fanout=0.5, sequential=0.05, kinds=kinds, seed=seed)
+            collapsed = collapse(copy, max_inputs=8, keep=copy_outputs)
+            self.assertLess(len(collapsed), len(copy))
+
+            rng = random.Random(seed)
+            sim, fast = Simulator(gates), Simulator(collapsed)
+            for cycle in range(0, 20):
+                for wire, other in zip(inputs, copy_inputs):
+                    wire.val = other.val = rng.choice('01x' if cycle == 0 else '01')
+                sim.run(1)
+                fast.run(1)
+                self.assertEqual([wire.val for wire in outputs], [wire.val for wire in copy_outputs])
+
+
+def full_adder_chain(width, half=False):
+    """
+        A ripple carry adder built from one full adder per bit, or a half adder for the
+        lowest bit. Returns the gates, the inputs, the sum and the carries.
+    """
+    a, b, cin, out = Wire(width=width), Wire(width=width), Wire(), Wire(width=width)
+    carries, gates = [Wire() for bit in range(0, width)], []
+    carry = cin
+    for position, bit in enumerate(reversed(range(0, width))):
+        if half and position == 0:
+            gates.append(HalfAdder(a=a[bit], b=b[bit], out=out[bit], carry=carries[position]))
+        else:
+            gates.append(FullAdder(a=a[bit], b=b[bit], cin=carry, out=out[bit], cout=carries[position]))
+        carry = carries[position]
+    return gates, [a, b, cin], out, carries
+
+
+class TestRecoverAdders(unittest.TestCase):
+
+    def compare(self, gates, recovered, inputs, outputs, seed=0):
+        rng = random.Random(seed)
+        sim, fast = Simulator(gates), Simulator(recovered)
+        for cycle in range(0, 50):
+            for wire in inputs:
+                wire.val = ''.join(rng.choice('01' if cycle % 5 else '0001x') for bit in range(0, len(wire)))
+            sim.eval()
+            expected = [wire.val for wire in outputs]
+            fast.eval()
+            self.assertEqual([wire.val for wire in outputs], expected)
+
+    def test_chain(self):
+        gates, inputs, out, carries = full_adder_chain(16)
+        recovered = recover_adders(gates)
+        self.assertEqual(shape(recovered), ['RippleCarryAdder'])
+        adder = recovered[0]
+        self.assertEqual((adder.a, adder.b, adder.cin, adder.out, adder.cout), tuple(inputs) + (out, carries[-1]))
+        self.compare(gates, recovered, inputs, [out, carries[-1]])
+
+    def test_half_adder(self):
+        gates, inputs, out, carries = full_adder_chain(8, half=True)
+        recovered = recover_adders(gates)
+        self.assertEqual(shape(recovered), ['RippleCarryAdder'])
+        self.assertEqual(recovered[0].cin.val, '0')
+        self.compare(gates, recovered, inputs[:2], [out, carries[-1]])
+
+    def test_undefined(self):
+        gates, inputs, out, carries = full_adder_chain(8)
+        recovered = recover_adders(gates)
+        a, b, cin = inputs
+        a.val, b.uival, cin.uival = '000x0001', 3, 0
+        Simulator(recovered).eval()
+        self.assertEqual((out.val, carries[-1].val), ('xxxx0100', 'x'))
+
+    def test_observed_carry(self):
+        # A carry which is kept, or read elsewhere, splits the chain.
+        gates, inputs, out, carries = full_adder_chain(8)
+        self.assertEqual(shape(recover_adders(gates, keep=[carries[3]])), ['RippleCarryAdder', 'RippleCarryAdder'])
+
+        watch = NotGate(inp=carries[5], out=Wire())
+        recovered = recover_adders(gates + [watch])
+        self.assertEqual(shape(recovered), ['NotGate', 'RippleCarryAdder', 'RippleCarryAdder'])
+        self.assertEqual([len(gate.out) for gate in recovered[:2]], [6, 2])
+        self.compare(gates + [watch], recovered, inputs, [out, carries[-1], watch.out])
+
+    def test_scattered(self):
+        # Bits which are not consecutive bits of one wire are left as they are.
+        a, b, out, carry = Wire(width=4), Wire(width=4), Wire(width=4), Wire()
+        gates = [
+            HalfAdder(a=a[3], b=b[3], out=out[3], carry=carry),
+            FullAdder(a=a[1], b=b[2], cin=carry, out=out[2], cout=Wire()),
+        ]
+        self.assertEqual(recover_adders(gates), gates)
+
+        # A stage reading the sum of an earlier stage.
+        a, out, carry = Wire(width=2), Wire(width=2), Wire()
+        gates = [
+            HalfAdder(a=a[1], b=out[0], out=out[1], carry=carry),
+            FullAdder(a=a[0], b=out[1], cin=carry, out=out[0], cout=Wire()),
+        ]
+        self.assertEqual(recover_adders(gates), gates)
+
+    def test_accumulator(self):
+        # A counter whose adder feeds back through a flip flop.
+        gates, inputs, out, carries = full_adder_chain(12)
+        a, b, cin = inputs
+        gates.append(DFF(input=out, output=a, default='0' * 12))
+        b.uival, cin.uival = 3, 1
+
+        sim = Simulator(recover_adders(gates))
+        sim.run(10)
+        self.assertEqual(a.uival, 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+from pyhdl.primitives import *
+from pyhdl.profiler import Profiler
+from pyhdl.simulator import Simulator
+from pyhdl.wire import Wire
+import functools
+import itertools
+import unittest
+
+
+def build():
+    count, total, one, low = Wire(width=2), Wire(width=2), Wire(width=2), Wire()
+    one.val = '01'
+    gates = [
+        Adder(a=count, b=one, out=total, width=2),
+        DFF(input=total, output=count, default='00'),
+        NotGate(inp=one[0], out=low),
+    ]
+    return gates
+
+
+def ticks():
+    return functools.partial(next, itertools.count())
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_counts(self):
+        gates = build()
+        sim = Simulator(gates)
+        sim.eval()
+
+        with Profiler(sim, clock=ticks()) as profiler:
+            sim.run(4)
+
+        adder, dff, inverter = gates
+        self.assertEqual(profiler.stats[adder].calls, {'eval': 8, 'tick': 0, 'tock': 0})
+        self.assertEqual(profiler.stats[dff].calls, {'eval': 0, 'tick': 4, 'tock': 4})
+        self.assertEqual(profiler.stats[adder].changes, 4)
+        self.assertEqual(profiler.stats[inverter].changes, 0)
+        self.assertEqual(profiler.stats[dff].changes, 4)
+
+        # The fake clock advances by one between the start and end of every call.
+        self.assertEqual(profiler.stats[adder].time, 8)
+        self.assertEqual(profiler.by_class()['DFF'].total, 8)
+
+        # Every gate took 8 ticks, so they are listed in the order of the gates.
+        self.assertEqual(profiler.stats[inverter].time, 8)
+        hottest = profiler.hottest(2)
+        self.assertEqual([gate for gate, stats in hottest], [adder, dff])
+
+        report = profiler.report()
+        self.assertIn('Adder0', report)
+        self.assertIn('NotGate', report)
+
+    def test_restore(self):
+        sim = Simulator(build())
+        sim.compile()
+        compiled = sim._eval, sim._tick, sim._tock
+
+        profiler = Profiler(sim)
+        profiler.start()
+        self.assertNotEqual(sim._eval, compiled[0])
+        sim.run(2)
+        profiler.stop()
+
+        self.assertEqual((sim._eval, sim._tick, sim._tock), compiled)
+        sim.run(2)
+        self.assertEqual(profiler.by_class()['Adder'].calls['eval'], 4)
+
+    def test_event_driven(self):
+        gates = build()
+        sim = Simulator(gates, event_driven=True)
+        sim.eval()
+
+        with Profiler(sim) as profiler:
+            sim.run(4)
+
+        adder, dff, inverter = gates
+        self.assertEqual(profiler.stats[adder].calls['eval'], 4)
+        self.assertEqual(profiler.stats[inverter].calls['eval'], 0)
+        self.assertEqual(sim.gates[1].output.uival, 0)
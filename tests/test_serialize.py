@@ -0,0 +1,113 @@
+from pyhdl.generator import random_netlist
+from pyhdl.primitives import *
+from pyhdl.serialize import load, save
+from pyhdl.simulator import Simulator
+from pyhdl.storage import ArrayStorage, PagedStorage
+from pyhdl.utils import HDLError
+from pyhdl.wire import ConstantWire, Wire
+import io
+import random
+import unittest
+
+
+def round_trip(sim):
+    data = io.BytesIO()
+    save(sim, data)
+    data.seek(0)
+    return load(data)
+
+
+def values(sim):
+    """
+        The values of every port of every gate, in order.
+    """
+    return [gate.view(port).val for gate in sim.gates for port in gate.inputs + gate.outputs]
+
+
+class TestSerialize(unittest.TestCase):
+
+    def test_random(self):
+        for event_driven in (False, True):
+            gates, inputs, outputs = random_netlist(200, depth=8, width=4, sequential=0.1, seed=3)
+            sim = Simulator(gates, event_driven=event_driven)
+            rng = random.Random(0)
+            for wire in inputs:
+                wire.uival = rng.getrandbits(4)
+            sim.run(5)
+
+            copy = round_trip(sim)
+            self.assertEqual(copy.event_driven, event_driven)
+            self.assertEqual(copy.cycle, 5)
+            self.assertEqual([type(gate) for gate in copy.schedule], [type(gate) for gate in sim.schedule])
+            self.assertEqual(values(copy), values(sim))
+
+            # The gates keep their order, so the copy's inputs are found through them.
+            ports = dict(
+                (id(gate.view(port)), (position, port)) for position, gate in enumerate(sim.gates)
+                for port in gate.inputs if any(gate.view(port) is wire for wire in inputs)
+            )
+            for cycle in range(0, 10):
+                for wire in inputs:
+                    wire.uival = rng.getrandbits(4)
+                    if id(wire) in ports:
+                        position, port = ports[id(wire)]
+                        copy.gates[position].view(port).uival = wire.uival
+                sim.run(1)
+                copy.run(1)
+                self.assertEqual(values(copy), values(sim))
+
+    def test_state(self):
+        value, output, write = Wire(width=4), Wire(width=4), Wire()
+        bus, address = Wire(width=8), Wire(width=3)
+        constant = ConstantWire('1x0', width=3)
+        gates = [
+            DFF(input=value, output=output, default='0101'),
+            Register(input=bus[0:4], write=write, output=bus[4:8], default='1x10'),
+            Memory(input=output, output=Wire(width=4), write=write, address=address, default={3: 9}, width=4),
+            Memory(input=output, output=Wire(width=4), write=write, address=address, default=7, width=4, depth=8),
+            Memory(input=output, output=Wire(width=4), write=write, address=address, default=0, width=4,
+                   storage=PagedStorage(4, fill=2, page_size=4)),
+            XorGate(a=constant, b=address, out=Wire(width=3), width=3),
+            LookupTable(table=0b1000, a=write, b=value[0], out=Wire()),
+            RippleCarryAdder(a=value, b=output, cin=ConstantWire('1'), out=Wire(width=4), cout=Wire(), width=4),
+        ]
+        gates[4].memory.write(5, 11)
+        value.val = '1111'
+        gates[0].tick()
+
+        copy = round_trip(Simulator(gates))
+        dff, register, memory, array, paged, xor, table, adder = copy.gates
+
+        self.assertEqual(dff.state, '1111')
+        self.assertEqual(dff.output.val, '0101')
+        self.assertEqual(register.state, '1x10')
+        self.assertIs(register.input.root, register.output.root)
+        self.assertEqual(memory.memory.dump(), {3: 9})
+        self.assertIsInstance(array.memory, ArrayStorage)
+        self.assertEqual([array.memory.read(address) for address in range(0, 8)], [7] * 8)
+        self.assertEqual((paged.memory.read(5), paged.memory.read(100), sorted(paged.memory.pages)), (11, 2, [1]))
+        self.assertEqual(xor.a.val, '1x0')
+        self.assertIsInstance(xor.a, ConstantWire)
+        self.assertEqual((table.table, table.a, table.signals), (0b1000, memory.write, ('a', 'b')))
+        self.assertEqual((adder.b, adder.cin.val, len(adder.out)), (dff.output, '1', 4))
+
+    def test_header(self):
+        data = io.BytesIO()
+        save(Simulator([NotGate(inp=Wire(), out=Wire())]), data)
+        self.assertTrue(data.getvalue().startswith(b'PYHDL\x01\x00'))
+
+        with self.assertRaises(HDLError):
+            load(io.BytesIO(b'PYHDL\x02\x00' + data.getvalue()[7:]))
+        with self.assertRaises(HDLError):
+            load(io.BytesIO(b'NOTIT'))
+
+    def test_unknown_gate(self):
+        class Inverter(NotGate):
+            __slots__ = ()
+
+        with self.assertRaises(HDLError):
+            save(Simulator([Inverter(inp=Wire(), out=Wire())]), io.BytesIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,12 @@
+from pyhdl.generator import random_netlist
 from pyhdl.simulator import Simulator, flatten_list
+from pyhdl.primitives import Adder, DFF, Memory, NandGate, NotGate, Register
+from pyhdl.storage import PagedStorage
+from pyhdl.utils import HDLError, HDLWarning
+from pyhdl.wire import ConstantWire, Wire
+import random
 import unittest
+import warnings
 
 
 def test_flatten_list():
@@ -83,3 +90,373 @@ class TestSimulator(unittest.TestCase):
     def test_eval(self):
         self.simulator.eval()
         self.assertEqual(self.evals, list(range(1, 10)))
+
+
+class CountingNandGate(NandGate):
+
+    def __init__(self, evals, **kwargs):
+        super(CountingNandGate, self).__init__(**kwargs)
+        self.evals = evals
+
+    def eval(self):
+        self.evals.append(self)
+        super(CountingNandGate, self).eval()
+
+
+class TestEventDriven(unittest.TestCase):
+
+    def setUp(self):
+        self.evals = []
+        self.bus = Wire(width=4)
+        self.n1, self.n2, self.out = Wire(), Wire(), Wire()
+
+        self.g1 = CountingNandGate(self.evals, a=self.bus[0], b=self.bus[1], out=self.n1)
+        self.g2 = CountingNandGate(self.evals, a=self.bus[2], b=self.bus[3], out=self.n2)
+        self.g3 = CountingNandGate(self.evals, a=self.n1, b=self.n2, out=self.out)
+
+        self.simulator = Simulator([self.g3, [self.g1, self.g2]], event_driven=True)
+        self.bus.val = '1111'
+        self.simulator.eval()
+        del self.evals[:]
+
+    def test_settle(self):
+        self.assertEqual(self.n1.val, '0')
+        self.assertEqual(self.out.val, '1')
+
+    def test_idle(self):
+        self.simulator.eval()
+        self.assertEqual(self.evals, [])
+
+    def test_unchanged(self):
+        self.bus.val = '1111'
+        self.simulator.eval()
+        self.assertEqual(self.evals, [])
+
+    def test_partial(self):
+        self.bus[3].val = '0'
+        self.simulator.eval()
+        self.assertEqual(self.evals, [self.g2, self.g3])
+        self.assertEqual(self.out.val, '1')
+
+    def test_masked(self):
+        self.bus[0].val = '0'
+        self.bus[0].val = '1'
+        self.simulator.eval()
+        self.assertEqual(self.evals, [self.g1])
+
+    def test_opaque(self):
+        evals, ticks, tocks = [], [], []
+        simulator = Simulator([GateSimulator(1, evals, ticks, tocks)], event_driven=True)
+        simulator.eval()
+        simulator.eval()
+        self.assertEqual(evals, [1, 1])
+
+    def test_close(self):
+        self.simulator.close()
+        self.assertIsNone(self.bus._watchers)
+        self.assertIsNone(self.out._watchers)
+
+        # A closed simulator evaluates every gate.
+        self.bus[3].val = '0'
+        self.simulator.eval()
+        self.assertEqual(self.evals, [self.g1, self.g2, self.g3])
+        self.simulator.close()
+
+    def test_rebuild(self):
+        # A new simulator on the same wires closes the old one, which no longer
+        # schedules its gates.
+        other = Simulator([self.g1, self.g2, self.g3], event_driven=True)
+        self.assertFalse(self.simulator.event_driven)
+        self.assertEqual(self.bus._watchers, [other._notify])
+        self.bus[3].val = '0'
+        self.assertEqual(self.simulator._queue, [])
+        other.eval()
+        self.assertEqual(self.evals, [self.g1, self.g2, self.g3])
+
+        Simulator([self.g1, self.g2, self.g3]).compile()
+        self.assertFalse(other.event_driven)
+        self.assertIsNone(self.bus._watchers)
+
+    def test_oscillation(self):
+        a = Wire()
+        simulator = Simulator([NotGate(inp=a, out=a)], event_driven=True)
+        a.val = '0'
+        with self.assertRaises(HDLError):
+            simulator.eval()
+
+
+class TestLevelize(unittest.TestCase):
+
+    def setUp(self):
+        self.wires = [Wire() for x in range(0, 5)]
+        self.gates = [NotGate(inp=self.wires[x], out=self.wires[x + 1]) for x in range(0, 4)]
+        self.simulator = Simulator(list(reversed(self.gates)))
+
+    def test_schedule(self):
+        self.assertEqual(self.simulator.schedule, self.gates)
+        self.assertEqual(self.simulator.loops, [])
+
+    def test_eval(self):
+        self.wires[0].val = '1'
+        self.simulator.eval()
+        self.assertEqual(self.wires[4].val, '1')
+
+    def test_subwires(self):
+        bus = Wire(width=2)
+        first = NotGate(inp=self.wires[0], out=bus[0])
+        second = NotGate(inp=bus[0], out=bus[1])
+        simulator = Simulator([second, first])
+        self.assertEqual(simulator.schedule, [first, second])
+
+    def test_loops(self):
+        s, r, q, nq = Wire(), Wire(), Wire(), Wire()
+        latch = [NandGate(a=s, b=nq, out=q), NandGate(a=r, b=q, out=nq)]
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            simulator = Simulator(latch + self.gates)
+
+        self.assertEqual(simulator.loops, [latch])
+        self.assertEqual(len(caught), 1)
+        self.assertTrue(issubclass(caught[0].category, HDLWarning))
+
+
+class Buffer(object):
+    """
+        A user defined gate which does not declare its inputs and outputs.
+    """
+
+    def __init__(self, inp, out):
+        self.inp = inp
+        self.out = out
+
+    def eval(self):
+        self.out.bits = self.inp.bits
+
+    def tick(self):
+        pass
+
+    def tock(self):
+        pass
+
+
+class TestUndeclared(unittest.TestCase):
+
+    def test_order(self):
+        # Undeclared gates keep their place relative to the gates listed around them.
+        for event_driven in (False, True):
+            a, b, c, d, e = Wire(), Wire(), Wire(), Wire(), Wire()
+            simulator = Simulator([
+                NotGate(inp=a, out=b),
+                NotGate(inp=b, out=c),
+                Buffer(inp=c, out=d),
+                NotGate(inp=d, out=e),
+            ], event_driven=event_driven)
+            a.val = '1'
+            simulator.eval()
+            self.assertEqual((d.val, e.val), ('1', '0'))
+
+            a.val = '0'
+            simulator.eval()
+            self.assertEqual((d.val, e.val), ('0', '1'))
+
+    def test_runs(self):
+        # The gates between undeclared gates are still sorted by level.
+        a, b, c, d = Wire(), Wire(), Wire(), Wire()
+        late = NotGate(inp=b, out=c)
+        early = NotGate(inp=a, out=b)
+        buffer = Buffer(inp=c, out=d)
+        simulator = Simulator([late, early, buffer])
+        self.assertEqual(simulator.schedule, [early, late, buffer])
+
+
+class TestClocking(unittest.TestCase):
+
+    def setUp(self):
+        self.evals = []
+        self.d, self.q, self.out = Wire(), Wire(), Wire()
+        self.dff = DFF(input=self.out, output=self.q, default='0')
+        self.nand = CountingNandGate(self.evals, a=self.q, b=self.q, out=self.out)
+        self.simulator = Simulator([self.nand, self.dff])
+
+    def test_classify(self):
+        self.assertEqual(self.simulator.combinational, [self.nand])
+        self.assertEqual(self.simulator.sequential, [self.dff])
+
+    def test_tick(self):
+        self.simulator.tick()
+        self.assertEqual(self.evals, [])
+
+    def test_tock(self):
+        self.simulator.eval()
+        self.simulator.tick()
+        self.simulator.tock()
+        self.assertEqual(self.evals, [self.nand, self.nand])
+        self.assertEqual(self.q.val, '1')
+        self.assertEqual(self.out.val, '0')
+
+    def test_toggle(self):
+        self.simulator.eval()
+        values = []
+        for x in range(0, 4):
+            self.simulator.tick()
+            self.simulator.tock()
+            values.append(self.q.val)
+        self.assertEqual(values, ['1', '0', '1', '0'])
+
+
+class TestRun(unittest.TestCase):
+
+    def setUp(self):
+        self.count, self.next, self.step = Wire(width=8), Wire(width=8), Wire(width=8)
+        self.write = Wire()
+        self.simulator = Simulator([
+            Adder(a=self.count, b=self.step, out=self.next, width=8),
+            Register(input=self.next, write=self.write, output=self.count, default='00000000'),
+        ])
+        self.step.uival = 1
+        self.write.val = '1'
+
+    def test_run(self):
+        self.assertEqual(self.simulator.run(10), 10)
+        self.assertEqual(self.count.uival, 10)
+        self.assertEqual(self.simulator.cycle, 10)
+
+    def test_until(self):
+        ran = self.simulator.run(100, until=lambda cycle: self.count.uival == 7)
+        self.assertEqual(ran, 7)
+        self.assertEqual(self.simulator.cycle, 7)
+
+    def test_stimulus(self):
+        def stimulus(cycle):
+            self.write.val = '1' if cycle % 2 == 0 else '0'
+
+        self.simulator.run(10, stimulus=stimulus)
+        self.assertEqual(self.count.uival, 5)
+
+    def test_compiled(self):
+        self.simulator.compile()
+        self.simulator.run(300)
+        self.assertEqual(self.count.uival, 300 % 256)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def build(self, event_driven=False):
+        """
+            A counter, which writes its count to a memory at the address given by the
+            count's lowest bits, and an accumulator over the memory's output.
+        """
+        self.count, self.next, self.one = Wire(width=8), Wire(width=8), ConstantWire('00000001', width=8)
+        self.write, self.read, self.total, self.sum = Wire(), Wire(width=8), Wire(width=8), Wire(width=8)
+        self.memory = Memory(
+            input=self.count, output=self.read, write=self.write, address=self.count[4:8],
+            default=0, width=8, storage=PagedStorage(8, page_size=4),
+        )
+        return Simulator([
+            Adder(a=self.count, b=self.one, out=self.next, width=8),
+            Register(input=self.next, write=self.write, output=self.count, default='00000000'),
+            self.memory,
+            Adder(a=self.total, b=self.read, out=self.sum, width=8),
+            DFF(input=self.sum, output=self.total, default='00000000'),
+        ], event_driven=event_driven)
+
+    def test_restore(self):
+        for event_driven in (False, True):
+            simulator = self.build(event_driven)
+            self.write.val = '1'
+            simulator.run(20)
+            snapshot = simulator.snapshot()
+            state = (self.count.val, self.total.val, self.memory.memory.dump())
+
+            simulator.run(30)
+            self.assertNotEqual((self.count.val, self.total.val), state[:2])
+
+            # A snapshot can be restored more than once.
+            for attempt in range(0, 2):
+                simulator.restore(snapshot)
+                self.assertEqual(simulator.cycle, 20)
+                self.assertEqual((self.count.val, self.total.val, self.memory.memory.dump()), state)
+                simulator.run(30)
+                self.assertEqual(self.count.uival, 50)
+
+    def test_fork(self):
+        simulator = self.build()
+        self.write.val = '1'
+        simulator.run(10)
+        fork = simulator.fork()
+        self.assertEqual(fork.cycle, 10)
+        self.assertIsNot(fork.gates[0].a, self.count)
+        self.assertIs(fork.gates[0].b, self.one)
+        self.assertEqual(fork.gates[1].write.val, '1')
+
+        # The original and its fork run independently.
+        simulator.run(5)
+        self.write.val = '0'
+        simulator.run(5)
+        fork.run(10)
+        self.assertEqual((self.count.uival, fork.gates[1].output.uival), (15, 20))
+        self.assertEqual(self.memory.memory.read(14), 14)
+        self.assertEqual(fork.gates[2].memory.read(14), 14)
+        self.assertEqual((self.memory.memory.read(3), fork.gates[2].memory.read(3)), (3, 19))
+
+        # A snapshot of the original can be restored into the fork.
+        fork.restore(simulator.snapshot())
+        self.assertEqual((fork.cycle, fork.gates[1].output.uival), (20, 15))
+
+    def test_fork_isolated(self):
+        simulator = self.build()
+        self.write.val = '1'
+        simulator.run(10)
+        wires = set(
+            gate.view(port) for gate in simulator.gates for port in gate.inputs + gate.outputs
+        )
+        before = dict((wire, wire.bits) for wire in wires)
+
+        # Writing and running the fork leaves the original's wires as they were.
+        fork = simulator.fork()
+        fork.gates[1].write.val = '0'
+        fork.gates[0].a.uival = 3
+        fork.run(7)
+        self.assertEqual(dict((wire, wire.bits) for wire in wires), before)
+        self.assertEqual(simulator.cycle, 10)
+        self.assertEqual(self.memory.memory.read(3), 3)
+
+    def test_fork_random(self):
+        for mode in ('sweep', 'event', 'compiled'):
+            gates, inputs, outputs = random_netlist(300, depth=8, width=4, sequential=0.1, seed=5)
+            simulator = Simulator(gates, event_driven=(mode == 'event'))
+            if mode == 'compiled':
+                simulator.compile()
+
+            rng = random.Random(0)
+            for wire in inputs:
+                wire.uival = rng.getrandbits(4)
+            simulator.run(5)
+            snapshot = simulator.snapshot()
+            fork = simulator.fork()
+            simulator.run(10)
+            expected = [wire.val for wire in outputs]
+
+            # The fork's outputs are found through the gates, which keep their order.
+            ports = [
+                (position, port) for wire in outputs for position, gate in enumerate(simulator.gates)
+                for port in gate.outputs if gate.view(port) is wire
+            ]
+            fork.run(10)
+            self.assertEqual([fork.gates[position].view(port).val for position, port in ports], expected)
+
+            simulator.restore(snapshot)
+            simulator.run(10)
+            self.assertEqual([wire.val for wire in outputs], expected)
+
+    def test_unknown_gate(self):
+        simulator = Simulator([GateSimulator(1, [], [], [])])
+        self.assertRaises(HDLError, simulator.snapshot)
+        self.assertRaises(HDLError, simulator.fork)
+
+    def test_different_design(self):
+        snapshot = self.build().snapshot()
+        simulator = Simulator([NotGate(inp=Wire(), out=Wire())])
+        self.assertRaises(HDLError, simulator.restore, snapshot)
+
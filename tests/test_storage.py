@@ -0,0 +1,196 @@
+from pyhdl.storage import ArrayStorage, DictStorage, PagedStorage
+from pyhdl.utils import HDLError
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+
+class TestDictStorage(unittest.TestCase):
+
+    def test_fill(self):
+        storage = DictStorage(8, fill=3)
+        self.assertEqual(storage.read(12345), 3)
+        storage.write(12345, 4)
+        self.assertEqual(storage.read(12345), 4)
+        self.assertEqual(storage.dump(), {12345: 4})
+
+    def test_load(self):
+        storage = DictStorage(16)
+        storage.load_bytes(b'\x01\x02\x03\x04', offset=10)
+        self.assertEqual(storage.dump(), {10: 0x0201, 11: 0x0403})
+
+    def test_snapshot(self):
+        storage = DictStorage(8)
+        storage.write(1, 2)
+        snapshot, other = storage.snapshot(), storage.copy()
+        storage.write(1, 3)
+        storage.write(4, 5)
+        self.assertEqual(other.dump(), {1: 2})
+
+        storage.revert(snapshot)
+        self.assertEqual(storage.dump(), {1: 2})
+
+
+class TestArrayStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_read_write(self):
+        for width in (1, 8, 12, 16, 32, 64, 72, 100):
+            storage = ArrayStorage(16, width, fill=1)
+            value = (1 << width) - 2 if width > 1 else 0
+            storage.write(7, value)
+            self.assertEqual(storage.read(7), value)
+            self.assertEqual(storage.read(6), 1)
+            self.assertEqual(len(storage.dump()), 16 * ((width + 7) // 8))
+
+    def test_mask(self):
+        storage = ArrayStorage(4, 4)
+        storage.write(0, 0x1f)
+        self.assertEqual(storage.read(0), 0xf)
+
+    def test_range(self):
+        storage = ArrayStorage(4, 8)
+        self.assertRaises(HDLError, storage.read, 4)
+        self.assertRaises(HDLError, storage.write, -1, 0)
+        self.assertRaises(HDLError, storage.load, [1, 2, 3], 2)
+
+    def test_load(self):
+        storage = ArrayStorage(8, 16)
+        storage.load([1, 2, 3], offset=2)
+        self.assertEqual([storage.read(address) for address in range(0, 6)], [0, 0, 1, 2, 3, 0])
+
+    def test_dump(self):
+        storage = ArrayStorage(4, 16)
+        view = storage.dump()
+        storage.write(1, 0xabcd)
+        self.assertEqual(view[2:4].tobytes(), b'\xcd\xab')
+
+    def test_load_bytes_mask(self):
+        for storage in (ArrayStorage(2, 12), DictStorage(12), PagedStorage(12, page_size=4)):
+            storage.load_bytes(b'\xff\xff\x34\x12')
+            self.assertEqual([storage.read(address) for address in (0, 1)], [0xfff, 0x234])
+
+    def test_snapshot(self):
+        storage = ArrayStorage(4, 12, fill=7)
+        storage.write(2, 0xabc)
+        snapshot, other = storage.snapshot(), storage.copy()
+        storage.write(2, 1)
+        self.assertEqual(other.read(2), 0xabc)
+
+        storage.revert(snapshot)
+        self.assertEqual([storage.read(address) for address in range(0, 4)], [7, 7, 0xabc, 7])
+
+    def test_binary_image(self):
+        with open(self.path('rom.bin'), 'wb') as image:
+            image.write(struct.pack('<4I', 10, 20, 30, 40))
+
+        storage = ArrayStorage(8, 32)
+        storage.load_image(self.path('rom.bin'), offset=4)
+        self.assertEqual([storage.read(address) for address in range(3, 8)], [0, 10, 20, 30, 40])
+
+        self.assertRaises(HDLError, storage.load_bytes, b'\x00' * 3)
+        self.assertRaises(HDLError, storage.load_image, self.path('rom.bin'), 'elf')
+
+    def test_hex_image(self):
+        with open(self.path('rom.hex'), 'w') as image:
+            image.write('// boot rom\nff 1_0\n@8 aa // jump\n')
+
+        storage = ArrayStorage(16, 8)
+        storage.load_image(self.path('rom.hex'), format='hex')
+        self.assertEqual(storage.read(0), 0xff)
+        self.assertEqual(storage.read(1), 0x10)
+        self.assertEqual(storage.read(8), 0xaa)
+
+    def test_mmap(self):
+        storage = ArrayStorage.open(self.path('ram.img'), 64, 16, fill=0x1234)
+        self.assertEqual(storage.read(63), 0x1234)
+        storage.write(3, 7)
+        storage.close()
+
+        with open(self.path('ram.img'), 'rb') as image:
+            data = image.read()
+        self.assertEqual(len(data), 128)
+        self.assertEqual(data[6:8], b'\x07\x00')
+
+        storage = ArrayStorage.open(self.path('ram.img'), 64, 16)
+        self.assertEqual(storage.read(3), 7)
+        storage.close()
+
+        self.assertRaises(HDLError, ArrayStorage.open, self.path('ram.img'), 65, 16)
+
+
+class TestPagedStorage(unittest.TestCase):
+
+    def test_untouched(self):
+        storage = PagedStorage(32, fill=5, page_size=256)
+        self.assertEqual(storage.read(1 << 47), 5)
+        self.assertEqual(storage.pages, {})
+
+    def test_write(self):
+        storage = PagedStorage(32, page_size=256)
+        storage.write((1 << 40) + 3, 99)
+        self.assertEqual(storage.read((1 << 40) + 3), 99)
+        self.assertEqual(storage.read((1 << 40) + 4), 0)
+        self.assertEqual(list(storage.pages), [1 << 32])
+
+    def test_load_across_pages(self):
+        storage = PagedStorage(8, page_size=4)
+        storage.load(range(1, 11), offset=2)
+        self.assertEqual(sorted(storage.pages), [0, 1, 2])
+        self.assertEqual([storage.read(address) for address in range(0, 13)], [0, 0] + list(range(1, 11)) + [0])
+
+        storage.load_bytes(b'\x07\x08\x09', offset=3)
+        self.assertEqual([storage.read(address) for address in range(3, 6)], [7, 8, 9])
+
+    def test_sweep(self):
+        storage = PagedStorage(16, page_size=1024)
+        for address in range(0, 1 << 16):
+            storage.write(address, address)
+        self.assertEqual(len(storage.pages), 64)
+        self.assertEqual(storage.read(12345), 12345)
+
+    def test_dump_restore(self):
+        storage = PagedStorage(16, page_size=8)
+        storage.write(100, 1)
+        pages = storage.dump()
+        storage.write(100, 2)
+        storage.write(200, 3)
+
+        storage.restore(pages)
+        self.assertEqual(storage.read(100), 1)
+        self.assertEqual(storage.read(200), 0)
+        self.assertEqual(list(storage.pages), [12])
+
+    def test_snapshot(self):
+        storage = PagedStorage(16, page_size=8)
+        storage.write(0, 1)
+        storage.write(100, 2)
+        snapshot = storage.snapshot()
+        other = storage.copy()
+
+        # Writing a shared page copies it, and leaves the other pages shared.
+        storage.write(1, 3)
+        storage.write(200, 4)
+        self.assertIs(storage.pages[12], snapshot[12])
+        self.assertIsNot(storage.pages[0], snapshot[0])
+        self.assertEqual((other.read(1), other.read(200)), (0, 0))
+
+        other.write(100, 5)
+        self.assertEqual(storage.read(100), 2)
+
+        storage.revert(snapshot)
+        self.assertEqual([storage.read(address) for address in (0, 1, 100, 200)], [1, 0, 2, 0])
+        storage.write(0, 6)
+        storage.revert(snapshot)
+        self.assertEqual(storage.read(0), 1)
+
+    def test_page_size(self):
+        self.assertRaises(HDLError, PagedStorage, 8, 0, 1000)
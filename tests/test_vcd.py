@@ -0,0 +1,89 @@
+from pyhdl.primitives import *
+from pyhdl.simulator import Simulator
+from pyhdl.vcd import VCDWriter
+from pyhdl.wire import Wire
+import os
+import shutil
+import six
+import tempfile
+import unittest
+
+
+def counter():
+    count, total = Wire(width=2), Wire(width=2)
+    gates = [
+        Adder(a=count, b=Wire(width=2), out=total, width=2),
+        DFF(input=total, output=count, default='00'),
+    ]
+    gates[0].b.val = '01'
+    return gates, count, total
+
+
+class TestVCDWriter(unittest.TestCase):
+    def test_header(self):
+        gates, count, total = counter()
+        sim = Simulator(gates)
+        out = six.StringIO()
+
+        writer = VCDWriter(sim, out)
+        writer.close()
+        text = out.getvalue()
+
+        self.assertIn('$timescale 1 ns $end', text)
+        self.assertIn('$scope module Adder0 $end', text)
+        self.assertIn('$scope module DFF1 $end', text)
+        self.assertIn('$enddefinitions $end', text)
+        self.assertIn('#0\n$dumpvars\n', text)
+
+        # The adder's output and the flop's input are the same wire.
+        self.assertEqual(text.count('$var wire 2 # out [1:0] $end'), 1)
+        self.assertEqual(text.count('$var wire 2 # input [1:0] $end'), 1)
+
+    def test_changes(self):
+        gates, count, total = counter()
+        sim = Simulator(gates)
+        out = six.StringIO()
+
+        with VCDWriter(sim, out, signals={'count': count, 'high': count[0]}):
+            sim.eval()
+            sim.run(3)
+            sim.run(1)
+
+        body = out.getvalue().split('$enddefinitions $end\n')[1]
+        self.assertEqual(body, '\n'.join([
+            '#0', '$dumpvars', 'b00 !', '0"', '$end',
+            '#1', 'b01 !',
+            '#2', 'b10 !', '1"',
+            '#3', 'b11 !',
+            '#4', 'b00 !', '0"',
+            '',
+        ]))
+        self.assertEqual(sim.monitors, [])
+
+    def test_unchanged(self):
+        a, out = Wire(), Wire()
+        sim = Simulator([NotGate(inp=a, out=out)])
+        a.val = '0'
+        sim.eval()
+        stream = six.StringIO()
+
+        with VCDWriter(sim, stream, signals={'a': a}):
+            sim.run(5)
+
+        self.assertTrue(stream.getvalue().endswith('$end\n'))
+
+    def test_buffering(self):
+        gates, count, total = counter()
+        sim = Simulator(gates)
+        sim.eval()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'trace.vcd')
+
+        writer = VCDWriter(sim, path, signals={'count': count}, buffer_size=1 << 16)
+        sim.run(8)
+        self.assertEqual(os.path.getsize(path), 0)
+        writer.close()
+
+        with open(path) as trace:
+            self.assertIn('#8\nb00 !\n', trace.read())
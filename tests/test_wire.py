@@ -1,6 +1,7 @@
 from pyhdl.wire import Wire, SubWire, ConstantWire
 from pyhdl.utils import HDLError
 import unittest
+import warnings
 
 
 class TestWire(unittest.TestCase):
@@ -89,6 +90,21 @@ class TestConstantWire(unittest.TestCase):
         self.assertEqual(wire.uival, 7)
 
 
+class TestWireType(unittest.TestCase):
+
+    def test_type(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertEqual(Wire(type='clock').type, 'clock')
+            self.assertEqual(ConstantWire('1', type='reset').type, 'reset')
+            self.assertEqual(Wire(width=4)[1:3].type, 'undefined')
+        self.assertEqual([warning.category for warning in caught], [DeprecationWarning] * 3)
+
+    def test_read_only(self):
+        with self.assertRaises(AttributeError):
+            Wire().type = 'clock'
+
+
 class TestSubWire(unittest.TestCase):
 
     def setUp(self):
@@ -149,3 +165,102 @@ class TestSubWireSlice(unittest.TestCase):
 
     def test_len(self):
         assert len(self.wire) == 4
+
+
+class TestWireBits(unittest.TestCase):
+
+    def setUp(self):
+        self.wire = Wire(width=4)
+
+    def test_default(self):
+        self.assertEqual(self.wire.bits, (0, 15))
+
+    def test_val(self):
+        self.wire.val = '1x01'
+        self.assertEqual(self.wire.bits, (9, 4))
+
+    def test_bits(self):
+        self.wire.bits = (9, 4)
+        self.assertEqual(self.wire.val, '1x01')
+        self.wire.bits = (9, 0)
+        self.assertEqual(self.wire.val, '1001')
+        self.assertEqual(self.wire.uival, 9)
+        self.assertEqual(self.wire.ival, -7)
+
+    def test_truncate(self):
+        self.wire.uival = 0x1f
+        self.assertEqual(self.wire.val, '1111')
+        self.wire.ival = -1
+        self.assertEqual(self.wire.uival, 15)
+
+    def test_undefined(self):
+        with self.assertRaises(HDLError):
+            self.wire.uival
+        # Reading undefined bits used to raise ValueError, which still catches it.
+        with self.assertRaises(ValueError):
+            self.wire.ival
+
+    def test_length(self):
+        with self.assertRaises(HDLError):
+            self.wire.val = '101'
+
+
+class TestSubWireWrite(unittest.TestCase):
+
+    def setUp(self):
+        self.wire = Wire(width=6)
+        self.wire.val = '000000'
+
+    def test_write(self):
+        self.wire[1:3].val = '11'
+        self.assertEqual(self.wire.val, '011000')
+
+    def test_bits(self):
+        self.wire.val = '010110'
+        self.assertEqual(self.wire[1:4].bits, (5, 0))
+        self.assertEqual(self.wire[-1].uival, 0)
+
+    def test_oversized(self):
+        # Bits beyond the width of the slice do not spill into the rest of the wire.
+        self.wire[2:4].bits = (0b1111, 0b1100)
+        self.assertEqual(self.wire.val, '001100')
+
+    def test_nested(self):
+        sub = self.wire[1:5][2:4]
+        sub.uival = 3
+        self.assertEqual(self.wire.val, '000110')
+        self.assertEqual(len(sub), 2)
+
+    def test_root(self):
+        sub = self.wire[1:5][2:4][1]
+        self.assertIs(sub.root, self.wire)
+        self.assertEqual(sub._shift, 1)
+
+        changes = []
+        self.wire.watch(lambda wire, changed: changes.append(changed))
+        sub.val = '1'
+        self.assertEqual(self.wire.val, '000010')
+        self.assertEqual(changes, [2])
+
+    def test_unwatch(self):
+        changes = []
+        watcher = lambda wire, changed: changes.append(changed)
+        self.wire.watch(watcher)
+        self.wire[5].val = '1'
+        self.wire.unwatch(watcher)
+        self.wire[4].val = '1'
+        self.assertEqual(changes, [1])
+        self.assertIsNone(self.wire._watchers)
+        with self.assertRaises(HDLError):
+            self.wire.unwatch(watcher)
+
+    def test_nested_read(self):
+        sub = self.wire[1:5][2:4]
+        self.wire.bits = (0b000100, 0b000010)
+        self.assertEqual(sub.val, '1x')
+        self.wire.val = '0001X0'
+        self.assertEqual(sub.val, '1X')
+
+    def test_invalid(self):
+        with self.assertRaises(HDLError):
+            self.wire[7]